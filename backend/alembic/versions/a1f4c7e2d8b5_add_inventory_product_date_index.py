@@ -0,0 +1,32 @@
+"""add inventory product/date index
+
+Revision ID: a1f4c7e2d8b5
+Revises: f2c6a9d4e8b1
+Create Date: 2026-10-17 14:12:08.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f4c7e2d8b5'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a9d4e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lọc sổ kho theo sản phẩm + khoảng ngày (GET /inventory/, /inventory/movement-summary).
+    # IF NOT EXISTS: DB đã chạy bản cũ của f2c6a9d4e8b1 (tạo index ở đó) vẫn nâng cấp được
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_inventory_product_date "
+        "ON inventory (product_id, date_added, id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_inventory_product_date")
@@ -0,0 +1,55 @@
+"""add stock balances
+
+Revision ID: a5d7f3e9c2b6
+Revises: a1f4c7e2d8b5
+Create Date: 2026-10-17 14:25:07.631552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d7f3e9c2b6'
+down_revision: Union[str, Sequence[str], None] = 'a1f4c7e2d8b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_balances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('location', sa.String(length=100), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'location', name='uq_stock_balances_product_location')
+    )
+    op.create_index(op.f('ix_stock_balances_id'), 'stock_balances', ['id'], unique=False)
+
+    # Dựng số dư ban đầu từ sổ kho; phiếu theo đơn hàng → "Chưa phân kho"
+    op.execute("""
+        INSERT INTO stock_balances (product_id, location, quantity)
+        SELECT product_id, loc, SUM(quantity)
+        FROM (
+            SELECT product_id, quantity,
+                   CASE
+                       WHEN location IS NULL OR location = ''
+                            OR location IN ('Xuất theo đơn hàng', 'Hoàn kho')
+                       THEN 'Chưa phân kho'
+                       ELSE location
+                   END AS loc
+            FROM inventory
+        ) AS moves
+        GROUP BY product_id, loc
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stock_balances_id'), table_name='stock_balances')
+    op.drop_table('stock_balances')
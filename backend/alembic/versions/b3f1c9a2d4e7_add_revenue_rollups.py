@@ -0,0 +1,69 @@
+"""add revenue rollups
+
+Revision ID: b3f1c9a2d4e7
+Revises: 10e7a7972b67
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9a2d4e7'
+down_revision: Union[str, Sequence[str], None] = '10e7a7972b67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'revenue_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('region', sa.String(length=100), nullable=True),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'day', 'category', 'region', 'product_id', 'customer_id',
+            name='uq_revenue_rollups_key',
+        ),
+    )
+    op.create_index(op.f('ix_revenue_rollups_id'), 'revenue_rollups', ['id'], unique=False)
+    op.create_index('ix_revenue_rollups_year_month', 'revenue_rollups', ['year', 'month'], unique=False)
+
+    # Đổ dữ liệu ban đầu từ các đơn đã hoàn thành
+    op.execute(
+        """
+        INSERT INTO revenue_rollups
+            (day, year, month, category, region, product_id, customer_id,
+             order_count, quantity, total)
+        SELECT date,
+               CAST(EXTRACT(year FROM date) AS INTEGER),
+               CAST(EXTRACT(month FROM date) AS INTEGER),
+               category, region, product_id, customer_id,
+               COUNT(id), COALESCE(SUM(quantity), 0), COALESCE(SUM(amount), 0)
+        FROM orders
+        WHERE status = 'Hoàn thành'
+        GROUP BY date, category, region, product_id, customer_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_revenue_rollups_year_month', table_name='revenue_rollups')
+    op.drop_index(op.f('ix_revenue_rollups_id'), table_name='revenue_rollups')
+    op.drop_table('revenue_rollups')
@@ -0,0 +1,37 @@
+"""add low stock thresholds
+
+Revision ID: b8e4d2a6f1c9
+Revises: a5d7f3e9c2b6
+Create Date: 2026-10-17 15:03:44.190276
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d2a6f1c9'
+down_revision: Union[str, Sequence[str], None] = 'a5d7f3e9c2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('reorder_level', sa.Integer(), server_default='10', nullable=False))
+    op.add_column('products', sa.Column('low_stock_alerted', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.create_index(
+        'ix_products_low_stock', 'products', ['stock'], unique=False,
+        postgresql_where=sa.text('stock < reorder_level'),
+    )
+    # Sản phẩm đang dưới ngưỡng coi như đã cảnh báo, tránh dội thông báo khi nâng cấp
+    op.execute("UPDATE products SET low_stock_alerted = true WHERE stock < reorder_level")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_low_stock', table_name='products', postgresql_where=sa.text('stock < reorder_level'))
+    op.drop_column('products', 'low_stock_alerted')
+    op.drop_column('products', 'reorder_level')
@@ -0,0 +1,61 @@
+"""revenue rollup coalesce key
+
+Revision ID: c4f8b2d6e1a7
+Revises: b8e4d2a6f1c9
+Create Date: 2026-10-18 09:21:07.512843
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8b2d6e1a7'
+down_revision: Union[str, Sequence[str], None] = 'b8e4d2a6f1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+KEY_INDEX_SQL = """
+    CREATE UNIQUE INDEX uq_revenue_rollups_key ON revenue_rollups (
+        day,
+        COALESCE(category, ''),
+        COALESCE(region, ''),
+        COALESCE(product_id, 0),
+        COALESCE(customer_id, 0)
+    )
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('uq_revenue_rollups_key', 'revenue_rollups', type_='unique')
+
+    # Constraint cũ để lọt dòng trùng khi khoá có NULL → dựng lại từ orders
+    op.execute("DELETE FROM revenue_rollups")
+    op.execute(
+        """
+        INSERT INTO revenue_rollups
+            (day, year, month, category, region, product_id, customer_id,
+             order_count, quantity, total)
+        SELECT date,
+               CAST(EXTRACT(year FROM date) AS INTEGER),
+               CAST(EXTRACT(month FROM date) AS INTEGER),
+               MAX(category), MAX(region), product_id, customer_id,
+               COUNT(id), COALESCE(SUM(quantity), 0), COALESCE(SUM(amount), 0)
+        FROM orders
+        WHERE status = 'Hoàn thành'
+        GROUP BY date, COALESCE(category, ''), COALESCE(region, ''), product_id, customer_id
+        """
+    )
+    op.execute(KEY_INDEX_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_revenue_rollups_key', table_name='revenue_rollups')
+    op.create_unique_constraint(
+        'uq_revenue_rollups_key', 'revenue_rollups',
+        ['day', 'category', 'region', 'product_id', 'customer_id'],
+    )
@@ -0,0 +1,31 @@
+"""add date range indexes
+
+Revision ID: c7d2e8f1a9b3
+Revises: b3f1c9a2d4e7
+Create Date: 2026-10-17 10:04:55.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e8f1a9b3'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c9a2d4e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_status_date', 'orders', ['status', 'date'], unique=False)
+    op.create_index('ix_attendance_employee_date', 'attendance', ['employee_id', 'date'], unique=False)
+    op.create_index('ix_revenue_rollups_day', 'revenue_rollups', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_revenue_rollups_day', table_name='revenue_rollups')
+    op.drop_index('ix_attendance_employee_date', table_name='attendance')
+    op.drop_index('ix_orders_status_date', table_name='orders')
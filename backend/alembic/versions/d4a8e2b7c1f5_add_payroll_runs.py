@@ -0,0 +1,64 @@
+"""add payroll runs and payslips
+
+Revision ID: d4a8e2b7c1f5
+Revises: c7d2e8f1a9b3
+Create Date: 2026-10-17 11:20:31.448210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8e2b7c1f5'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e8f1a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payroll_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('stale', sa.Boolean(), nullable=False),
+    sa.Column('employee_count', sa.Integer(), nullable=False),
+    sa.Column('total_salary', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('year', 'month', name='uq_payroll_runs_year_month')
+    )
+    op.create_index(op.f('ix_payroll_runs_id'), 'payroll_runs', ['id'], unique=False)
+    op.create_table('payslips',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('employee_name', sa.String(length=100), nullable=False),
+    sa.Column('department', sa.String(length=50), nullable=True),
+    sa.Column('position', sa.String(length=100), nullable=True),
+    sa.Column('base_salary', sa.Integer(), nullable=False),
+    sa.Column('daily_salary', sa.Integer(), nullable=False),
+    sa.Column('total_days', sa.Integer(), nullable=False),
+    sa.Column('late', sa.Integer(), nullable=False),
+    sa.Column('early', sa.Integer(), nullable=False),
+    sa.Column('penalty', sa.Integer(), nullable=False),
+    sa.Column('final_salary', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['run_id'], ['payroll_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_id', 'employee_id', name='uq_payslips_run_employee')
+    )
+    op.create_index(op.f('ix_payslips_id'), 'payslips', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_payslips_id'), table_name='payslips')
+    op.drop_table('payslips')
+    op.drop_index(op.f('ix_payroll_runs_id'), table_name='payroll_runs')
+    op.drop_table('payroll_runs')
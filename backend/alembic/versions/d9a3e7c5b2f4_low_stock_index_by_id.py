@@ -0,0 +1,37 @@
+"""low stock index by id
+
+Revision ID: d9a3e7c5b2f4
+Revises: c4f8b2d6e1a7
+Create Date: 2026-10-18 10:12:36.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3e7c5b2f4'
+down_revision: Union[str, Sequence[str], None] = 'c4f8b2d6e1a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Khoá index = khoá keyset của /inventory/low-stock (id DESC)
+    op.drop_index('ix_products_low_stock', table_name='products', postgresql_where=sa.text('stock < reorder_level'))
+    op.create_index(
+        'ix_products_low_stock', 'products', [sa.text('id DESC')], unique=False,
+        postgresql_where=sa.text('stock < reorder_level'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_low_stock', table_name='products', postgresql_where=sa.text('stock < reorder_level'))
+    op.create_index(
+        'ix_products_low_stock', 'products', ['stock'], unique=False,
+        postgresql_where=sa.text('stock < reorder_level'),
+    )
@@ -0,0 +1,38 @@
+"""add inventory order_id and stock_location
+
+Revision ID: e5c1a8f3d6b9
+Revises: d9a3e7c5b2f4
+Create Date: 2026-10-18 11:04:52.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c1a8f3d6b9'
+down_revision: Union[str, Sequence[str], None] = 'd9a3e7c5b2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('inventory', sa.Column('order_id', sa.Integer(), nullable=True))
+    op.add_column('inventory', sa.Column('stock_location', sa.String(length=100), nullable=True))
+    op.create_foreign_key(
+        'inventory_order_id_fkey', 'inventory', 'orders',
+        ['order_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_index(op.f('ix_inventory_order_id'), 'inventory', ['order_id'], unique=False)
+    # Phiếu cũ giữ stock_location NULL → vẫn tính vào "Chưa phân kho" như trước
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_inventory_order_id'), table_name='inventory')
+    op.drop_constraint('inventory_order_id_fkey', 'inventory', type_='foreignkey')
+    op.drop_column('inventory', 'stock_location')
+    op.drop_column('inventory', 'order_id')
@@ -0,0 +1,30 @@
+"""add inventory created_at
+
+Revision ID: e9b3c5d1f7a2
+Revises: d4a8e2b7c1f5
+Create Date: 2026-10-17 13:02:11.517304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9b3c5d1f7a2'
+down_revision: Union[str, Sequence[str], None] = 'd4a8e2b7c1f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('inventory', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+    op.create_index('ix_inventory_created_at', 'inventory', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inventory_created_at', table_name='inventory')
+    op.drop_column('inventory', 'created_at')
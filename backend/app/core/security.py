@@ -1,3 +1,12 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -14,21 +23,176 @@ oauth2 = OAuth2PasswordBearer(tokenUrl="/auth/login")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+# ==========================
+# 🧵 POOL RIÊNG CHO BCRYPT
+#   - bcrypt tốn ~250ms CPU / lần → chạy trên pool giới hạn
+#     PASSWORD_HASH_WORKERS luồng, không chiếm luồng phục vụ route
+#   - Hàng đợi quá PASSWORD_HASH_MAX_QUEUE yêu cầu → 503 (lúc đầu ca
+#     đăng nhập dồn dập thì báo bận thay vì treo cả server)
+#   - Route async dùng *_async (await, không giữ luồng nào khi chờ);
+#     bản đồng bộ vẫn đi qua cùng pool nên giới hạn CPU áp dụng chung
+#   - password_hash_stats(): độ sâu hàng đợi, số đang chạy, thời gian chờ
+# ==========================
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_hash_lock = threading.Lock()
+_hash_stats = {
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "rejected": 0,
+    "max_queue_depth": 0,
+    "total_wait_ms": 0.0,
+    "total_run_ms": 0.0,
+}
+
+
+def _submit_hashing(fn, *args) -> Future:
+    with _hash_lock:
+        if _hash_stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+            _hash_stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Hệ thống đang bận, vui lòng thử lại")
+        _hash_stats["queued"] += 1
+        _hash_stats["max_queue_depth"] = max(_hash_stats["max_queue_depth"], _hash_stats["queued"])
+
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        with _hash_lock:
+            _hash_stats["queued"] -= 1
+            _hash_stats["running"] += 1
+            _hash_stats["total_wait_ms"] += (started - submitted) * 1000
+        try:
+            return fn(*args)
+        finally:
+            with _hash_lock:
+                _hash_stats["running"] -= 1
+                _hash_stats["completed"] += 1
+                _hash_stats["total_run_ms"] += (time.perf_counter() - started) * 1000
+
+    return _hash_executor.submit(job)
+
+
+def _verify(plain_password, hashed_password) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception:
+        return False
+
+
+def password_hash_stats() -> dict:
+    with _hash_lock:
+        done = _hash_stats["completed"]
+        return {
+            **_hash_stats,
+            "total_wait_ms": round(_hash_stats["total_wait_ms"], 1),
+            "total_run_ms": round(_hash_stats["total_run_ms"], 1),
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE,
+            "avg_wait_ms": round(_hash_stats["total_wait_ms"] / done, 2) if done else 0.0,
+            "avg_run_ms": round(_hash_stats["total_run_ms"] / done, 2) if done else 0.0,
+        }
+
+
 # ==========================
 # 🔥 HÀM HASH PASSWORD — RẤT QUAN TRỌNG
 # ==========================
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return _submit_hashing(pwd_context.hash, password).result()
+
+
+async def hash_password_async(password: str):
+    return await asyncio.wrap_future(_submit_hashing(pwd_context.hash, password))
 
 
 # ==========================
 # 🔐 HÀM VERIFY PASSWORD
 # ==========================
 def verify_password(plain_password, hashed_password):
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except:
-        return False
+    return _submit_hashing(_verify, plain_password, hashed_password).result()
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await asyncio.wrap_future(_submit_hashing(_verify, plain_password, hashed_password))
+
+
+# ==========================
+# 👤 CACHE PRINCIPAL THEO USERNAME (sub của JWT)
+#   - Request có token đã cache → không chạm DB ở bước xác thực
+#   - Sống PRINCIPAL_CACHE_TTL giây; admins router gọi
+#     invalidate_principal() khi sửa / khoá / đổi role / xoá user
+#   - Lưu bản chụp bất biến, không lưu ORM object (session của request
+#     commit xong sẽ expire object → request khác đọc sẽ lỗi)
+# ==========================
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))  # giây
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    full_name: Optional[str]
+    email: Optional[str]
+    role: Optional[str]
+    is_active: Optional[bool]
+    employee_id: Optional[int]
+
+    @classmethod
+    def from_admin(cls, user: models.Admin) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            full_name=user.full_name,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            employee_id=user.employee_id,
+        )
+
+
+_principal_lock = threading.Lock()
+_principals = OrderedDict()   # username → (expires, Principal)
+_principal_generations = {}   # username → số lần invalidate
+
+
+def _cached_principal(username: str):
+    """Trả về (Principal | None, token); token dùng cho _store_principal khi miss."""
+    with _principal_lock:
+        entry = _principals.get(username)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                _principals.move_to_end(username)
+                return entry[1], None
+            del _principals[username]
+        return None, _principal_generations.get(username, 0)
+
+
+def _store_principal(username: str, token, principal: Principal):
+    with _principal_lock:
+        # Có invalidate trong lúc đọc DB → bỏ, tránh lưu bản cũ
+        if token != _principal_generations.get(username, 0):
+            return
+        _principals[username] = (time.monotonic() + PRINCIPAL_CACHE_TTL, principal)
+        _principals.move_to_end(username)
+        while len(_principals) > PRINCIPAL_CACHE_SIZE:
+            _principals.popitem(last=False)
+
+
+def invalidate_principal(*usernames):
+    with _principal_lock:
+        for username in set(usernames):
+            if not username:
+                continue
+            _principal_generations[username] = _principal_generations.get(username, 0) + 1
+            _principals.pop(username, None)
 
 
 # ==========================
@@ -45,6 +209,10 @@ def get_current_user(
         if not username:
             raise HTTPException(status_code=401, detail="Token không hợp lệ")
 
+        principal, generation = _cached_principal(username)
+        if principal is not None:
+            return principal
+
         user = (
             db.query(models.Admin)
             .filter(models.Admin.username == username)
@@ -54,7 +222,9 @@ def get_current_user(
         if not user:
             raise HTTPException(status_code=404, detail="User không tồn tại")
 
-        return user
+        principal = Principal.from_admin(user)
+        _store_principal(username, generation, principal)
+        return principal
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token hết hạn")
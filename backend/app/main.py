@@ -26,9 +26,11 @@ from app.routers import (
     employee_home,
     tasks,
     manager,
+    export_jobs,
 )
 
 from app.routers.employee_management import router as employee_management_router
+from app.utils import stock_snapshots
 
 app = FastAPI(
     title="Hệ thống quản lý doanh nghiệp",
@@ -47,10 +49,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 models.Base.metadata.create_all(bind=database.engine)
 
+
+# ------------------------------
+# TÁC VỤ NỀN
+# ------------------------------
+@app.on_event("startup")
+def start_background_jobs():
+    stock_snapshots.start_scheduler()
+
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    stock_snapshots.stop_scheduler()
+
 # ------------------------------
 # INCLUDE ROUTERS
 # ------------------------------
@@ -76,6 +92,7 @@ app.include_router(reports_forecast.router)
 app.include_router(employee_home.router)
 app.include_router(tasks.router)
 app.include_router(manager.router)
+app.include_router(export_jobs.router)
 
 app.mount("/images", StaticFiles(directory="static/images"), name="images")
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -9,8 +9,11 @@ from sqlalchemy import (
     ForeignKey,
     DateTime,
     Time,
+    UniqueConstraint,
+    Index,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, literal_column, text
 from datetime import datetime
 from app.database import Base
 
@@ -89,6 +92,7 @@ class Customer(Base):
 # =====================================================
 class Product(Base):
     __tablename__ = "products"
+    # Partial index sản phẩm dưới ngưỡng: xem ix_products_low_stock bên dưới
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
@@ -96,6 +100,10 @@ class Product(Base):
 
     price = Column(Float, nullable=False)
     stock = Column(Integer, default=0)
+
+    # ⭐ Cảnh báo sắp hết hàng
+    reorder_level = Column(Integer, default=10, server_default="10", nullable=False)
+    low_stock_alerted = Column(Boolean, default=False, server_default=text("false"), nullable=False)
     description = Column(Text, nullable=True)
     image_url = Column(String(255), nullable=True)
 
@@ -118,12 +126,24 @@ class Product(Base):
     inventories = relationship("Inventory", back_populates="product", cascade="all, delete")
 
 
+# Partial index: chỉ chứa sản phẩm dưới ngưỡng đặt hàng lại, sắp theo
+# id DESC đúng khoá keyset của GET /inventory/low-stock
+Index(
+    "ix_products_low_stock",
+    Product.id.desc(),
+    postgresql_where=text("stock < reorder_level"),
+)
+
 
 # =====================================================
 # 🏬 KHO HÀNG
 # =====================================================
 class Inventory(Base):
     __tablename__ = "inventory"
+    __table_args__ = (
+        Index("ix_inventory_created_at", "created_at"),
+        Index("ix_inventory_product_date", "product_id", "date_added", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(
@@ -135,15 +155,58 @@ class Inventory(Base):
     quantity = Column(Integer, default=0)
     date_added = Column(Date, nullable=True)
     note = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+
+    # Phiếu xuất / hoàn theo đơn: location là nhãn ("Xuất theo đơn hàng",
+    # "Hoàn kho"), stock_location là kho thật bị trừ / được cộng
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="SET NULL"), nullable=True, index=True)
+    stock_location = Column(String(100), nullable=True)
 
     product = relationship("Product", back_populates="inventories")
 
 
+# =====================================================
+# 🏬 TỒN KHO THEO VỊ TRÍ
+#   Cập nhật cùng transaction với mỗi phiếu kho
+# =====================================================
+class StockBalance(Base):
+    __tablename__ = "stock_balances"
+    __table_args__ = (
+        UniqueConstraint("product_id", "location", name="uq_stock_balances_product_location"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    location = Column(String(100), nullable=False)
+    quantity = Column(Integer, default=0, nullable=False)
+
+
+# =====================================================
+# 📸 ẢNH CHỤP TỒN KHO THEO NGÀY
+#   quantity = tổng sổ kho của sản phẩm tính đến hết snapshot_date
+#   Tồn kho tại ngày D = snapshot gần nhất ≤ D + phiếu kho sau đó
+# =====================================================
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        UniqueConstraint("product_id", "snapshot_date", name="uq_stock_snapshots_product_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, nullable=False)
+    quantity = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # =====================================================
 # 🧾 ĐƠN HÀNG
 # =====================================================
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_status_date", "status", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"))
@@ -160,6 +223,47 @@ class Order(Base):
     product = relationship("Product", back_populates="orders")
 
 
+# =====================================================
+# 💹 BẢNG TỔNG HỢP DOANH THU (ROLLUP THEO NGÀY)
+#   Chỉ chứa đơn "Hoàn thành", cập nhật tăng dần khi
+#   đơn hàng vào / ra trạng thái hoàn thành
+# =====================================================
+class RevenueRollup(Base):
+    __tablename__ = "revenue_rollups"
+    # Unique key (COALESCE NULL → '' / 0): xem uq_revenue_rollups_key bên dưới
+    __table_args__ = (
+        Index("ix_revenue_rollups_year_month", "year", "month"),
+        Index("ix_revenue_rollups_day", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+
+    category = Column(String(100), nullable=True)
+    region = Column(String(100), nullable=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=True)
+
+    order_count = Column(Integer, default=0, nullable=False)
+    quantity = Column(Integer, default=0, nullable=False)
+    total = Column(Float, default=0, nullable=False)
+
+
+# NULL khác nhau trong UNIQUE thường → index trên COALESCE để khoá có
+# category / region / sản phẩm / khách rỗng cũng không bị trùng dòng
+Index(
+    "uq_revenue_rollups_key",
+    RevenueRollup.day,
+    func.coalesce(RevenueRollup.category, literal_column("''")),
+    func.coalesce(RevenueRollup.region, literal_column("''")),
+    func.coalesce(RevenueRollup.product_id, literal_column("0")),
+    func.coalesce(RevenueRollup.customer_id, literal_column("0")),
+    unique=True,
+)
+
+
 # =====================================================
 # 📈 BÁO CÁO
 # =====================================================
@@ -273,6 +377,9 @@ class EmailLog(Base):
 # =====================================================
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        Index("ix_attendance_employee_date", "employee_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -288,6 +395,57 @@ class Attendance(Base):
     employee = relationship("Employee", back_populates="attendances")
 
 
+# =====================================================
+# 💰 KỲ LƯƠNG & PHIẾU LƯƠNG (SNAPSHOT)
+#   Mỗi tháng tính 1 lần rồi đóng băng; đọc lương = đọc payslips.
+#   Kỳ "open" bị đánh dấu stale khi chấm công trong tháng thay đổi.
+# =====================================================
+class PayrollRun(Base):
+    __tablename__ = "payroll_runs"
+    __table_args__ = (
+        UniqueConstraint("year", "month", name="uq_payroll_runs_year_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+
+    status = Column(String(20), default="open", nullable=False)  # open / closed
+    stale = Column(Boolean, default=False, nullable=False)
+    employee_count = Column(Integer, default=0, nullable=False)
+    total_salary = Column(Integer, default=0, nullable=False)
+
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)
+
+    payslips = relationship("Payslip", back_populates="run", cascade="all, delete-orphan")
+
+
+class Payslip(Base):
+    __tablename__ = "payslips"
+    __table_args__ = (
+        UniqueConstraint("run_id", "employee_id", name="uq_payslips_run_employee"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("payroll_runs.id", ondelete="CASCADE"), nullable=False)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+
+    employee_name = Column(String(100), nullable=False)
+    department = Column(String(50), nullable=True)
+    position = Column(String(100), nullable=True)
+
+    base_salary = Column(Integer, nullable=False)
+    daily_salary = Column(Integer, nullable=False)
+    total_days = Column(Integer, default=0, nullable=False)
+    late = Column(Integer, default=0, nullable=False)
+    early = Column(Integer, default=0, nullable=False)
+    penalty = Column(Integer, default=0, nullable=False)
+    final_salary = Column(Integer, nullable=False)
+
+    run = relationship("PayrollRun", back_populates="payslips")
+
+
 # =====================================================
 # 🎁 PHÚC LỢI (BENEFITS)
 # =====================================================
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 
 from app import models, schemas, database
 from app.core.permissions import require_role
-from app.core.security import hash_password
+from app.core.security import hash_password, hash_password_async, invalidate_principal
 
 router = APIRouter(prefix="/admins", tags=["Admins"])
 get_db = database.get_db
@@ -39,12 +40,8 @@ def get_admin(
 # ============================================================
 # 🟨 TẠO USER (hash password + check trùng)
 # ============================================================
-@router.post("/", response_model=schemas.AdminOut)
-def create_admin(
-    admin: schemas.AdminCreate,
-    db: Session = Depends(get_db),
-    current_user=Depends(require_role(["admin"]))
-):
+def _check_new_admin(db: Session, admin: schemas.AdminCreate):
+    """Kiểm tra username / email trùng. Trả về email đã chuẩn hoá."""
     # check username trùng
     if db.query(models.Admin).filter(models.Admin.username == admin.username).first():
         raise HTTPException(status_code=400, detail="Tên đăng nhập đã tồn tại")
@@ -57,20 +54,36 @@ def create_admin(
         if db.query(models.Admin).filter(models.Admin.email == email).first():
             raise HTTPException(status_code=400, detail="Email đã tồn tại")
 
+    return email
+
+
+def _save(db: Session, user: models.Admin):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@router.post("/", response_model=schemas.AdminOut)
+async def create_admin(
+    admin: schemas.AdminCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role(["admin"]))
+):
+    # DB chạy trong threadpool, bcrypt chạy trên pool riêng (core.security)
+    email = await run_in_threadpool(_check_new_admin, db, admin)
+
     new_user = models.Admin(
         full_name=admin.full_name,
         username=admin.username,
         email=email,   # ⭐ email đã được xử lý ở trên
-        password=hash_password(admin.password),
+        password=await hash_password_async(admin.password),
         role=admin.role,
         is_active=admin.is_active,
         employee_id=admin.employee_id
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await run_in_threadpool(_save, db, new_user)
 
 
 # ============================================================
@@ -88,6 +101,7 @@ def update_admin(
         raise HTTPException(status_code=404, detail="Không tìm thấy người dùng")
 
     data = updated.dict(exclude_unset=True)
+    old_username = user.username
 
     # Nếu FE gửi password → hash lại
     if "password" in data and data["password"]:
@@ -110,6 +124,7 @@ def update_admin(
 
     db.commit()
     db.refresh(user)
+    invalidate_principal(old_username, user.username)
     return user
 
 
@@ -126,8 +141,10 @@ def delete_admin(
     if not user:
         raise HTTPException(status_code=404, detail="Không tìm thấy người dùng")
 
+    username = user.username
     db.delete(user)
     db.commit()
+    invalidate_principal(username)
     return {"message": "Xóa người dùng thành công"}
 
 
@@ -152,6 +169,7 @@ def update_active(
     user.is_active = is_active
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.username)
 
     return {"message": "Cập nhật trạng thái thành công"}
 
@@ -186,5 +204,6 @@ def update_role(
     user.role = role
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.username)
 
     return {"message": f"Đã cập nhật quyền thành '{role}'"}
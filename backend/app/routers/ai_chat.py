@@ -6,8 +6,10 @@
 
 from fastapi import APIRouter, Depends, Body
 from sqlalchemy.orm import Session
-from datetime import date, datetime
+from sqlalchemy import func, extract, and_
+from datetime import date
 from app import database, models
+from app.utils.intent_router import IntentRouter
 
 router = APIRouter(prefix="/ai", tags=["Trợ lý Tuấn AI"])
 
@@ -16,80 +18,69 @@ router = APIRouter(prefix="/ai", tags=["Trợ lý Tuấn AI"])
 # 🔧 HÀM TIỆN ÍCH
 # ==========================================================
 
-def normalize(text: str):
-    return text.lower().strip()
-
-def contains(text: str, *words):
-    return any(w in text for w in words)
-
 def suggest(*items):
     s = "• " + "\n• ".join(items)
     return f"\n\n👉 Bạn có thể hỏi thêm:\n{s}"
 
-def safe_total(o):
-    """Ưu tiên total → amount → 0"""
-    if hasattr(o, "total") and o.total:
-        return o.total
-    if hasattr(o, "amount") and o.amount:
-        return o.amount
-    return 0
-
 
 # ==========================================================
-# 📊 CHỈ LẤY ĐƠN HOÀN THÀNH
+# 📊 CHỈ TÍNH ĐƠN HOÀN THÀNH (lọc ngay trong SQL)
 # ==========================================================
 
-def completed_orders(db):
-    orders = db.query(models.Order).all()
-    result = []
+COMPLETED_STATUSES = ["hoàn thành", "completed", "thành công"]
+
 
-    for o in orders:
-        status = (o.status or "").lower()
-        if status in ["hoàn thành", "completed", "thành công"]:
-            result.append(o)
+def is_completed():
+    return func.lower(models.Order.status).in_(COMPLETED_STATUSES)
 
-    return result
+
+def count_completed_orders(db):
+    return db.query(func.count(models.Order.id)).filter(is_completed()).scalar() or 0
 
 
 # ==========================================================
-# 📊 DOANH THU
+# 📊 DOANH THU — mỗi hàm đúng 1 câu SQL tổng hợp
 # ==========================================================
 
+def _sum_amount(db, *conditions):
+    return float(
+        db.query(func.coalesce(func.sum(models.Order.amount), 0))
+        .filter(is_completed(), *conditions)
+        .scalar()
+        or 0
+    )
+
+
 def get_revenue_total(db):
     """Chỉ tính đơn hoàn thành"""
-    orders = completed_orders(db)
-    return sum(safe_total(o) for o in orders)
+    return _sum_amount(db)
 
 
 def get_revenue_monthly(db):
-    orders = completed_orders(db)
-    monthly = {}
-
-    for o in orders:
-        if not getattr(o, "date", None):
-            continue
-
-        m = o.date.month
-        monthly[m] = monthly.get(m, 0) + safe_total(o)
-
-    return monthly
+    """{(năm, tháng): doanh thu}"""
+    year_col = extract("year", models.Order.date)
+    month_col = extract("month", models.Order.date)
+
+    rows = (
+        db.query(year_col, month_col, func.sum(models.Order.amount))
+        .filter(is_completed(), models.Order.date.isnot(None))
+        .group_by(year_col, month_col)
+        .order_by(year_col, month_col)
+        .all()
+    )
+    return {(int(y), int(m)): float(v or 0) for y, m, v in rows}
 
 
 def get_revenue_today(db):
-    today = date.today()
-    orders = completed_orders(db)
-    return sum(
-        safe_total(o) for o in orders
-        if o.date and o.date == today
-    )
+    return _sum_amount(db, models.Order.date == date.today())
 
 
 def get_revenue_year(db):
     year = date.today().year
-    orders = completed_orders(db)
-    return sum(
-        safe_total(o) for o in orders
-        if o.date and o.date.year == year
+    return _sum_amount(
+        db,
+        models.Order.date >= date(year, 1, 1),
+        models.Order.date <= date(year, 12, 31),
     )
 
 
@@ -98,23 +89,19 @@ def get_revenue_year(db):
 # ==========================================================
 
 def get_top_products(db, limit=3):
-    prods = db.query(models.Product).all()
-    orders = completed_orders(db)
-
-    count = {}
-    for o in orders:
-        pid = o.product_id
-        count[pid] = count.get(pid, 0) + 1
-
-    result = []
-    for p in prods:
-        result.append({
-            "name": p.name,
-            "sold": count.get(p.id, 0)
-        })
-
-    result.sort(key=lambda x: x["sold"], reverse=True)
-    return result[:limit]
+    sold = func.count(models.Order.id)
+    rows = (
+        db.query(models.Product.name, sold)
+        .outerjoin(
+            models.Order,
+            and_(models.Order.product_id == models.Product.id, is_completed()),
+        )
+        .group_by(models.Product.id, models.Product.name)
+        .order_by(sold.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{"name": name, "sold": int(n or 0)} for name, n in rows]
 
 
 # ==========================================================
@@ -122,202 +109,227 @@ def get_top_products(db, limit=3):
 # ==========================================================
 
 def get_top_customers(db, limit=3):
-    customers = db.query(models.Customer).all()
-    orders = completed_orders(db)
+    spent = func.coalesce(func.sum(models.Order.amount), 0)
+    rows = (
+        db.query(models.Customer.name, spent)
+        .outerjoin(
+            models.Order,
+            and_(models.Order.customer_id == models.Customer.id, is_completed()),
+        )
+        .group_by(models.Customer.id, models.Customer.name)
+        .order_by(spent.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{"name": name, "spent": float(v or 0)} for name, v in rows]
 
-    money = {}
-    for o in orders:
-        cid = o.customer_id
-        money[cid] = money.get(cid, 0) + safe_total(o)
 
-    result = []
-    for c in customers:
-        result.append({
-            "name": c.name,
-            "spent": money.get(c.id, 0)
-        })
+# ==========================================================
+# 🔢 ĐẾM
+# ==========================================================
 
-    result.sort(key=lambda x: x["spent"], reverse=True)
-    return result[:limit]
+def count_of(db, column):
+    return db.query(func.count(column)).scalar() or 0
 
 
 # ==========================================================
-# 🤖 CHATBOT CHÍNH
+# 🧭 ĐĂNG KÝ Ý ĐỊNH
+#   Thứ tự đăng ký = thứ tự ưu tiên (ý định cụ thể đứng trước).
+#   Từ khoá so khớp không phân biệt dấu: "doanh thu" = "doanh thu".
 # ==========================================================
 
-@router.post("/chat")
-def ai_chat(prompt: str = Body(..., embed=True),
-            db: Session = Depends(database.get_db)):
+intents = IntentRouter()
 
-    p = normalize(prompt)
 
-    # THỐNG KÊ
-    orders_done = completed_orders(db)
-    revenue_total = get_revenue_total(db)
+# ----------------------------------------------------------
+# 1. Hôm nay
+# ----------------------------------------------------------
+
+@intents.intent("today", "hôm nay", "today")
+def reply_today(db):
+    today = date.today().strftime("%d/%m/%Y")
     revenue_today = get_revenue_today(db)
-    revenue_year = get_revenue_year(db)
+    return {
+        "reply": (
+            f"📅 Hôm nay là **{today}**.\n"
+            f"💰 Doanh thu hôm nay: **{revenue_today:,.0f} VNĐ**."
+            + suggest("Doanh thu tháng này?", "Có bao nhiêu đơn hôm nay?")
+        )
+    }
 
-    employees_count = db.query(models.Employee).count()
-    customers_count = db.query(models.Customer).count()
-    products_count = db.query(models.Product).count()
 
-    today = date.today().strftime("%d/%m/%Y")
+# ----------------------------------------------------------
+# 2. Doanh thu theo tháng
+# ----------------------------------------------------------
 
-    # ----------------------------------------------------------
-    # 1. Chào hỏi
-    # ----------------------------------------------------------
+@intents.intent("revenue_monthly", "theo tháng", "từng tháng", "doanh thu tháng")
+def reply_revenue_monthly(db):
+    monthly = get_revenue_monthly(db)
 
-    if contains(p, "chào", "hello", "hi", "hey"):
-        return {
-            "reply": (
-                "Xin chào 👋! Tôi là **Trợ lý Tuấn AI**.\n"
-                "Tôi có thể giúp bạn xem doanh thu, đơn hàng, khách hàng, sản phẩm, kho…"
-                + suggest("Doanh thu hiện tại?", "Bao nhiêu đơn hoàn thành?")
-            )
-        }
-
-    # ----------------------------------------------------------
-    # 2. Hôm nay
-    # ----------------------------------------------------------
-
-    if contains(p, "hôm nay", "today"):
-        return {
-            "reply": (
-                f"📅 Hôm nay là **{today}**.\n"
-                f"💰 Doanh thu hôm nay: **{revenue_today:,.0f} VNĐ**."
-                + suggest("Doanh thu tháng này?", "Có bao nhiêu đơn hôm nay?")
-            )
-        }
-
-    # ----------------------------------------------------------
-    # 3. Doanh thu tổng
-    # ----------------------------------------------------------
-
-    if contains(p, "doanh thu", "revenue"):
-        return {
-            "reply": (
-                f"💰 **Doanh thu tích lũy (đơn hoàn thành): {revenue_total:,.0f} VNĐ**.\n"
-                + suggest(
-                    "Doanh thu hôm nay?",
-                    "Doanh thu theo từng tháng?",
-                    "Doanh thu năm nay?",
-                    "Top khách hàng chi nhiều?"
-                )
-            )
-        }
+    if not monthly:
+        return { "reply": "Hiện chưa có đơn hoàn thành nào để thống kê theo tháng." }
+
+    text = "📊 **Doanh thu theo từng tháng:**\n"
+    for (y, m), v in sorted(monthly.items()):
+        text += f"- Tháng {m}/{y}: **{v:,.0f} VNĐ**\n"
 
-    # ----------------------------------------------------------
-    # 4. Doanh thu theo tháng
-    # ----------------------------------------------------------
+    return {"reply": text}
 
-    if contains(p, "theo tháng", "doanh thu tháng"):
-        monthly = get_revenue_monthly(db)
 
-        if not monthly:
-            return { "reply": "Hiện chưa có đơn hoàn thành nào để thống kê theo tháng." }
+# ----------------------------------------------------------
+# 3. Doanh thu năm nay
+# ----------------------------------------------------------
 
-        text = "📊 **Doanh thu theo từng tháng:**\n"
-        for m, v in sorted(monthly.items()):
-            text += f"- Tháng {m}: **{v:,.0f} VNĐ**\n"
+@intents.intent("revenue_year", "năm nay", "doanh thu năm")
+def reply_revenue_year(db):
+    revenue_year = get_revenue_year(db)
+    return {
+        "reply": (
+            f"📆 **Doanh thu năm nay** là **{revenue_year:,.0f} VNĐ**."
+            + suggest("Doanh thu theo tháng?", "Top sản phẩm bán chạy?")
+        )
+    }
 
-        return {"reply": text}
 
-    # ----------------------------------------------------------
-    # 5. Doanh thu năm nay
-    # ----------------------------------------------------------
+# ----------------------------------------------------------
+# 4. Doanh thu tổng
+# ----------------------------------------------------------
 
-    if contains(p, "năm nay", "doanh thu năm"):
-        return {
-            "reply": (
-                f"📆 **Doanh thu năm nay** là **{revenue_year:,.0f} VNĐ**."
-                + suggest("Doanh thu theo tháng?", "Top sản phẩm bán chạy?")
-            )
-        }
-
-    # ----------------------------------------------------------
-    # 6. Đơn hàng
-    # ----------------------------------------------------------
-
-    if contains(p, "đơn hoàn thành", "đơn thành công"):
-        return {
-            "reply": f"📦 Tổng số đơn hoàn thành: **{len(orders_done)}**."
-        }
-
-    if contains(p, "đơn hàng", "order"):
-        total = db.query(models.Order).count()
-        return {
-            "reply": (
-                f"📦 Tổng đơn hàng: **{total}**\n"
-                f"✔ Đơn hoàn thành: **{len(orders_done)}**"
-                + suggest("Doanh thu từ đơn hoàn thành?", "Top sản phẩm bán chạy?")
-            )
-        }
-
-    # ----------------------------------------------------------
-    # 7. Sản phẩm
-    # ----------------------------------------------------------
-
-    if contains(p, "sản phẩm bán chạy", "top sản phẩm"):
-        top = get_top_products(db)
-        text = "🔥 **Top sản phẩm bán chạy:**\n"
-        for i, t in enumerate(top, 1):
-            text += f"{i}. {t['name']} — {t['sold']} lượt mua\n"
-        return {"reply": text}
-
-    if contains(p, "sản phẩm", "product"):
-        return {
-            "reply": (
-                f"📦 Hệ thống đang quản lý **{products_count} sản phẩm**."
-                + suggest("Sản phẩm bán chạy?", "Sản phẩm còn hàng?")
-            )
-        }
-
-    # ----------------------------------------------------------
-    # 8. Khách hàng
-    # ----------------------------------------------------------
-
-    if contains(p, "top khách", "khách chi nhiều"):
-        top = get_top_customers(db)
-        text = "👑 **Top khách hàng chi nhiều nhất:**\n"
-        for i, t in enumerate(top, 1):
-            text += f"{i}. {t['name']} — {t['spent']:,.0f} VNĐ\n"
-        return {"reply": text}
-
-    if contains(p, "khách hàng", "customer"):
-        return {
-            "reply": (
-                f"Hệ thống hiện có **{customers_count} khách hàng** 👥."
-                + suggest("Top khách hàng chi nhiều?", "Khách hàng mới nhất?")
+@intents.intent("revenue_total", "doanh thu", "revenue")
+def reply_revenue_total(db):
+    revenue_total = get_revenue_total(db)
+    return {
+        "reply": (
+            f"💰 **Doanh thu tích lũy (đơn hoàn thành): {revenue_total:,.0f} VNĐ**.\n"
+            + suggest(
+                "Doanh thu hôm nay?",
+                "Doanh thu theo từng tháng?",
+                "Doanh thu năm nay?",
+                "Top khách hàng chi nhiều?"
             )
-        }
+        )
+    }
 
-    # ----------------------------------------------------------
-    # 9. Nhân viên
-    # ----------------------------------------------------------
 
-    if contains(p, "nhân viên", "employee", "staff"):
-        return {
-            "reply": (
-                f"👨‍💼 Công ty hiện có **{employees_count} nhân viên**."
-                + suggest("Danh sách nhân viên?", "Nhân viên mới?")
-            )
-        }
+# ----------------------------------------------------------
+# 5. Đơn hàng
+# ----------------------------------------------------------
 
-    # ----------------------------------------------------------
-    # 10. Cảm ơn – tạm biệt
-    # ----------------------------------------------------------
+@intents.intent("orders_completed", "đơn hoàn thành", "đơn thành công")
+def reply_orders_completed(db):
+    return {
+        "reply": f"📦 Tổng số đơn hoàn thành: **{count_completed_orders(db)}**."
+    }
+
+
+@intents.intent("orders", "đơn hàng", "order", "orders")
+def reply_orders(db):
+    total, done = db.query(
+        func.count(models.Order.id),
+        func.count(models.Order.id).filter(is_completed()),
+    ).one()
+    return {
+        "reply": (
+            f"📦 Tổng đơn hàng: **{total}**\n"
+            f"✔ Đơn hoàn thành: **{done}**"
+            + suggest("Doanh thu từ đơn hoàn thành?", "Top sản phẩm bán chạy?")
+        )
+    }
+
+
+# ----------------------------------------------------------
+# 6. Sản phẩm
+# ----------------------------------------------------------
+
+@intents.intent("top_products", "sản phẩm bán chạy", "top sản phẩm", "bán chạy")
+def reply_top_products(db):
+    top = get_top_products(db)
+    text = "🔥 **Top sản phẩm bán chạy:**\n"
+    for i, t in enumerate(top, 1):
+        text += f"{i}. {t['name']} — {t['sold']} lượt mua\n"
+    return {"reply": text}
+
+
+@intents.intent("products", "sản phẩm", "product", "products")
+def reply_products(db):
+    products_count = count_of(db, models.Product.id)
+    return {
+        "reply": (
+            f"📦 Hệ thống đang quản lý **{products_count} sản phẩm**."
+            + suggest("Sản phẩm bán chạy?", "Sản phẩm còn hàng?")
+        )
+    }
+
+
+# ----------------------------------------------------------
+# 7. Khách hàng
+# ----------------------------------------------------------
+
+@intents.intent("top_customers", "top khách", "khách chi nhiều")
+def reply_top_customers(db):
+    top = get_top_customers(db)
+    text = "👑 **Top khách hàng chi nhiều nhất:**\n"
+    for i, t in enumerate(top, 1):
+        text += f"{i}. {t['name']} — {t['spent']:,.0f} VNĐ\n"
+    return {"reply": text}
+
+
+@intents.intent("customers", "khách hàng", "customer", "customers")
+def reply_customers(db):
+    customers_count = count_of(db, models.Customer.id)
+    return {
+        "reply": (
+            f"Hệ thống hiện có **{customers_count} khách hàng** 👥."
+            + suggest("Top khách hàng chi nhiều?", "Khách hàng mới nhất?")
+        )
+    }
 
-    if contains(p, "cảm ơn", "thanks"):
-        return { "reply": "Không có gì ạ 😊. Tôi luôn sẵn sàng hỗ trợ bạn!" }
 
-    if contains(p, "tạm biệt", "bye"):
-        return { "reply": "Tạm biệt 👋. Chúc bạn một ngày làm việc hiệu quả!" }
+# ----------------------------------------------------------
+# 8. Nhân viên
+# ----------------------------------------------------------
 
+@intents.intent("employees", "nhân viên", "employee", "employees", "staff")
+def reply_employees(db):
+    employees_count = count_of(db, models.Employee.id)
+    return {
+        "reply": (
+            f"👨‍💼 Công ty hiện có **{employees_count} nhân viên**."
+            + suggest("Danh sách nhân viên?", "Nhân viên mới?")
+        )
+    }
+
+
+# ----------------------------------------------------------
+# 9. Cảm ơn – tạm biệt – chào hỏi
+# ----------------------------------------------------------
+
+@intents.intent("thanks", "cảm ơn", "thanks", "thank you")
+def reply_thanks(db):
+    return { "reply": "Không có gì ạ 😊. Tôi luôn sẵn sàng hỗ trợ bạn!" }
+
+
+@intents.intent("bye", "tạm biệt", "bye")
+def reply_bye(db):
+    return { "reply": "Tạm biệt 👋. Chúc bạn một ngày làm việc hiệu quả!" }
+
+
+@intents.intent("greeting", "chào", "hello", "hi", "hey")
+def reply_greeting(db):
+    return {
+        "reply": (
+            "Xin chào 👋! Tôi là **Trợ lý Tuấn AI**.\n"
+            "Tôi có thể giúp bạn xem doanh thu, đơn hàng, khách hàng, sản phẩm, kho…"
+            + suggest("Doanh thu hiện tại?", "Bao nhiêu đơn hoàn thành?")
+        )
+    }
 
-    # ----------------------------------------------------------
-    # ❓ FALLBACK
-    # ----------------------------------------------------------
 
+# ----------------------------------------------------------
+# ❓ FALLBACK
+# ----------------------------------------------------------
+
+def reply_fallback(db):
     return {
         "reply": (
             "Tôi chưa hiểu rõ câu hỏi của bạn 😅.\n"
@@ -325,3 +337,15 @@ def ai_chat(prompt: str = Body(..., embed=True),
             + suggest("Doanh thu hiện tại?", "Top khách hàng?", "Sản phẩm bán chạy?")
         )
     }
+
+
+# ==========================================================
+# 🤖 CHATBOT CHÍNH
+# ==========================================================
+
+@router.post("/chat")
+def ai_chat(prompt: str = Body(..., embed=True),
+            db: Session = Depends(database.get_db)):
+
+    # Chỉ handler của ý định khớp mới chạy truy vấn
+    return intents.dispatch(prompt, db, fallback=reply_fallback)
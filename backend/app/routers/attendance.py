@@ -1,17 +1,15 @@
 # app/routers/attendance.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
 from datetime import date, datetime, time
-from io import BytesIO
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models import Employee, Attendance
 from app.schemas import AttendanceOut
-import openpyxl
+from app.utils.dates import resolve_range, apply_range
+from app.utils import excel_export, home_cache, payroll
 
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
 
@@ -92,8 +90,10 @@ def check_in(
         record.check_in = now
 
     record.status = calculate_status(record.check_in, record.check_out)
+    payroll.invalidate(db, record.date)
 
     db.commit()
+    home_cache.invalidate(employee_id)
     db.refresh(record)
 
     return AttendanceOut(
@@ -130,8 +130,10 @@ def check_out(
 
     record.check_out = datetime.now().time()
     record.status = calculate_status(record.check_in, record.check_out)
+    payroll.invalidate(db, record.date)
 
     db.commit()
+    home_cache.invalidate(employee_id)
     db.refresh(record)
 
     return AttendanceOut(
@@ -165,8 +167,10 @@ def update_attendance(
         record.check_out = datetime.strptime(data["check_out"], "%H:%M").time()
 
     record.status = calculate_status(record.check_in, record.check_out)
+    payroll.invalidate(db, record.date)
 
     db.commit()
+    home_cache.invalidate(record.employee_id)
     db.refresh(record)
 
     return {"message": "Đã cập nhật", "attendance": record.id}
@@ -182,26 +186,33 @@ def delete_attendance(attendance_id: int, db: Session = Depends(get_db)):
     if not record:
         raise HTTPException(404, "Không tìm thấy bản ghi để xoá")
 
+    payroll.invalidate(db, record.date)
     db.delete(record)
     db.commit()
+    home_cache.invalidate(record.employee_id)
 
     return {"message": "Xoá thành công"}
 
 
 # ================================
 # 📌 Lấy lịch sử theo tháng
+# /attendance/monthly/1?year=2025&month=1
+# /attendance/monthly/1?from=2025-01-01&to=2025-03-31
 # ================================
 @router.get("/monthly/{employee_id}", response_model=List[AttendanceOut])
 def get_monthly_attendance(
-    employee_id: int, year: int, month: int, db: Session = Depends(get_db)
+    employee_id: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
 ):
+    start, end = resolve_range(year, month, date_from, date_to, required=True)
+
+    query = db.query(Attendance).filter(Attendance.employee_id == employee_id)
     records = (
-        db.query(Attendance)
-        .filter(
-            Attendance.employee_id == employee_id,
-            extract("year", Attendance.date) == year,
-            extract("month", Attendance.date) == month,
-        )
+        apply_range(query, Attendance.date, start, end)
         .order_by(Attendance.date.asc())
         .all()
     )
@@ -230,40 +241,31 @@ def export_attendance_excel(
     if not emp:
         raise HTTPException(404, "Nhân viên không tồn tại")
 
-    records = (
-        db.query(Attendance)
-        .filter(
-            Attendance.employee_id == employee_id,
-            extract("year", Attendance.date) == year,
-            extract("month", Attendance.date) == month,
-        )
-        .order_by(Attendance.date.asc())
-        .all()
+    start, end = resolve_range(year, month, required=True)
+
+    # Chỉ lấy các cột cần ghi, duyệt theo lô (server-side cursor)
+    query = db.query(
+        Attendance.date, Attendance.check_in, Attendance.check_out, Attendance.status
+    ).filter(Attendance.employee_id == employee_id)
+    records = excel_export.stream_rows(
+        apply_range(query, Attendance.date, start, end).order_by(Attendance.date.asc())
     )
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Attendance"
+    wb = excel_export.new_workbook()
+    ws = excel_export.add_sheet(wb, "Attendance")
     ws.append(["Ngày", "Giờ vào", "Giờ ra", "Trạng thái"])
 
-    for r in records:
-        ws.append(
-            [
-                r.date.strftime("%Y-%m-%d"),
-                r.check_in.strftime("%H:%M:%S") if r.check_in else "",
-                r.check_out.strftime("%H:%M:%S") if r.check_out else "",
-                r.status,
-            ]
-        )
-
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
+    excel_export.write_rows(
+        ws,
+        records,
+        to_row=lambda r: [
+            r.date.strftime("%Y-%m-%d"),
+            r.check_in.strftime("%H:%M:%S") if r.check_in else "",
+            r.check_out.strftime("%H:%M:%S") if r.check_out else "",
+            r.status,
+        ],
+    )
 
     filename = f"attendance_{employee_id}_{year}_{month}.xlsx"
 
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return excel_export.excel_response(wb, filename)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import jwt
 
 from app import models, database, schemas
+from app.core.permissions import require_role
+from app.core.security import hash_password_async, password_hash_stats, verify_password_async
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 get_db = database.get_db
@@ -16,23 +18,6 @@ SECRET_KEY = "secret-key-demo"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-# ==============================
-# PASSWORD HELPERS
-# ==============================
-def verify_password(plain_password, hashed_password):
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception:
-        return False
-
-
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-
 # ==============================
 # JWT TOKEN
 # ==============================
@@ -45,17 +30,28 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# ==============================
+# DB HELPERS (chạy trong threadpool — route async không gọi DB trực tiếp)
+# ==============================
+def _find_user(db: Session, username: str):
+    return db.query(models.Admin).filter(models.Admin.username == username).first()
+
+
+def _save(db: Session, obj):
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+    return obj
+
+
 # ==============================
 # LOGIN
+#   async: bcrypt chạy trên pool riêng (core.security), route chỉ await
 # ==============================
 @router.post("/login")
-def login(user: schemas.LoginUser, db: Session = Depends(get_db)):
+async def login(user: schemas.LoginUser, db: Session = Depends(get_db)):
 
-    db_user = (
-        db.query(models.Admin)
-        .filter(models.Admin.username == user.username)
-        .first()
-    )
+    db_user = await run_in_threadpool(_find_user, db, user.username)
 
     if not db_user:
         raise HTTPException(status_code=404, detail="Tài khoản không tồn tại")
@@ -63,7 +59,7 @@ def login(user: schemas.LoginUser, db: Session = Depends(get_db)):
     if not db_user.is_active:
         raise HTTPException(status_code=403, detail="Tài khoản đã bị khóa")
 
-    if not verify_password(user.password, db_user.password):
+    if not await verify_password_async(user.password, db_user.password):
         raise HTTPException(status_code=401, detail="Sai mật khẩu")
 
     token = create_access_token({
@@ -86,8 +82,8 @@ def login(user: schemas.LoginUser, db: Session = Depends(get_db)):
 # (1) Tự đăng ký → không cần employee_id
 # (2) Admin tạo tài khoản nhân viên → cần employee_id
 # ==============================
-@router.post("/register", response_model=schemas.AdminOut)
-def register(data: schemas.RegisterUser, db: Session = Depends(get_db)):
+def _register_target(db: Session, data: schemas.RegisterUser):
+    """Kiểm tra trùng + xác định role / employee_id. Trả về (email, role, employee_id)."""
 
     # Kiểm tra username có tồn tại không
     if db.query(models.Admin).filter(models.Admin.username == data.username).first():
@@ -128,19 +124,30 @@ def register(data: schemas.RegisterUser, db: Session = Depends(get_db)):
             # manager / admin
             final_employee_id = None
 
+    return email, final_role, final_employee_id
+
+
+@router.post("/register", response_model=schemas.AdminOut)
+async def register(data: schemas.RegisterUser, db: Session = Depends(get_db)):
+    email, final_role, final_employee_id = await run_in_threadpool(_register_target, db, data)
+
     # Tạo user
     new_user = models.Admin(
         full_name=data.full_name,
         username=data.username,
         email=email,
-        password=hash_password(data.password),
+        password=await hash_password_async(data.password),
         role=final_role,
         employee_id=final_employee_id,
         is_active=True
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    return await run_in_threadpool(_save, db, new_user)
 
-    return new_user
+
+# ==============================
+# THỐNG KÊ POOL BCRYPT (độ sâu hàng đợi, thời gian chờ)
+# ==============================
+@router.get("/password-hash-stats")
+def get_password_hash_stats(current_user=Depends(require_role(["admin"]))):
+    return password_hash_stats()
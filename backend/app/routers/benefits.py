@@ -5,6 +5,7 @@ from datetime import date
 
 from app.database import get_db
 from app.models import BenefitProgram, BenefitRegistration
+from app.utils import home_cache
 from app.schemas import (
     BenefitProgramOut,
     BenefitProgramCreate,
@@ -83,6 +84,7 @@ def update_benefit(benefit_id: int, data: BenefitProgramUpdate, db: Session = De
         setattr(program, field, value)
 
     db.commit()
+    home_cache.clear()
     db.refresh(program)
 
     return BenefitProgramOut(
@@ -102,6 +104,7 @@ def delete_benefit(benefit_id: int, db: Session = Depends(get_db)):
 
     db.delete(program)
     db.commit()
+    home_cache.clear()
     return {"message": "Đã xoá chương trình phúc lợi"}
 
 
@@ -143,6 +146,7 @@ def register_benefit(benefit_id: int, employee_id: int, db: Session = Depends(ge
     )
     db.add(reg)
     db.commit()
+    home_cache.invalidate(employee_id)
     db.refresh(reg)
     return reg
 
@@ -166,4 +170,5 @@ def cancel_registration(benefit_id: int, employee_id: int, db: Session = Depends
 
     reg.status = "cancelled"
     db.commit()
+    home_cache.invalidate(employee_id)
     return {"message": "Đã hủy đăng ký thành công"}
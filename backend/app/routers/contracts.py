@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Contract
 from app.schemas import ContractCreate, ContractResponse
+from app.utils import home_cache
 
 router = APIRouter(prefix="/contracts", tags=["contracts"])
 
@@ -42,6 +43,7 @@ def create_contract(payload: ContractCreate, db: Session = Depends(get_db)):
 
     db.add(new_c)
     db.commit()
+    home_cache.invalidate(payload.employee_id)
     db.refresh(new_c)
     return new_c
 
@@ -56,4 +58,5 @@ def end_contract(contract_id: int, db: Session = Depends(get_db)):
     if c:
         c.status = "ended"
         db.commit()
+        home_cache.invalidate(c.employee_id)
     return {"message": "ok"}
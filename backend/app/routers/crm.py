@@ -96,9 +96,8 @@ def delete_note(note_id: int, db: Session = Depends(get_db)):
 
 
 # ==================== EXPORT PDF CHUẨN ĐẸP ====================
-@router.get("/customers/{customer_id}/export-pdf")
-def export_customer_pdf(customer_id: int, db: Session = Depends(get_db)):
-
+def render_customer_pdf(db: Session, customer_id: int, file_path: str):
+    """Dựng file PDF hồ sơ khách hàng tại file_path."""
     customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
     if not customer:
         raise HTTPException(404, "Không tìm thấy khách hàng")
@@ -117,10 +116,6 @@ def export_customer_pdf(customer_id: int, db: Session = Depends(get_db)):
         .all()
     )
 
-    TMP_DIR = "tmp"
-    os.makedirs(TMP_DIR, exist_ok=True)
-    file_path = f"{TMP_DIR}/customer_{customer_id}.pdf"
-
     doc = SimpleDocTemplate(
         file_path,
         pagesize=A4,
@@ -188,4 +183,14 @@ def export_customer_pdf(customer_id: int, db: Session = Depends(get_db)):
 
     doc.build(story)
 
+
+@router.get("/customers/{customer_id}/export-pdf")
+def export_customer_pdf(customer_id: int, db: Session = Depends(get_db)):
+
+    TMP_DIR = "tmp"
+    os.makedirs(TMP_DIR, exist_ok=True)
+    file_path = f"{TMP_DIR}/customer_{customer_id}.pdf"
+
+    render_customer_pdf(db, customer_id, file_path)
+
     return FileResponse(file_path, media_type="application/pdf", filename=f"customer_{customer_id}.pdf")
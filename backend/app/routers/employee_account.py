@@ -1,30 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
 from app import models, database
+from app.core.security import hash_password_async
 
 router = APIRouter(prefix="/employee-account", tags=["Employee Account"])
 get_db = database.get_db
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-
 # ============================================================
 # 🟩 TẠO TÀI KHOẢN CHO NHÂN VIÊN
 # ============================================================
-@router.post("/{employee_id}")
-def create_employee_account(employee_id: int, data: dict, db: Session = Depends(get_db)):
-    username = data.get("username")
-    password = data.get("password")
-    email = data.get("email")
-
-    if not username or not password:
-        raise HTTPException(status_code=400, detail="Thiếu username hoặc password")
-
+def _check_account(db: Session, employee_id: int, username: str, email):
+    """Kiểm tra nhân viên tồn tại + username / email chưa dùng. Trả về nhân viên."""
     # Check employee tồn tại
     emp = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
     if not emp:
@@ -38,18 +26,36 @@ def create_employee_account(employee_id: int, data: dict, db: Session = Depends(
     if email and db.query(models.Admin).filter(models.Admin.email == email).first():
         raise HTTPException(status_code=400, detail="Email đã tồn tại")
 
+    return emp
+
+
+def _save(db: Session, acc: models.Admin):
+    db.add(acc)
+    db.commit()
+
+
+@router.post("/{employee_id}")
+async def create_employee_account(employee_id: int, data: dict, db: Session = Depends(get_db)):
+    username = data.get("username")
+    password = data.get("password")
+    email = data.get("email")
+
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="Thiếu username hoặc password")
+
+    # DB chạy trong threadpool, bcrypt chạy trên pool riêng (core.security)
+    emp = await run_in_threadpool(_check_account, db, employee_id, username, email)
+
     acc = models.Admin(
         full_name=emp.name,
         username=username,
         email=email,
-        password=hash_password(password),
+        password=await hash_password_async(password),
         role="employee",
         is_active=True,
         employee_id=employee_id
     )
 
-    db.add(acc)
-    db.commit()
-    db.refresh(acc)
+    await run_in_threadpool(_save, db, acc)
 
     return {"message": "Tạo tài khoản nhân viên thành công", "username": username}
@@ -1,8 +1,11 @@
+from collections import Counter
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
 from datetime import date
 
+from app.core.permissions import require_role
 from app.database import get_db
 from app.models import (
     Employee,
@@ -11,33 +14,76 @@ from app.models import (
     BenefitProgram,
     Contract,
     Notification,
-    Product,
     Task,
 )
+from app.utils import home_cache
+from app.utils.dates import month_range
+from app.utils.low_stock import low_stock_products
 
 router = APIRouter(prefix="/employee-home", tags=["Employee Home"])
 
 
-@router.get("/{employee_id}")
-def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
-    today = date.today()
+def _employee_part(db: Session, employee_id: int, today: date):
+    """Phần riêng của nhân viên (được cache theo employee_id, xem utils/home_cache)."""
 
     # =========================
-    # 1. NHÂN VIÊN
+    # 1. NHÂN VIÊN + KPI THÁNG NÀY (GROUP BY trong SQL, không nạp từng dòng)
     # =========================
-    emp = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not emp:
+    month_start, month_end = month_range(today.year, today.month)
+
+    kpi_sq = (
+        db.query(
+            Attendance.employee_id.label("employee_id"),
+            func.count().label("total_days"),
+            func.count().filter(Attendance.status == "Late").label("late_days"),
+            func.count().filter(Attendance.status == "Early").label("early_days"),
+            func.count().filter(Attendance.status == "On time").label("ontime_days"),
+        )
+        .filter(
+            Attendance.employee_id == employee_id,
+            Attendance.date >= month_start,
+            Attendance.date <= month_end,
+        )
+        .group_by(Attendance.employee_id)
+        .subquery()
+    )
+
+    row = (
+        db.query(
+            Employee,
+            kpi_sq.c.total_days,
+            kpi_sq.c.late_days,
+            kpi_sq.c.early_days,
+            kpi_sq.c.ontime_days,
+        )
+        .outerjoin(kpi_sq, kpi_sq.c.employee_id == Employee.id)
+        .filter(Employee.id == employee_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(404, "Không tìm thấy nhân viên")
 
+    emp = row[0]
+    kpi = {
+        "total_days": row.total_days or 0,
+        "late_days": row.late_days or 0,
+        "early_days": row.early_days or 0,
+        "ontime_days": row.ontime_days or 0,
+    }
+
     # =========================
-    # 2. CHẤM CÔNG HÔM NAY
+    # 2 + 3. LỊCH SỬ CHẤM CÔNG (7 NGÀY) — bản ghi hôm nay nằm đầu danh sách
     # =========================
-    att_today = (
+    history_rows = (
         db.query(Attendance)
-        .filter(Attendance.employee_id == employee_id, Attendance.date == today)
-        .first()
+        .filter(Attendance.employee_id == employee_id, Attendance.date <= today)
+        .order_by(Attendance.date.desc())
+        .limit(7)
+        .all()
     )
 
+    att_today = history_rows[0] if history_rows and history_rows[0].date == today else None
+
     attendance_today = (
         {
             "date": att_today.date,
@@ -49,67 +95,33 @@ def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
         else None
     )
 
-    # =========================
-    # 3. LỊCH SỬ CHẤM CÔNG (7 NGÀY)
-    # =========================
-    history_rows = (
-        db.query(Attendance)
-        .filter(Attendance.employee_id == employee_id)
-        .order_by(Attendance.date.desc())
-        .limit(7)
-        .all()
-    )
-
     attendance_history = [
         {"date": str(r.date), "status": r.status} for r in history_rows
     ]
 
     # =========================
-    # 4. KPI THÁNG NÀY
+    # 5. PHÚC LỢI ĐÃ ĐĂNG KÝ (JOIN chương trình, 1 query)
     # =========================
-    year, month = today.year, today.month
-
-    month_rows = (
-        db.query(Attendance)
-        .filter(
-            Attendance.employee_id == employee_id,
-            extract("year", Attendance.date) == year,
-            extract("month", Attendance.date) == month,
-        )
-        .all()
-    )
-
-    kpi = {
-        "total_days": len(month_rows),
-        "late_days": sum(1 for r in month_rows if r.status == "Late"),
-        "early_days": sum(1 for r in month_rows if r.status == "Early"),
-        "ontime_days": sum(1 for r in month_rows if r.status == "On time"),
-    }
-
-    # =========================
-    # 5. PHÚC LỢI ĐÃ ĐĂNG KÝ
-    # =========================
-    regs = (
-        db.query(BenefitRegistration)
+    benefit_rows = (
+        db.query(BenefitProgram)
+        .join(BenefitRegistration, BenefitRegistration.benefit_id == BenefitProgram.id)
         .filter(
             BenefitRegistration.employee_id == employee_id,
             BenefitRegistration.status == "registered",
         )
+        .order_by(BenefitRegistration.id)
         .all()
     )
 
-    benefits = []
-    for r in regs:
-        p = db.query(BenefitProgram).filter(BenefitProgram.id == r.benefit_id).first()
-        if p:
-            benefits.append(
-                {
-                    "id": p.id,
-                    "title": p.title,
-                    "registration_end": str(p.registration_end),
-                    "location": p.location,
-                }
-            )
+    benefits = [
+        {
+            "id": p.id,
+            "title": p.title,
+            "registration_end": str(p.registration_end),
+            "location": p.location,
+        }
+        for p in benefit_rows
+    ]
 
     # =========================
     # 6. HỢP ĐỒNG LAO ĐỘNG
@@ -132,43 +144,6 @@ def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
         for c in contract_rows
     ]
 
-    # =========================
-    # 7. THÔNG BÁO MỚI NHẤT
-    # =========================
-    notifications_rows = (
-        db.query(Notification)
-        .order_by(Notification.created_at.desc())
-        .limit(5)
-        .all()
-    )
-
-    notifications = [
-        {
-            "id": n.id,
-            "title": n.title,
-            "time": str(n.time),
-            "created_at": str(n.created_at),
-        }
-        for n in notifications_rows
-    ]
-
-    # =========================
-    # 8. SẢN PHẨM SẮP HẾT (chỉ phòng kho)
-    # =========================
-    low_stock = []
-    if emp.department and emp.department.lower() == "kho":
-        low_stock_rows = (
-            db.query(Product)
-            .filter(Product.stock < 5)
-            .order_by(Product.stock.asc())
-            .limit(5)
-            .all()
-        )
-        low_stock = [
-            {"id": p.id, "name": p.name, "stock": p.stock}
-            for p in low_stock_rows
-        ]
-
     # =========================
     # 9. CÔNG VIỆC ĐƯỢC GIAO (TASKS)
     # =========================
@@ -193,16 +168,14 @@ def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
     ]
 
     # ---- TÓM TẮT TASKS ----
+    status_counts = Counter(t.status for t in task_rows)
     tasks_summary = {
         "total": len(task_rows),
-        "todo": len([t for t in task_rows if t.status == "todo"]),
-        "in_progress": len([t for t in task_rows if t.status == "in_progress"]),
-        "done": len([t for t in task_rows if t.status == "done"]),
+        "todo": status_counts["todo"],
+        "in_progress": status_counts["in_progress"],
+        "done": status_counts["done"],
     }
 
-    # =========================
-    # RETURN FULL PACKAGE
-    # =========================
     return {
         "employee": {
             "id": emp.id,
@@ -216,8 +189,71 @@ def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
         "kpi": kpi,
         "benefits": benefits,
         "contracts": contracts,
-        "notifications": notifications,
-        "low_stock": low_stock,
         "tasks": tasks,
         "tasks_summary": tasks_summary,
     }
+
+
+# ==========================================================
+# 📈 HIT / MISS CỦA CACHE TRANG CHỦ
+# ==========================================================
+@router.get("/cache-stats")
+def get_home_cache_stats(current_user=Depends(require_role(["admin"]))):
+    return home_cache.stats()
+
+
+@router.get("/{employee_id}")
+def get_employee_home(employee_id: int, db: Session = Depends(get_db)):
+    part, token = home_cache.lookup(employee_id)
+    if part is None:
+        part = _employee_part(db, employee_id, date.today())
+        home_cache.store(employee_id, token, part)
+
+    emp = part["employee"]
+
+    # =========================
+    # 7. THÔNG BÁO MỚI NHẤT (dùng chung, luôn đọc mới)
+    # =========================
+    notifications_rows = (
+        db.query(Notification)
+        .order_by(Notification.created_at.desc())
+        .limit(5)
+        .all()
+    )
+
+    notifications = [
+        {
+            "id": n.id,
+            "title": n.title,
+            "time": str(n.time),
+            "created_at": str(n.created_at),
+        }
+        for n in notifications_rows
+    ]
+
+    # =========================
+    # 8. SẢN PHẨM SẮP HẾT (chỉ phòng kho)
+    # =========================
+    low_stock = []
+    if emp["department"] and emp["department"].lower() == "kho":
+        low_stock_rows = low_stock_products(db, 5)
+        low_stock = [
+            {"id": p.id, "name": p.name, "stock": p.stock}
+            for p in low_stock_rows
+        ]
+
+    # =========================
+    # RETURN FULL PACKAGE
+    # =========================
+    return {
+        "employee": emp,
+        "attendance_today": part["attendance_today"],
+        "attendance_history": part["attendance_history"],
+        "kpi": part["kpi"],
+        "benefits": part["benefits"],
+        "contracts": part["contracts"],
+        "notifications": notifications,
+        "low_stock": low_stock,
+        "tasks": part["tasks"],
+        "tasks_summary": part["tasks_summary"],
+    }
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 import os
 from .. import models, schemas, database
 from app.utils.notify import push_notify   # ⭐ THÊM DÒNG NÀY
+from app.utils import home_cache, payroll
 
 router = APIRouter(prefix="/employees", tags=["Employees"])
 
@@ -33,6 +34,7 @@ def get_one(id: int, db: Session = Depends(database.get_db)):
 def create(item: schemas.EmployeeCreate, db: Session = Depends(database.get_db)):
     new_emp = models.Employee(**item.model_dump())
     db.add(new_emp)
+    payroll.invalidate(db)
     db.commit()
     db.refresh(new_emp)
 
@@ -55,7 +57,9 @@ def update(id: int, item: schemas.EmployeeUpdate, db: Session = Depends(database
     for key, value in update_data.items():
         setattr(emp, key, value)
 
+    payroll.invalidate(db)
     db.commit()
+    home_cache.invalidate(id)
     db.refresh(emp)
 
     # ⭐ THÔNG BÁO CẬP NHẬT
@@ -77,7 +81,9 @@ def partial_update(id: int, item: schemas.EmployeePatch, db: Session = Depends(d
     for key, value in patch_data.items():
         setattr(emp, key, value)
 
+    payroll.invalidate(db)
     db.commit()
+    home_cache.invalidate(id)
     db.refresh(emp)
 
     # ⭐ THÊM THÔNG BÁO CHO PATCH NẾU MUỐN
@@ -98,7 +104,9 @@ def delete(id: int, db: Session = Depends(database.get_db)):
     name = emp.name
 
     db.delete(emp)
+    payroll.invalidate(db)
     db.commit()
+    home_cache.invalidate(id)
 
     # ⭐ THÔNG BÁO XÓA
     push_notify(db, f"Nhân viên {name} đã bị xóa khỏi hệ thống")
@@ -127,6 +135,7 @@ async def upload_avatar(id: int, file: UploadFile = File(...), db: Session = Dep
 
     emp.avatar = f"/static/avatars/{filename}"
     db.commit()
+    home_cache.invalidate(id)
     db.refresh(emp)
 
     # ⭐ THÔNG BÁO CẬP NHẬT ẢNH ĐẠI DIỆN
@@ -0,0 +1,111 @@
+# ==========================================================
+# 📦 ROUTER: XUẤT BÁO CÁO CHẠY NỀN
+#   POST /exports                 → tạo job (trùng yêu cầu → trả job cũ)
+#   GET  /exports/{id}            → trạng thái job
+#   GET  /exports/{id}/download   → tải file khi job xong
+# ==========================================================
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from app.utils import export_jobs
+from app.routers.reports import (
+    build_revenue_workbook,
+    build_summary_workbook,
+    render_revenue_pdf,
+    render_summary_pdf,
+)
+from app.routers.crm import render_customer_pdf
+
+router = APIRouter(prefix="/exports", tags=["Export Jobs"])
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF = "application/pdf"
+
+
+# ==========================================================
+# 🧾 Schemas
+# ==========================================================
+class ExportJobCreate(BaseModel):
+    kind: str
+    params: dict = {}
+
+
+class ExportJobOut(BaseModel):
+    id: str
+    kind: str
+    params: dict
+    status: str
+    filename: str
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+
+def _job_out(job: dict) -> ExportJobOut:
+    return ExportJobOut(
+        **{k: job[k] for k in ExportJobOut.model_fields if k in job},
+        download_url=(
+            f"/exports/{job['id']}/download" if job["status"] == "done" else None
+        ),
+    )
+
+
+# ==========================================================
+# 🖨 Các loại export hỗ trợ
+# ==========================================================
+@export_jobs.register("revenue-excel", "bao_cao_doanh_thu.xlsx", XLSX)
+def _revenue_excel(db, path):
+    build_revenue_workbook(db).save(path)
+
+
+@export_jobs.register("revenue-pdf", "bao_cao_doanh_thu.pdf", PDF)
+def _revenue_pdf(db, path):
+    with open(path, "wb") as f:
+        render_revenue_pdf(db, f)
+
+
+@export_jobs.register("summary-excel", "bao_cao_tong_hop.xlsx", XLSX)
+def _summary_excel(db, path):
+    build_summary_workbook(db).save(path)
+
+
+@export_jobs.register("summary-pdf", "bao_cao_tong_hop.pdf", PDF)
+def _summary_pdf(db, path):
+    with open(path, "wb") as f:
+        render_summary_pdf(db, f)
+
+
+@export_jobs.register("customer-pdf", "customer_{customer_id}.pdf", PDF, params={"customer_id": int})
+def _customer_pdf(db, path, customer_id):
+    render_customer_pdf(db, customer_id, path)
+
+
+# ==========================================================
+# 🌐 API
+# ==========================================================
+@router.post("", response_model=ExportJobOut)
+def create_export_job(data: ExportJobCreate):
+    # Tham số được kiểm tra theo khai báo register(..., params=...) trong submit
+    return _job_out(export_jobs.submit(data.kind, data.params))
+
+
+@router.get("/{job_id}", response_model=ExportJobOut)
+def get_export_job(job_id: str):
+    return _job_out(export_jobs.get(job_id))
+
+
+@router.get("/{job_id}/download")
+def download_export(job_id: str):
+    job = export_jobs.get(job_id)
+
+    if job["status"] == "failed":
+        raise HTTPException(500, job["error"] or "Xuất file thất bại")
+    if job["status"] != "done":
+        raise HTTPException(409, "File chưa sẵn sàng, vui lòng thử lại sau")
+
+    return FileResponse(job["path"], media_type=job["media_type"], filename=job["filename"])
@@ -1,28 +1,109 @@
 # ==========================================================
 # 📦 ROUTER: QUẢN LÝ NHẬP – XUẤT KHO (CHUẨN ERP 100%)
 # ==========================================================
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date
+from sqlalchemy import and_, case, func, not_, or_, select, update
+from datetime import date, datetime
+from typing import Optional
 
 from app import models, schemas, database
+from app.utils import low_stock, pagination, stock_balances, stock_snapshots
+from app.utils.dates import resolve_range, apply_range, to_utc_naive
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 get_db = database.get_db
 
 
 # ==========================================================
-# 📋 Lấy toàn bộ lịch sử nhập – xuất kho
+# 🧭 Phân loại chiều phiếu kho
+#   import: nhập (quantity > 0, không phải hoàn kho)
+#   export: xuất (quantity < 0)
+#   return: hoàn kho theo đơn bị huỷ
+# ==========================================================
+RETURN_LOCATION = stock_balances.RETURN_LOCATION
+DIRECTIONS = ("import", "export", "return")
+
+
+def _direction_filter(direction: str):
+    I = models.Inventory
+    is_return = I.location == RETURN_LOCATION
+
+    if direction == "export":
+        return I.quantity < 0
+    if direction == "return":
+        return and_(I.quantity > 0, is_return)
+    return and_(I.quantity > 0, or_(I.location.is_(None), not_(is_return)))
+
+
+def _ledger_query(
+    db: Session,
+    product_id: Optional[int],
+    location: Optional[str],
+    direction: Optional[str],
+    start: Optional[date],
+    end: Optional[date],
+    *columns,
+):
+    I = models.Inventory
+    query = db.query(*columns)
+
+    if product_id is not None:
+        query = query.filter(I.product_id == product_id)
+    if location:
+        # Phiếu theo đơn: kho thật nằm ở stock_location
+        query = query.filter(or_(I.location == location, I.stock_location == location))
+    if direction:
+        if direction not in DIRECTIONS:
+            raise HTTPException(400, f"direction phải là một trong {', '.join(DIRECTIONS)}")
+        query = query.filter(_direction_filter(direction))
+
+    return apply_range(query, I.date_added, start, end)
+
+
+# ==========================================================
+# 📋 Lịch sử nhập – xuất kho
+#   - Không truyền limit → trả toàn bộ (giữ tương thích FE cũ)
+#   - Có limit → keyset theo id DESC, cursor ở header X-Next-Cursor
+#   - Lọc: product_id, location, direction, from / to
+#     (index (product_id, date_added, id) phục vụ lọc sản phẩm + khoảng ngày)
 # ==========================================================
 @router.get("/", response_model=list[schemas.InventoryOut])
-def get_all_inventories(db: Session = Depends(get_db)):
-    inventories = (
-        db.query(models.Inventory, models.Product.name.label("product_name"))
-        .join(models.Product, models.Inventory.product_id == models.Product.id)
-        .order_by(models.Inventory.id.desc())
-        .all()
-    )
+def get_all_inventories(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    product_id: Optional[int] = None,
+    location: Optional[str] = None,
+    direction: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    I = models.Inventory
+    start, end = resolve_range(date_from=date_from, date_to=date_to)
+
+    query = _ledger_query(
+        db, product_id, location, direction, start, end,
+        I, models.Product.name.label("product_name"),
+    ).join(models.Product, I.product_id == models.Product.id)
+
+    if cursor:
+        (last_id,) = pagination.decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(400, "Cursor không hợp lệ")
+        query = query.filter(I.id < last_id)
+
+    query = query.order_by(I.id.desc())
+
+    if limit is None:
+        inventories = query.all()
+    else:
+        inventories, next_cursor = pagination.page(
+            query.limit(limit + 1).all(), limit, key=lambda r: (r.Inventory.id,)
+        )
+        if next_cursor:
+            response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
 
     return [
         schemas.InventoryOut(
@@ -31,6 +112,7 @@ def get_all_inventories(db: Session = Depends(get_db)):
             product_name=i.product_name,
             quantity=i.Inventory.quantity,
             location=i.Inventory.location,
+            stock_location=i.Inventory.stock_location,
             date_added=i.Inventory.date_added,
             note=i.Inventory.note,
         )
@@ -38,6 +120,54 @@ def get_all_inventories(db: Session = Depends(get_db)):
     ]
 
 
+# ==========================================================
+# 📊 Tổng hợp nhập / xuất / hoàn theo sản phẩm (tính trong SQL)
+# ==========================================================
+@router.get("/movement-summary")
+def get_movement_summary(
+    product_id: Optional[int] = None,
+    location: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    I, P = models.Inventory, models.Product
+    start, end = resolve_range(date_from=date_from, date_to=date_to)
+
+    def total_where(condition):
+        return func.coalesce(func.sum(case((condition, I.quantity), else_=0)), 0)
+
+    rows = (
+        _ledger_query(
+            db, product_id, location, None, start, end,
+            I.product_id,
+            P.name,
+            total_where(_direction_filter("import")),
+            total_where(_direction_filter("export")),
+            total_where(_direction_filter("return")),
+            func.coalesce(func.sum(I.quantity), 0),
+            func.count(I.id),
+        )
+        .join(P, I.product_id == P.id)
+        .group_by(I.product_id, P.name)
+        .order_by(I.product_id)
+        .all()
+    )
+
+    return [
+        {
+            "product_id": pid,
+            "product_name": name,
+            "imported": int(imported),
+            "exported": -int(exported),
+            "returned": int(returned),
+            "net": int(net),
+            "movements": int(count),
+        }
+        for pid, name, imported, exported, returned, net, count in rows
+    ]
+
+
 # ==========================================================
 # 🟢 THÊM PHIẾU NHẬP KHO (TĂNG STOCK)
 # ==========================================================
@@ -66,8 +196,14 @@ def create_inventory(item: schemas.InventoryCreate, db: Session = Depends(get_db
 
     db.add(new_item)
 
-    # Cập nhật stock
+    # Cập nhật stock (tổng + theo vị trí)
     product.stock = (product.stock or 0) + item.quantity
+    stock_balances.apply(db, item.product_id, location, item.quantity)
+    low_stock.check(db, [item.product_id])
+
+    # Phiếu ghi lùi ngày → snapshot tồn kho từ ngày đó không còn đúng
+    if new_item.date_added < date.today():
+        stock_snapshots.invalidate(db, item.product_id, new_item.date_added)
 
     db.commit()
     db.refresh(new_item)
@@ -106,11 +242,29 @@ def update_inventory(id: int, item: schemas.InventoryCreate, db: Session = Depen
     diff = item.quantity - inv.quantity
     product.stock = (product.stock or 0) + diff
 
+    old_date = inv.date_added
+
+    # Chuyển số lượng từ vị trí / số lượng cũ sang mới; phiếu theo đơn giữ
+    # kho thật (stock_location) trừ khi bị đổi sang 1 kho cụ thể
+    stock_location = inv.stock_location if location in stock_balances.PSEUDO_LOCATIONS else None
+    stock_balances.apply_many(db, [
+        {"product_id": inv.product_id, "location": inv.location,
+         "stock_location": inv.stock_location, "quantity": -inv.quantity},
+        {"product_id": inv.product_id, "location": location,
+         "stock_location": stock_location, "quantity": item.quantity},
+    ])
+
     inv.quantity = item.quantity
     inv.location = location
+    inv.stock_location = stock_location
     inv.date_added = item.date_added or date.today()
     inv.note = note
 
+    # Sửa phiếu → snapshot từ ngày sớm hơn (cũ / mới) trở đi không còn đúng
+    changed = [d for d in (old_date, inv.date_added) if d]
+    stock_snapshots.invalidate(db, inv.product_id, min(changed) if changed else None)
+    low_stock.check(db, [inv.product_id])
+
     db.commit()
     db.refresh(inv)
     db.refresh(product)
@@ -139,6 +293,9 @@ def delete_inventory(id: int, db: Session = Depends(get_db)):
     if product:
         product.stock = (product.stock or 0) - inv.quantity
 
+    stock_balances.apply(db, inv.product_id, inv.location, -inv.quantity, inv.stock_location)
+    stock_snapshots.invalidate(db, inv.product_id, inv.date_added)
+    low_stock.check(db, [inv.product_id])
     db.delete(inv)
     db.commit()
 
@@ -147,63 +304,269 @@ def delete_inventory(id: int, db: Session = Depends(get_db)):
 
 # ==========================================================
 # 🔄 ĐỒNG BỘ LẠI STOCK THEO LỊCH SỬ
+#   1 câu UPDATE ... FROM (SELECT product_id, SUM(quantity) ...) agg
+#   - dry_run=true → chỉ liệt kê sản phẩm lệch và độ lệch
+#   - ghi thật     → trả về cùng danh sách đó, dựng lại stock_balances
+#                    của các sản phẩm lệch trong cùng transaction
+#   - since=...    → chỉ xét sản phẩm có phiếu kho ghi từ thời điểm đó
+#                    (có tz thì theo tz đó, không có tz = giờ địa phương)
 # ==========================================================
+def _ledger_totals(since: Optional[datetime] = None):
+    """Subquery (product_id, total): tổng sổ kho của từng sản phẩm (0 nếu chưa có phiếu)."""
+    P, I = models.Product, models.Inventory
+
+    agg = (
+        select(
+            P.id.label("product_id"),
+            func.coalesce(func.sum(I.quantity), 0).label("total"),
+        )
+        .select_from(P)
+        .outerjoin(I, I.product_id == P.id)
+        .group_by(P.id)
+    )
+
+    if since:
+        # created_at lưu UTC (utcnow) → đổi mốc về UTC trước khi so sánh
+        since = to_utc_naive(since)
+        touched = select(I.product_id).where(I.created_at >= since).distinct()
+        agg = agg.where(P.id.in_(touched))
+
+    return agg.subquery("agg")
+
+
+def _drifted(agg):
+    P = models.Product
+    return func.coalesce(P.stock, 0) != agg.c.total
+
+
 @router.post("/sync-stock")
-def sync_all_stock(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
-
-    for p in products:
-        total = (
-            db.query(func.sum(models.Inventory.quantity))
-            .filter(models.Inventory.product_id == p.id)
-            .scalar()
-            or 0
+def sync_all_stock(
+    dry_run: bool = False,
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    P = models.Product
+    agg = _ledger_totals(since)
+
+    rows = (
+        db.query(P.id, P.name, P.stock, agg.c.total)
+        .join(agg, agg.c.product_id == P.id)
+        .filter(_drifted(agg))
+        .order_by(P.id)
+        .all()
+    )
+    products = [
+        {
+            "product_id": pid,
+            "name": name,
+            "stock": stock or 0,
+            "ledger_total": int(total),
+            "delta": int(total) - (stock or 0),
+        }
+        for pid, name, stock, total in rows
+    ]
+
+    if dry_run:
+        return {"dry_run": True, "drifted": len(products), "products": products}
+
+    # Chỉ ghi các sản phẩm đã liệt kê ở trên (lệnh UPDATE vẫn kiểm tra lệch)
+    drifted_ids = [p["product_id"] for p in products]
+    result = db.execute(
+        update(P)
+        .where(P.id == agg.c.product_id, P.id.in_(drifted_ids), _drifted(agg))
+        .values(stock=agg.c.total)
+        .execution_options(synchronize_session=False)
+    )
+    # Tổng tồn vừa lấy lại từ sổ kho → tồn theo vị trí cũng dựng lại từ sổ kho,
+    # cùng transaction; nếu không, xuất đơn sau đó có thể 409 vì 2 bảng lệch nhau
+    stock_balances.resync(db, drifted_ids)
+    low_stock.check(db)
+    db.commit()
+
+    return {
+        "message": "✔ Đã đồng bộ tồn kho tất cả sản phẩm",
+        "updated": result.rowcount,
+        "products": products,
+    }
+
+
+# ==========================================================
+# 📉 SẢN PHẨM SẮP HẾT HÀNG
+#   GET /inventory/low-stock  (có limit → keyset theo id DESC,
+#                               cursor ở header X-Next-Cursor)
+#   PUT /inventory/low-stock/{product_id}/threshold?reorder_level=20
+# ==========================================================
+@router.get("/low-stock")
+def get_low_stock(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    before_id = None
+    if cursor:
+        (before_id,) = pagination.decode_cursor(cursor, 1)
+        if not isinstance(before_id, int):
+            raise HTTPException(400, "Cursor không hợp lệ")
+
+    if limit is None:
+        products = low_stock.low_stock_page(db, before_id=before_id)
+    else:
+        products, next_cursor = pagination.page(
+            low_stock.low_stock_page(db, limit + 1, before_id), limit, key=lambda p: (p.id,)
         )
-        p.stock = total
+        if next_cursor:
+            response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+
+    return [
+        {"id": p.id, "name": p.name, "stock": p.stock, "reorder_level": p.reorder_level}
+        for p in products
+    ]
 
+
+@router.put("/low-stock/{product_id}/threshold")
+def set_reorder_level(
+    product_id: int,
+    reorder_level: int = Query(..., ge=0),
+    db: Session = Depends(get_db),
+):
+    product = db.query(models.Product).filter_by(id=product_id).first()
+    if not product:
+        raise HTTPException(404, "❌ Sản phẩm không tồn tại")
+
+    product.reorder_level = reorder_level
+    low_stock.check(db, [product_id])
     db.commit()
-    return {"message": "✔ Đã đồng bộ tồn kho tất cả sản phẩm"}
+    db.refresh(product)
+
+    return {
+        "id": product.id,
+        "name": product.name,
+        "stock": product.stock,
+        "reorder_level": product.reorder_level,
+        "low_stock": (product.stock or 0) < product.reorder_level,
+    }
 
 
 # ==========================================================
-# 🧾 Tạo phiếu xuất kho (dùng cho đơn hàng)
+# 🏬 TỒN KHO THEO VỊ TRÍ
+#   GET  /inventory/balances?product_id=1&location=Kho A
+#   POST /inventory/balances/rebuild   → dựng lại từ sổ kho
 # ==========================================================
-def create_export_record(db: Session, product_id: int, quantity: int, order_id: int):
-    prod = db.query(models.Product).filter_by(id=product_id).first()
-    if not prod:
-        raise HTTPException(404, "Không tìm thấy sản phẩm")
+@router.get("/balances")
+def get_stock_balances(
+    product_id: Optional[int] = None,
+    location: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    return [
+        {"product_id": b.product_id, "location": b.location, "quantity": b.quantity}
+        for b in stock_balances.balances(db, product_id, location)
+    ]
+
+
+@router.post("/balances/rebuild")
+def rebuild_stock_balances(db: Session = Depends(get_db)):
+    return {"message": "✔ Đã dựng lại tồn kho theo vị trí", "rows": stock_balances.rebuild(db)}
+
 
-    inv = models.Inventory(
-        product_id=product_id,
-        quantity=-abs(quantity),
-        location="Xuất theo đơn hàng",
-        date_added=date.today(),
-        note=f"Xuất kho đơn #{order_id}",
+# ==========================================================
+# 📸 TỒN KHO TẠI 1 NGÀY (AS-OF) + CHỤP SNAPSHOT
+#   GET  /inventory/stock-as-of?date=2025-01-31[&product_id=1&product_id=2]
+#   POST /inventory/snapshots?date=2025-01-31   (mặc định: hôm qua)
+# ==========================================================
+@router.get("/stock-as-of")
+def get_stock_as_of(
+    date_value: date = Query(..., alias="date"),
+    product_id: Optional[list[int]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    rows = stock_snapshots.stock_as_of(db, date_value, product_id)
+
+    return [
+        {
+            "product_id": pid,
+            "product_name": name,
+            "quantity": int(qty or 0),
+            "snapshot_date": snap_date,
+        }
+        for pid, name, qty, snap_date in rows
+    ]
+
+
+@router.post("/snapshots")
+def create_stock_snapshot(
+    date_value: Optional[date] = Query(None, alias="date"),
+    db: Session = Depends(get_db),
+):
+    try:
+        count = stock_snapshots.take_snapshot(db, date_value)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return {"message": "📸 Đã chụp tồn kho", "products": count}
+
+
+# ==========================================================
+# 🧾 Tạo phiếu xuất kho (dùng cho đơn hàng)
+#   Trừ kho bằng 1 câu UPDATE có điều kiện (stock >= n) → hai đơn
+#   hoàn thành cùng lúc không thể làm tồn kho âm.
+#   Kho xuất: location chỉ định, mặc định lấy dần FIFO qua các kho
+#   còn hàng (stock_balances.take) → 1 phiếu / kho bị trừ.
+#   Không commit — chạy chung transaction với thay đổi của đơn hàng.
+# ==========================================================
+def create_export_record(
+    db: Session,
+    product_id: int,
+    quantity: int,
+    order_id: int,
+    location: Optional[str] = None,
+):
+    qty = abs(quantity)
+
+    updated = (
+        db.query(models.Product)
+        .filter(models.Product.id == product_id, models.Product.stock >= qty)
+        .update({models.Product.stock: models.Product.stock - qty}, synchronize_session=False)
     )
 
-    db.add(inv)
-    prod.stock -= abs(quantity)
-    db.commit()
-    db.refresh(prod)
+    if not updated:
+        stock = db.query(models.Product.stock).filter(models.Product.id == product_id).scalar()
+        if stock is None:
+            raise HTTPException(404, "Không tìm thấy sản phẩm")
+        raise HTTPException(400, f"Không đủ hàng để hoàn thành đơn (tồn kho: {stock})")
+
+    pools = stock_balances.load_pools(db, [product_id])
+    parts = stock_balances.take(pools, product_id, qty, location)
+    _add_order_movements(db, stock_balances.order_movements(
+        product_id, order_id, parts, -1, f"Xuất kho đơn #{order_id}", date.today(),
+    ))
+    low_stock.check(db, [product_id])
 
 
 # ==========================================================
 # 🧾 Tạo phiếu hoàn kho (khi đơn hàng hủy)
+#   Hàng về lại đúng các kho mà phiếu xuất của đơn đã trừ.
+#   Không commit — caller commit 1 lần.
 # ==========================================================
 def create_return_record(db: Session, product_id: int, quantity: int, order_id: int):
-    prod = db.query(models.Product).filter_by(id=product_id).first()
-    if not prod:
-        raise HTTPException(404, "Không tìm thấy sản phẩm")
+    qty = abs(quantity)
 
-    inv = models.Inventory(
-        product_id=product_id,
-        quantity=abs(quantity),
-        location="Hoàn kho",
-        date_added=date.today(),
-        note=f"Hoàn kho đơn #{order_id}",
+    updated = (
+        db.query(models.Product)
+        .filter(models.Product.id == product_id)
+        .update({models.Product.stock: models.Product.stock + qty}, synchronize_session=False)
     )
+    if not updated:
+        raise HTTPException(404, "Không tìm thấy sản phẩm")
 
-    db.add(inv)
-    prod.stock += abs(quantity)
-    db.commit()
-    db.refresh(prod)
+    parts = stock_balances.return_parts(db, [(order_id, qty)])[order_id]
+    _add_order_movements(db, stock_balances.order_movements(
+        product_id, order_id, parts, 1, f"Hoàn kho đơn #{order_id}", date.today(),
+    ))
+    low_stock.check(db, [product_id])
+
+
+def _add_order_movements(db: Session, movements):
+    stock_balances.apply_many(db, movements)
+    db.add_all(models.Inventory(**m) for m in movements)
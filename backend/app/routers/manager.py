@@ -1,13 +1,13 @@
 # app/routers/manager.py
-from datetime import date
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app import models, database, schemas
+from app.utils import manager_stats, revenue_rollup
 
 router = APIRouter(prefix="/manager", tags=["Manager"])
 
@@ -71,98 +71,16 @@ def get_db():
 
 @router.get("/stats", response_model=ManagerStatsOut)
 def get_manager_stats(db: Session = Depends(get_db)):
-    today = date.today()
-
-    # Nhân viên
-    employees = db.query(func.count(models.Employee.id)).scalar() or 0
-    active_employees = (
-        db.query(func.count(models.Employee.id))
-        .filter(models.Employee.active.is_(True))
-        .scalar()
-        or 0
-    )
-
-    # Khách hàng
-    customers = db.query(func.count(models.Customer.id)).scalar() or 0
-
-    # Sản phẩm sắp hết (ví dụ: tồn < 10)
-    inventory_low = (
-        db.query(func.count(models.Inventory.id))
-        .filter(models.Inventory.quantity < 10)
-        .scalar()
-        or 0
-    )
-
-    # Công việc
-    total_tasks = db.query(func.count(models.Task.id)).scalar() or 0
-    todo = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "todo")
-        .scalar()
-        or 0
-    )
-    in_progress = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "in_progress")
-        .scalar()
-        or 0
-    )
-    done = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "done")
-        .scalar()
-        or 0
-    )
-    overdue = (
-        db.query(func.count(models.Task.id))
-        .filter(
-            models.Task.deadline.isnot(None),
-            models.Task.deadline < today,
-            models.Task.status != "done",
-        )
-        .scalar()
-        or 0
-    )
-
-    # Đơn hàng
-    total_orders = db.query(func.count(models.Order.id)).scalar() or 0
-    pending = (
-        db.query(func.count(models.Order.id))
-        .filter(models.Order.status.in_(["Đang xử lý", "pending"]))
-        .scalar()
-        or 0
-    )
-    completed = (
-        db.query(func.count(models.Order.id))
-        .filter(models.Order.status.in_(["Hoàn thành", "completed"]))
-        .scalar()
-        or 0
-    )
-    canceled = (
-        db.query(func.count(models.Order.id))
-        .filter(models.Order.status.in_(["Đã hủy", "canceled"]))
-        .scalar()
-        or 0
-    )
+    # 1 câu COUNT ... FILTER mỗi bảng, snapshot cache vài giây (utils/manager_stats)
+    stats = manager_stats.get_stats(db)
 
     return ManagerStatsOut(
-        employees=employees,
-        active_employees=active_employees,
-        customers=customers,
-        inventory_low=inventory_low,
-        tasks=TaskBlock(
-            total=total_tasks,
-            todo=todo,
-            in_progress=in_progress,
-            done=done,
-            overdue=overdue,
-        ),
-        orders=OrderBlock(
-            total=total_orders,
-            pending=pending,
-            completed=completed,
-            canceled=canceled,
-        ),
+        employees=stats["employees"],
+        active_employees=stats["active_employees"],
+        customers=stats["customers"],
+        inventory_low=stats["inventory_low"],
+        tasks=TaskBlock(**stats["tasks"]),
+        orders=OrderBlock(**stats["orders"]),
     )
 
 
@@ -191,7 +109,7 @@ def get_employees_by_department(db: Session = Depends(get_db)):
 
 # ==========================================================
 # 3. DOANH THU THEO THÁNG
-#    (PostgreSQL: dùng to_char(date, 'YYYY-MM'))
+#    (đọc từ revenue_rollups — chỉ đơn "Hoàn thành")
 # ==========================================================
 
 @router.get(
@@ -199,20 +117,12 @@ def get_employees_by_department(db: Session = Depends(get_db)):
     response_model=List[RevenueItemOut],
 )
 def get_revenue_monthly(db: Session = Depends(get_db)):
-    # Với PostgreSQL
-    month_expr = func.to_char(models.Order.date, "YYYY-MM").label("month")
+    rows = revenue_rollup.by_month(db)
 
-    rows = (
-        db.query(
-            month_expr,
-            func.coalesce(func.sum(models.Order.amount), 0).label("total"),
-        )
-        .group_by(month_expr)
-        .order_by(month_expr)
-        .all()
-    )
-
-    return [RevenueItemOut(month=m, total=float(t or 0)) for m, t in rows]
+    return [
+        RevenueItemOut(month=f"{y}-{m:02d}", total=float(t or 0))
+        for y, m, t in rows
+    ]
 
 
 # ==========================================================
@@ -221,45 +131,7 @@ def get_revenue_monthly(db: Session = Depends(get_db)):
 
 @router.get("/task-summary", response_model=TaskBlock)
 def get_task_summary(db: Session = Depends(get_db)):
-    today = date.today()
-
-    total_tasks = db.query(func.count(models.Task.id)).scalar() or 0
-    todo = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "todo")
-        .scalar()
-        or 0
-    )
-    in_progress = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "in_progress")
-        .scalar()
-        or 0
-    )
-    done = (
-        db.query(func.count(models.Task.id))
-        .filter(models.Task.status == "done")
-        .scalar()
-        or 0
-    )
-    overdue = (
-        db.query(func.count(models.Task.id))
-        .filter(
-            models.Task.deadline.isnot(None),
-            models.Task.deadline < today,
-            models.Task.status != "done",
-        )
-        .scalar()
-        or 0
-    )
-
-    return TaskBlock(
-        total=total_tasks,
-        todo=todo,
-        in_progress=in_progress,
-        done=done,
-        overdue=overdue,
-    )
+    return TaskBlock(**manager_stats.get_stats(db)["tasks"])
 
 
 # ==========================================================
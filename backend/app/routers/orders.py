@@ -1,14 +1,16 @@
 # ==========================================================
 # 📦 ROUTER: QUẢN LÝ ĐƠN HÀNG (ĐỒNG BỘ VỚI KHO)
 # ==========================================================
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel
 from datetime import date
+from typing import Optional
 
 from app import models, schemas, database
 from app.utils.notify import push_notify
+from app.utils import order_batch, order_import, pagination, revenue_rollup
+from app.utils.dates import resolve_range, apply_range
 from app.routers.inventory import create_export_record, create_return_record
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
@@ -20,22 +22,79 @@ get_db = database.get_db
 # ==========================================================
 class StatusUpdate(BaseModel):
     status: str
+    location: Optional[str] = None   # kho xuất khi hoàn thành (mặc định FIFO)
+
+
+class StatusBatchItem(BaseModel):
+    order_id: int
+    status: str
+
+
+class StatusBatch(BaseModel):
+    items: list[StatusBatchItem]
 
 
 # ==========================================================
 # 📋 Lấy danh sách đơn hàng
+#   - Không truyền limit → trả TOÀN BỘ đơn khớp bộ lọc, không giới hạn
+#     (Dashboard / OrdersPage đang lấy độ dài danh sách làm tổng số đơn;
+#     client mới nên luôn truyền limit)
+#   - Có limit → phân trang keyset theo id DESC;
+#     cursor trang sau nằm ở header X-Next-Cursor
+#   - customer / product nạp bằng JOIN → số query cố định mỗi trang
 # ==========================================================
 @router.get("/", response_model=list[schemas.OrderOut])
-def get_orders(db: Session = Depends(get_db)):
-    orders = (
-        db.query(models.Order)
-        .order_by(models.Order.id.desc())
-        .all()
+def get_orders(
+    response: Response,
+    limit: Optional[int] = Query(
+        None, ge=1, le=500,
+        description="Số đơn mỗi trang; bỏ trống → trả toàn bộ (không phân trang)",
+    ),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    region: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    start, end = resolve_range(date_from=date_from, date_to=date_to)
+
+    query = db.query(models.Order).options(
+        joinedload(models.Order.customer),
+        joinedload(models.Order.product),
     )
 
-    result = []
-    for o in orders:
-        result.append({
+    if status:
+        query = query.filter(models.Order.status == status)
+    if customer_id is not None:
+        query = query.filter(models.Order.customer_id == customer_id)
+    if product_id is not None:
+        query = query.filter(models.Order.product_id == product_id)
+    if region:
+        query = query.filter(models.Order.region == region)
+    query = apply_range(query, models.Order.date, start, end)
+
+    if cursor:
+        (last_id,) = pagination.decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(400, "Cursor không hợp lệ")
+        query = query.filter(models.Order.id < last_id)
+
+    query = query.order_by(models.Order.id.desc())
+
+    if limit is None:
+        orders = query.all()
+    else:
+        orders, next_cursor = pagination.page(
+            query.limit(limit + 1).all(), limit, key=lambda o: (o.id,)
+        )
+        if next_cursor:
+            response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+
+    return [
+        {
             "id": o.id,
             "customer_id": o.customer_id,
             "product_id": o.product_id,
@@ -49,9 +108,9 @@ def get_orders(db: Session = Depends(get_db)):
             "region": o.region,
             # nếu muốn xem luôn tồn kho hiện tại:
             "remaining_stock": o.product.stock if o.product else None,
-        })
-
-    return result
+        }
+        for o in orders
+    ]
 
 
 # ==========================================================
@@ -72,24 +131,25 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
     if product.stock < order.quantity:
         raise HTTPException(400, f"⚠️ Số lượng sản phẩm không đủ trong kho (còn {product.stock})")
 
-    # Tạo đơn hàng (chưa đụng tới kho)
+    # Tạo đơn hàng — toàn bộ bên dưới chung 1 transaction, commit 1 lần
     new_order = models.Order(**order.dict())
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    db.flush()
 
     # Nếu ngay từ đầu chọn trạng thái HOÀN THÀNH -> tạo phiếu xuất kho + trừ kho
     if new_order.status == "Hoàn thành":
-        # double check tồn kho
-        if product.stock < new_order.quantity:
-            raise HTTPException(400, f"Không đủ hàng để hoàn thành đơn (tồn kho: {product.stock})")
-
-        # dùng helper của inventory để vừa log, vừa trừ stock
+        # trừ kho có điều kiện (stock >= quantity) + ghi phiếu xuất
         create_export_record(db, new_order.product_id, new_order.quantity, new_order.id)
-        db.refresh(product)
+
+        # ghi nhận doanh thu vào bảng rollup
+        revenue_rollup.apply_order(db, new_order)
 
     # Gửi thông báo
-    push_notify(db, f"Đơn hàng #{new_order.id} đã được tạo")
+    push_notify(db, f"Đơn hàng #{new_order.id} đã được tạo", commit=False)
+
+    db.commit()
+    db.refresh(new_order)
+    db.refresh(product)
 
     return {
         "id": new_order.id,
@@ -107,6 +167,41 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
     }
 
 
+# ==========================================================
+# 📥 Nhập đơn hàng hàng loạt từ file CSV / NDJSON
+#   POST /orders/import?format=csv|ndjson  (mặc định theo đuôi file)
+#   Cột / khoá giống OrderCreate: customer_id, product_id, quantity,
+#   date, status, amount, category, region
+# ==========================================================
+@router.post("/import")
+def import_orders(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    fmt = order_import.detect_format(file.filename, format)
+    if not fmt:
+        raise HTTPException(400, "Chỉ hỗ trợ file .csv hoặc .ndjson / .jsonl")
+
+    rows = order_import.parse_rows(file.file, fmt)
+    return order_import.import_orders(db, rows, source=file.filename or "file")
+
+
+# ==========================================================
+# 🔁 Cập nhật trạng thái nhiều đơn cùng lúc
+#   Body: {"items": [{"order_id": 1, "status": "Hoàn thành"}, ...]}
+#   Gộp thay đổi tồn kho theo sản phẩm, 1 transaction, 1 thông báo
+# ==========================================================
+@router.post("/status-batch")
+def update_order_status_batch(data: StatusBatch, db: Session = Depends(get_db)):
+    if not data.items:
+        raise HTTPException(400, "Danh sách đơn hàng trống")
+
+    return order_batch.update_statuses(
+        db, [(item.order_id, item.status) for item in data.items]
+    )
+
+
 # ==========================================================
 # 🔁 Cập nhật trạng thái đơn hàng (TRỪ KHO / HOÀN KHO)
 # ==========================================================
@@ -118,7 +213,13 @@ def update_order_status(
 ):
     new_status = data.status
 
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    # Khoá dòng đơn hàng: 2 request đổi trạng thái cùng đơn phải chạy lần lượt
+    order = (
+        db.query(models.Order)
+        .filter(models.Order.id == order_id)
+        .with_for_update()
+        .first()
+    )
     if not order:
         raise HTTPException(404, "Không tìm thấy đơn hàng")
 
@@ -129,34 +230,30 @@ def update_order_status(
     old_status = order.status
 
     # 1️⃣ KHÔNG HOÀN THÀNH → HOÀN THÀNH  => XUẤT KHO
+    #    UPDATE ... WHERE stock >= quantity: hết hàng → 400, không bao giờ âm kho
     if new_status == "Hoàn thành" and old_status != "Hoàn thành":
-        if product.stock < order.quantity:
-            raise HTTPException(
-                400,
-                f"Không đủ hàng để hoàn thành đơn (tồn kho: {product.stock})"
-            )
-
-        # tạo phiếu xuất kho + trừ stock
-        create_export_record(db, order.product_id, order.quantity, order.id)
-        db.refresh(product)
+        create_export_record(db, order.product_id, order.quantity, order.id, data.location)
 
     # 2️⃣ HOÀN THÀNH → TRẠNG THÁI KHÁC  => HOÀN KHO
     elif old_status == "Hoàn thành" and new_status != "Hoàn thành":
-        # tạo phiếu hoàn kho + cộng stock
         create_return_record(db, order.product_id, order.quantity, order.id)
-        db.refresh(product)
+
+    # Cập nhật bảng rollup doanh thu nếu đơn vào / ra "Hoàn thành"
+    revenue_rollup.on_status_change(db, order, old_status, new_status)
 
     # Cập nhật trạng thái đơn hàng
     order.status = new_status
-    db.commit()
-    db.refresh(order)
-    db.refresh(product)
 
-    # Thông báo (tuỳ thích)
+    # Thông báo (tuỳ thích) — cùng transaction
     if new_status == "Hoàn thành":
-        push_notify(db, f"Đơn hàng #{order.id} đã HOÀN THÀNH")
+        push_notify(db, f"Đơn hàng #{order.id} đã HOÀN THÀNH", commit=False)
     elif new_status == "Đã hủy":
-        push_notify(db, f"Đơn hàng #{order.id} đã bị HỦY")
+        push_notify(db, f"Đơn hàng #{order.id} đã bị HỦY", commit=False)
+
+    # Commit đúng 1 lần cho cả chuyển trạng thái
+    db.commit()
+    db.refresh(order)
+    db.refresh(product)
 
     return {
         "id": order.id,
@@ -176,19 +273,11 @@ def update_order_status(
 
 # ==========================================================
 # 📊 Summary theo danh mục
-#  👉 Vẫn GIỮ NGUYÊN: chỉ tính đơn "Hoàn thành"
+#  👉 Vẫn GIỮ NGUYÊN: chỉ tính đơn "Hoàn thành" (đọc từ revenue_rollups)
 # ==========================================================
 @router.get("/summary-by-category")
 def get_summary_by_category(db: Session = Depends(get_db)):
-    data = (
-        db.query(
-            func.lower(models.Order.category).label("category_norm"),
-            func.sum(models.Order.amount).label("total")
-        )
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(func.lower(models.Order.category))
-        .all()
-    )
+    data = revenue_rollup.by_order_category(db)
 
     return [
         {
@@ -204,12 +293,7 @@ def get_summary_by_category(db: Session = Depends(get_db)):
 # ==========================================================
 @router.get("/summary-by-region")
 def get_summary_by_region(db: Session = Depends(get_db)):
-    data = (
-        db.query(models.Order.region, func.sum(models.Order.amount))
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Order.region)
-        .all()
-    )
+    data = revenue_rollup.by_region(db)
 
     return [{"region": r, "total": float(t)} for r, t in data]
 
@@ -218,19 +302,16 @@ def get_summary_by_region(db: Session = Depends(get_db)):
 # 📊 Summary theo tháng
 # ==========================================================
 @router.get("/summary-by-month")
-def get_summary_by_month(db: Session = Depends(get_db)):
-    data = (
-        db.query(
-            extract("month", models.Order.date).label("month"),
-            func.sum(models.Order.amount)
-        )
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by("month")
-        .order_by("month")
-        .all()
-    )
+def get_summary_by_month(
+    year: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    start, end = resolve_range(year=year, date_from=date_from, date_to=date_to)
+    data = revenue_rollup.by_month(db, start, end)
 
-    return [{"month": int(m), "total": float(t)} for m, t in data]
+    return [{"year": int(y), "month": int(m), "total": float(t)} for y, m, t in data]
 
 
 # ==========================================================
@@ -241,5 +322,5 @@ def get_summary_all(db: Session = Depends(get_db)):
     return {
         "by_category": get_summary_by_category(db),
         "by_region": get_summary_by_region(db),
-        "by_month": get_summary_by_month(db),
+        "by_month": get_summary_by_month(db=db, year=None, date_from=None, date_to=None),
     }
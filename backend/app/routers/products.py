@@ -7,6 +7,7 @@ from .. import models, schemas, database
 import os, shutil
 
 from app.utils.notify import push_notify
+from app.utils import low_stock, stock_balances
 
 router = APIRouter(prefix="/products", tags=["Products"])
 get_db = database.get_db
@@ -92,8 +93,10 @@ def create_product(
             note="Tồn kho ban đầu khi tạo sản phẩm",
         )
         db.add(inv)
-        db.commit()
+        stock_balances.apply(db, new_item.id, None, stock)
 
+    # 📌 Tồn ban đầu dưới ngưỡng → cảnh báo luôn (commit cùng thông báo)
+    low_stock.check(db, [new_item.id])
     push_notify(db, f"Sản phẩm mới '{new_item.name}' đã được tạo")
 
     return new_item
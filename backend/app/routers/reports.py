@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from typing import Optional
+from datetime import date
+from sqlalchemy import func, select, case
 from fastapi.responses import StreamingResponse
 
 from app import models, database
+from app.utils import revenue_rollup, excel_export
+from app.utils.dates import apply_range, month_bucket, resolve_range
+from app.routers.reports_forecast import build_forecast
 
 from io import BytesIO
-import openpyxl
 
 # PDF
 from reportlab.pdfgen import canvas
@@ -16,58 +20,64 @@ router = APIRouter(prefix="/reports", tags=["Reports"])
 
 
 # ============================================================
-# 📊 SUMMARY REPORT (ĐÃ SỬA FULL, KHÔNG LỖI BIỂU ĐỒ)
+# 🔧 HÀM TỔNG HỢP DÙNG CHUNG CHO SUMMARY
 # ============================================================
-@router.get("/summary")
-def get_summary(db: Session = Depends(database.get_db)):
-
-    employees_count = db.query(models.Employee).count()
-    customers_count = db.query(models.Customer).count()
-    products_count = db.query(models.Product).count()
-
-    inventory_items = db.query(models.Inventory).all()
+def summary_overview(db: Session):
+    """Đếm nhân viên / khách hàng / sản phẩm + tổng tồn kho trong 1 câu SQL."""
+    row = db.query(
+        select(func.count(models.Employee.id)).scalar_subquery().label("employees_count"),
+        select(func.count(models.Customer.id)).scalar_subquery().label("customers_count"),
+        select(func.count(models.Product.id)).scalar_subquery().label("products_count"),
+        select(func.coalesce(func.sum(models.Inventory.quantity), 0))
+        .scalar_subquery()
+        .label("total_stock"),
+    ).one()
 
-    total_stock = sum(int(i.quantity or 0) for i in inventory_items)
-
-    overview = {
-        "employees_count": employees_count,
-        "customers_count": customers_count,
-        "products_count": products_count,
-        "total_stock": total_stock,
+    return {
+        "employees_count": int(row.employees_count or 0),
+        "customers_count": int(row.customers_count or 0),
+        "products_count": int(row.products_count or 0),
+        "total_stock": int(row.total_stock or 0),
     }
 
-    # =====================================================
-    #  🔧 FIX INVENTORY DATA — CHUẨN HÓA HOÀN TOÀN
-    # =====================================================
 
-    from collections import defaultdict
-    inventory_map = defaultdict(int)
+def summary_stock_by_product(db: Session):
+    """
+    Tồn kho theo sản phẩm, GROUP BY ngay trong SQL (inventory JOIN products).
+    Giữ nguyên quy tắc cũ: phiếu âm tính là 0, gộp sản phẩm trùng tên.
+    """
+    name_expr = func.coalesce(models.Product.name, "Unknown")
+    stock_expr = func.sum(
+        case((models.Inventory.quantity > 0, models.Inventory.quantity), else_=0)
+    )
 
-    for item in inventory_items:
-        # Tên sản phẩm luôn là chuỗi an toàn
-        name = item.product.name if item.product else "Unknown"
+    rows = (
+        db.query(name_expr.label("name"), stock_expr.label("stock"))
+        .select_from(models.Inventory)
+        .outerjoin(models.Product, models.Product.id == models.Inventory.product_id)
+        .group_by(name_expr)
+        .order_by(stock_expr.desc(), name_expr)
+        .all()
+    )
 
-        # Chuẩn hóa quantity
-        qty = item.quantity
+    return [{"name": name, "stock": int(stock or 0)} for name, stock in rows]
 
-        # convert to int safely
-        try:
-            qty = int(qty)
-        except:
-            qty = 0
 
-        # Không cho âm
-        if qty < 0:
-            qty = 0
+# ============================================================
+# 📊 SUMMARY REPORT (ĐÃ SỬA FULL, KHÔNG LỖI BIỂU ĐỒ)
+# ============================================================
+@router.get("/summary")
+def get_summary(db: Session = Depends(database.get_db)):
 
-        # GỘP SẢN PHẨM TRÙNG
-        inventory_map[name] += qty
+    # 2 round trip: 1 câu đếm tổng quan + 1 câu GROUP BY tồn kho
+    overview = summary_overview(db)
 
-    # Chuyển về mảng để Recharts sử dụng
-    inventory_chart = [
-        {"name": name, "stock": qty}
-        for name, qty in inventory_map.items()
-    ]
+    employees_count = overview["employees_count"]
+    customers_count = overview["customers_count"]
+    products_count = overview["products_count"]
+
+    # Chuyển về mảng để Recharts sử dụng (đã sắp xếp giảm dần theo tồn kho)
+    inventory_chart = summary_stock_by_product(db)
 
     # =====================================================
     #  ENTITY CHART
@@ -79,7 +89,7 @@ def get_summary(db: Session = Depends(database.get_db)):
     ]
 
     # TOP 5 tồn kho
-    top_products = sorted(inventory_chart, key=lambda x: x["stock"], reverse=True)[:5]
+    top_products = inventory_chart[:5]
 
     return {
         "overview": overview,
@@ -94,32 +104,24 @@ def get_summary(db: Session = Depends(database.get_db)):
 # 💰 REVENUE REPORT
 # ============================================================
 @router.get("/revenue")
-def get_revenue_report(db: Session = Depends(database.get_db)):
-
-    completed_orders = db.query(models.Order).filter(models.Order.status == "Hoàn thành")
-
-    by_month = (
-        completed_orders.with_entities(
-            extract("month", models.Order.date).label("month"),
-            func.sum(models.Order.amount).label("total"),
-        )
-        .group_by(extract("month", models.Order.date))
-        .order_by(extract("month", models.Order.date))
-        .all()
-    )
-
-    by_month_data = [{"month": int(m[0]), "total": float(m[1] or 0)} for m in by_month]
+def get_revenue_report(
+    year: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(database.get_db),
+):
+    start, end = resolve_range(year=year, date_from=date_from, date_to=date_to)
+
+    # Đọc từ bảng revenue_rollups (chỉ chứa đơn "Hoàn thành")
+    by_month = revenue_rollup.by_month(db, start, end)
+
+    by_month_data = [
+        {"year": int(y), "month": int(m), "total": float(t or 0)}
+        for y, m, t in by_month
+    ]
 
 # DOANH THU THEO DANH MỤC (ĐÃ SỬA)
-    by_category = (
-        completed_orders.join(models.Product)
-        .with_entities(
-            func.lower(models.Product.category).label("cat_norm"),
-            func.sum(models.Order.amount).label("total"),
-        )
-        .group_by(func.lower(models.Product.category))
-        .all()
-    )
+    by_category = revenue_rollup.by_product_category(db, date_from=start, date_to=end)
 
     by_category_data = [
         {
@@ -130,13 +132,7 @@ def get_revenue_report(db: Session = Depends(database.get_db)):
     ]
 
 
-    by_region = (
-        completed_orders.with_entities(
-            models.Order.region, func.sum(models.Order.amount).label("total")
-        )
-        .group_by(models.Order.region)
-        .all()
-    )
+    by_region = revenue_rollup.by_region(db, start, end)
 
     by_region_data = [
         {"region": (r[0] or "Không xác định"), "total": float(r[1] or 0)}
@@ -145,21 +141,12 @@ def get_revenue_report(db: Session = Depends(database.get_db)):
 
     total_revenue = sum(item["total"] for item in by_month_data)
 
-    last_two_months = (
-        completed_orders.with_entities(
-            extract("month", models.Order.date).label("month"),
-            func.sum(models.Order.amount).label("total"),
-        )
-        .group_by(extract("month", models.Order.date))
-        .order_by(extract("month", models.Order.date).desc())
-        .limit(2)
-        .all()
-    )
+    last_two_months = by_month[::-1][:2]
 
     growth = 0
     if len(last_two_months) == 2:
-        cur = float(last_two_months[0][1] or 0)
-        prev = float(last_two_months[1][1] or 0)
+        cur = float(last_two_months[0][2] or 0)
+        prev = float(last_two_months[1][2] or 0)
         growth = (cur - prev) / prev * 100 if prev > 0 else 0
 
     return {
@@ -171,33 +158,30 @@ def get_revenue_report(db: Session = Depends(database.get_db)):
     }
 
 
+# ============================================================
+# 🧱 XÂY LẠI BẢNG TỔNG HỢP DOANH THU
+# ============================================================
+@router.post("/revenue/rebuild-rollup")
+def rebuild_revenue_rollup(db: Session = Depends(database.get_db)):
+    rows = revenue_rollup.rebuild(db)
+    return {"message": "✔ Đã xây lại bảng tổng hợp doanh thu", "rows": rows}
+
+
 # ============================================================
 # 🏆 TOP PRODUCTS
 # ============================================================
 @router.get("/top-products")
 def get_top_products(db: Session = Depends(database.get_db)):
 
-    result = (
-        db.query(
-            models.Product.name.label("product"),
-            func.sum(models.Order.quantity).label("total_sold"),
-            func.sum(models.Order.amount).label("revenue"),
-        )
-        .join(models.Product, models.Product.id == models.Order.product_id)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Product.id)
-        .order_by(func.sum(models.Order.quantity).desc())
-        .limit(10)
-        .all()
-    )
+    result = revenue_rollup.top_products(db, limit=10)
 
     return [
         {
-            "product": r.product,
-            "total_sold": int(r.total_sold or 0),
-            "revenue": float(r.revenue or 0),
+            "product": product,
+            "total_sold": int(total_sold or 0),
+            "revenue": float(revenue or 0),
         }
-        for r in result
+        for product, total_sold, revenue in result
     ]
 
 
@@ -207,72 +191,46 @@ def get_top_products(db: Session = Depends(database.get_db)):
 @router.get("/top-customers")
 def get_top_customers(db: Session = Depends(database.get_db)):
 
-    result = (
-        db.query(
-            models.Customer.name.label("customer"),
-            func.count(models.Order.id).label("order_count"),
-            func.sum(models.Order.amount).label("total_spent"),
-        )
-        .join(models.Customer, models.Customer.id == models.Order.customer_id)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Customer.id)
-        .order_by(func.sum(models.Order.amount).desc())
-        .limit(10)
-        .all()
-    )
+    result = revenue_rollup.top_customers(db, limit=10)
 
     return [
         {
-            "customer": r.customer,
-            "order_count": int(r.order_count or 0),
-            "total_spent": float(r.total_spent or 0),
+            "customer": customer,
+            "order_count": int(order_count or 0),
+            "total_spent": float(total_spent or 0),
         }
-        for r in result
+        for customer, order_count, total_spent in result
     ]
 
 
 # ============================================================
 # 📤 EXPORT EXCEL – FULL DATA
 # ============================================================
-@router.get("/export/excel")
-def export_excel(db: Session = Depends(database.get_db)):
+def build_revenue_workbook(db: Session):
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "BAO CAO DOANH THU"
+    wb = excel_export.new_workbook()
+    ws = excel_export.add_sheet(
+        wb, "BAO CAO DOANH THU", widths={c: 25 for c in "ABCDE"}
+    )
 
     # ===== TITLE =====
-    ws.merge_cells("A1:E1")
-    ws["A1"] = "BÁO CÁO DOANH THU TỔNG HỢP"
-    ws["A1"].font = openpyxl.styles.Font(size=18, bold=True)
+    excel_export.write_title(ws, "BÁO CÁO DOANH THU TỔNG HỢP", merge="A1:E1")
     ws.append([])
 
     # =======================================
     # 1️⃣ LẤY DỮ LIỆU DOANH THU THEO THÁNG
     # =======================================
-    completed_orders = db.query(models.Order).filter(
-        models.Order.status == "Hoàn thành"
-    )
-
-    by_month = (
-        completed_orders.with_entities(
-            extract("month", models.Order.date).label("month"),
-            func.sum(models.Order.amount).label("total"),
-        )
-        .group_by(extract("month", models.Order.date))
-        .order_by(extract("month", models.Order.date))
-        .all()
-    )
+    by_month = revenue_rollup.by_month(db)
 
     # Tổng doanh thu
-    total_revenue = sum(float(r[1] or 0) for r in by_month)
+    total_revenue = sum(float(r[2] or 0) for r in by_month)
 
     # Tính tăng trưởng
     last_two = list(by_month)[-2:]
     growth = 0
     if len(last_two) == 2:
-        prev = float(last_two[0][1] or 0)
-        cur = float(last_two[1][1] or 0)
+        prev = float(last_two[0][2] or 0)
+        cur = float(last_two[1][2] or 0)
         if prev > 0:
             growth = (cur - prev) / prev * 100
 
@@ -283,8 +241,8 @@ def export_excel(db: Session = Depends(database.get_db)):
     ws.append(["Doanh thu theo tháng"])
     ws.append(["Tháng", "Doanh thu (VND)"])
 
-    for m, total in by_month:
-        ws.append([int(m), float(total or 0)])
+    for y, m, total in by_month:
+        ws.append([f"{int(y)}-{int(m):02d}", float(total or 0)])
 
     ws.append([])
     ws.append([])
@@ -295,15 +253,7 @@ def export_excel(db: Session = Depends(database.get_db)):
     ws.append(["Doanh thu theo danh mục"])
     ws.append(["Danh mục", "Doanh thu"])
 
-    by_category = (
-        completed_orders.join(models.Product)
-        .with_entities(
-            models.Product.category,
-            func.sum(models.Order.amount),
-        )
-        .group_by(models.Product.category)
-        .all()
-    )
+    by_category = revenue_rollup.by_product_category(db, lower=False)
 
     for category, total in by_category:
         ws.append([category or "Khác", float(total or 0)])
@@ -317,14 +267,7 @@ def export_excel(db: Session = Depends(database.get_db)):
     ws.append(["Doanh thu theo khu vực"])
     ws.append(["Khu vực", "Doanh thu"])
 
-    by_region = (
-        completed_orders.with_entities(
-            models.Order.region,
-            func.sum(models.Order.amount)
-        )
-        .group_by(models.Order.region)
-        .all()
-    )
+    by_region = revenue_rollup.by_region(db)
 
     for region, total in by_region:
         ws.append([region or "Không xác định", float(total or 0)])
@@ -338,22 +281,10 @@ def export_excel(db: Session = Depends(database.get_db)):
     ws.append(["Top 10 sản phẩm bán chạy"])
     ws.append(["Sản phẩm", "Số lượng bán", "Doanh thu"])
 
-    top_products = (
-        db.query(
-            models.Product.name.label("product"),
-            func.sum(models.Order.quantity).label("sold"),
-            func.sum(models.Order.amount).label("revenue"),
-        )
-        .join(models.Product)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Product.id)
-        .order_by(func.sum(models.Order.quantity).desc())
-        .limit(10)
-        .all()
-    )
+    top_products = revenue_rollup.top_products(db, limit=10)
 
-    for p in top_products:
-        ws.append([p.product, int(p.sold or 0), float(p.revenue or 0)])
+    for name, sold, revenue in top_products:
+        ws.append([name, int(sold or 0), float(revenue or 0)])
 
     ws.append([])
     ws.append([])
@@ -364,71 +295,37 @@ def export_excel(db: Session = Depends(database.get_db)):
     ws.append(["Top 10 khách hàng mua nhiều nhất"])
     ws.append(["Khách hàng", "Số đơn", "Tổng chi tiêu"])
 
-    top_customers = (
-        db.query(
-            models.Customer.name,
-            func.count(models.Order.id),
-            func.sum(models.Order.amount),
-        )
-        .join(models.Customer)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Customer.id)
-        .order_by(func.sum(models.Order.amount).desc())
-        .limit(10)
-        .all()
-    )
+    top_customers = revenue_rollup.top_customers(db, limit=10)
 
     for name, count_order, spending in top_customers:
         ws.append([name, int(count_order or 0), float(spending or 0)])
 
-    # ===== Resize columns =====
-    for col in ["A", "B", "C", "D", "E"]:
-        ws.column_dimensions[col].width = 25
+    return wb
 
-    # ===== SAVE =====
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
 
-    return StreamingResponse(
-        stream,
-        media_type=(
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ),
-        headers={"Content-Disposition": "attachment; filename=bao_cao_doanh_thu.xlsx"},
+@router.get("/export/excel")
+def export_excel(db: Session = Depends(database.get_db)):
+    return excel_export.excel_response(
+        build_revenue_workbook(db), "bao_cao_doanh_thu.xlsx"
     )
 
 # ============================================================
 # 📄 EXPORT PDF FULL – KHÔNG LỖI FONT
 # ============================================================
-@router.get("/export/pdf")
-def export_pdf(db: Session = Depends(database.get_db)):
-
-    buffer = BytesIO()
+def render_revenue_pdf(db: Session, buffer):
+    """Vẽ báo cáo doanh thu vào buffer (file hoặc BytesIO)."""
     p = canvas.Canvas(buffer, pagesize=A4)
 
     # ========== 1️⃣ LẤY DỮ LIỆU CHUNG ==========
-    completed_orders = db.query(models.Order).filter(models.Order.status == "Hoàn thành")
-
-    total_revenue = (
-        completed_orders.with_entities(func.sum(models.Order.amount)).scalar() or 0
-    )
+    total_revenue = revenue_rollup.total_revenue(db)
 
     # Tăng trưởng
-    last_two = (
-        completed_orders.with_entities(
-            extract("month", models.Order.date),
-            func.sum(models.Order.amount)
-        )
-        .group_by(extract("month", models.Order.date))
-        .order_by(extract("month", models.Order.date).desc())
-        .limit(2)
-        .all()
-    )
+    by_month = revenue_rollup.by_month(db)
+    last_two = by_month[::-1][:2]
 
     growth = 0
     if len(last_two) == 2:
-        cur, prev = float(last_two[0][1] or 0), float(last_two[1][1] or 0)
+        cur, prev = float(last_two[0][2] or 0), float(last_two[1][2] or 0)
         if prev > 0:
             growth = ((cur - prev) / prev) * 100
 
@@ -447,19 +344,9 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "Doanh thu theo thang:")
     y -= 25
 
-    by_month = (
-        completed_orders.with_entities(
-            extract("month", models.Order.date),
-            func.sum(models.Order.amount),
-        )
-        .group_by(extract("month", models.Order.date))
-        .order_by(extract("month", models.Order.date))
-        .all()
-    )
-
     p.setFont("Helvetica", 12)
-    for m, total in by_month:
-        p.drawString(60, y, f"- Thang {int(m)}: {float(total):,.0f} VND")
+    for yr, m, total in by_month:
+        p.drawString(60, y, f"- Thang {int(m)}/{int(yr)}: {float(total):,.0f} VND")
         y -= 20
 
     y -= 10
@@ -469,12 +356,7 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "Doanh thu theo danh muc:")
     y -= 25
 
-    by_category = (
-        completed_orders.join(models.Product)
-        .with_entities(models.Product.category, func.sum(models.Order.amount))
-        .group_by(models.Product.category)
-        .all()
-    )
+    by_category = revenue_rollup.by_product_category(db, lower=False)
 
     p.setFont("Helvetica", 12)
     for cat, total in by_category:
@@ -489,11 +371,7 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "Doanh thu theo khu vuc:")
     y -= 25
 
-    by_region = (
-        completed_orders.with_entities(models.Order.region, func.sum(models.Order.amount))
-        .group_by(models.Order.region)
-        .all()
-    )
+    by_region = revenue_rollup.by_region(db)
 
     p.setFont("Helvetica", 12)
     for region, total in by_region:
@@ -508,19 +386,7 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "Top 10 san pham ban chay:")
     y -= 25
 
-    top_products = (
-        db.query(
-            models.Product.name,
-            func.sum(models.Order.quantity),
-            func.sum(models.Order.amount)
-        )
-        .join(models.Product)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Product.id)
-        .order_by(func.sum(models.Order.quantity).desc())
-        .limit(10)
-        .all()
-    )
+    top_products = revenue_rollup.top_products(db, limit=10)
 
     p.setFont("Helvetica", 12)
     for name, qty, revenue in top_products:
@@ -534,19 +400,7 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "Top 10 khach hang chi tieu nhieu nhat:")
     y -= 25
 
-    top_customers = (
-        db.query(
-            models.Customer.name,
-            func.count(models.Order.id),
-            func.sum(models.Order.amount)
-        )
-        .join(models.Customer)
-        .filter(models.Order.status == "Hoàn thành")
-        .group_by(models.Customer.id)
-        .order_by(func.sum(models.Order.amount).desc())
-        .limit(10)
-        .all()
-    )
+    top_customers = revenue_rollup.top_customers(db, limit=10)
 
     p.setFont("Helvetica", 12)
     for name, count_order, spend in top_customers:
@@ -557,6 +411,13 @@ def export_pdf(db: Session = Depends(database.get_db)):
     p.showPage()
     p.save()
 
+
+@router.get("/export/pdf")
+def export_pdf(db: Session = Depends(database.get_db)):
+
+    buffer = BytesIO()
+    render_revenue_pdf(db, buffer)
+
     buffer.seek(0)
     return StreamingResponse(
         buffer,
@@ -589,101 +450,101 @@ def order_report_status(db: Session = Depends(database.get_db)):
 # ==========================================================
 # 📅 REPORT: SỐ ĐƠN THEO THÁNG
 # ==========================================================
-@router.get("/report/month")
-def order_report_month(db: Session = Depends(database.get_db)):
-
-    data = (
-        db.query(
-            extract("month", models.Order.date).label("month"),
-            func.count(models.Order.id).label("count")
-        )
-        .group_by("month")
-        .order_by("month")
+def orders_by_month(db: Session, start=None, end=None):
+    """
+    [(year, month, count)] — lọc khoảng ngày (sargable), nhóm theo
+    date_trunc('month'). COUNT(*) để index (status, date) đủ cho
+    index-only scan, không cần đọc bảng.
+    """
+    bucket = month_bucket(db, models.Order.date).label("bucket")
+    query = db.query(bucket, func.count().label("count"))
+    rows = (
+        apply_range(query, models.Order.date, start, end)
+        .group_by(bucket)
+        .order_by(bucket)
         .all()
     )
 
+    result = []
+    for b, count in rows:
+        b = date.fromisoformat(b) if isinstance(b, str) else b
+        result.append((b.year, b.month, int(count or 0)))
+    return result
+
+
+@router.get("/report/month")
+def order_report_month(
+    year: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(database.get_db),
+):
+    # Mặc định năm hiện tại: trước đây gộp cùng tháng của mọi năm vào 1 cột
+    if not (year or date_from or date_to):
+        year = date.today().year
+    start, end = resolve_range(year=year, date_from=date_from, date_to=date_to)
+
     return [
         {
-            "month": int(month),
-            "count": int(count or 0)        # ⭐ MUST FIX – ép int
+            "year": y,
+            "month": m,
+            "count": count,
         }
-        for month, count in data
+        for y, m, count in orders_by_month(db, start, end)
     ]
 # ============================================================
 # 📤 EXPORT EXCEL – SUMMARY REPORT
 # ============================================================
-@router.get("/export/summary-excel")
-def export_summary_excel(db: Session = Depends(database.get_db)):
+def build_summary_workbook(db: Session):
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "BAO CAO TONG HOP"
+    wb = excel_export.new_workbook()
+    ws = excel_export.add_sheet(
+        wb, "BAO CAO TONG HOP", widths={c: 25 for c in "ABCD"}
+    )
 
-    ws.merge_cells("A1:D1")
-    ws["A1"] = "BÁO CÁO TỔNG HỢP HỆ THỐNG"
-    ws["A1"].font = openpyxl.styles.Font(size=18, bold=True)
+    excel_export.write_title(ws, "BÁO CÁO TỔNG HỢP HỆ THỐNG", merge="A1:D1")
     ws.append([])
 
-    # ========== LẤY DỮ LIỆU ==========
-
-    employees_count = db.query(models.Employee).count()
-    customers_count = db.query(models.Customer).count()
-    products_count = db.query(models.Product).count()
-    inventory_items = db.query(models.Inventory).all()
-
-    total_stock = sum((i.quantity or 0) for i in inventory_items)
+    # ========== LẤY DỮ LIỆU (đã GROUP BY trong SQL) ==========
+    overview = summary_overview(db)
+    stock_by_product = summary_stock_by_product(db)
 
     ws.append(["Thông tin", "Giá trị"])
-    ws.append(["Tổng nhân viên", employees_count])
-    ws.append(["Tổng khách hàng", customers_count])
-    ws.append(["Tổng sản phẩm", products_count])
-    ws.append(["Tổng tồn kho", total_stock])
+    ws.append(["Tổng nhân viên", overview["employees_count"]])
+    ws.append(["Tổng khách hàng", overview["customers_count"]])
+    ws.append(["Tổng sản phẩm", overview["products_count"]])
+    ws.append(["Tổng tồn kho", overview["total_stock"]])
 
+    # Mỗi sản phẩm 1 dòng (trước đây là mỗi phiếu kho 1 dòng)
     ws.append([])
     ws.append(["TỒN KHO THEO SẢN PHẨM"])
     ws.append(["Sản phẩm", "Tồn kho"])
 
-    for i in inventory_items:
-        ws.append([
-            i.product.name if i.product else "Unknown",
-            int(i.quantity or 0)
-        ])
+    excel_export.write_rows(
+        ws, stock_by_product, to_row=lambda i: [i["name"], i["stock"]]
+    )
 
     ws.append([])
     ws.append(["TOP 5 SẢN PHẨM TỒN NHIỀU"])
     ws.append(["Sản phẩm", "Tồn kho"])
 
-    inventory_sorted = sorted(
-        inventory_items, key=lambda x: x.quantity or 0, reverse=True
-    )[:5]
-
-    for i in inventory_sorted:
-        ws.append([i.product.name, int(i.quantity or 0)])
+    excel_export.write_rows(
+        ws, stock_by_product[:5], to_row=lambda i: [i["name"], i["stock"]]
+    )
 
-    # Resize columns
-    for col in ["A", "B", "C", "D"]:
-        ws.column_dimensions[col].width = 25
+    return wb
 
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
 
-    return StreamingResponse(
-        stream,
-        media_type=(
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ),
-        headers={
-            "Content-Disposition": "attachment; filename=bao_cao_tong_hop.xlsx"
-        },
+@router.get("/export/summary-excel")
+def export_summary_excel(db: Session = Depends(database.get_db)):
+    return excel_export.excel_response(
+        build_summary_workbook(db), "bao_cao_tong_hop.xlsx"
     )
 # ============================================================
 # 📄 EXPORT PDF – SUMMARY REPORT (FULL, KHONG DAU)
 # ============================================================
-@router.get("/export/summary-pdf")
-def export_summary_pdf(db: Session = Depends(database.get_db)):
-
-    buffer = BytesIO()
+def render_summary_pdf(db: Session, buffer):
+    """Vẽ báo cáo tổng hợp vào buffer (file hoặc BytesIO)."""
     p = canvas.Canvas(buffer, pagesize=A4)
 
     # FONT
@@ -693,13 +554,10 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
     p.setFont("Helvetica", 12)
 
     # ===============================
-    # 1️⃣ LAY DU LIEU
+    # 1️⃣ LAY DU LIEU (cung aggregate voi /reports/summary, GROUP BY trong SQL)
     # ===============================
-    employees = db.query(models.Employee).count()
-    customers = db.query(models.Customer).count()
-    products = db.query(models.Product).count()
-    inventory_items = db.query(models.Inventory).all()
-    total_stock = sum((i.quantity or 0) for i in inventory_items)
+    overview = summary_overview(db)
+    stock_by_product = summary_stock_by_product(db)
 
     # Thong ke don hang
     orders_by_status = (
@@ -708,15 +566,8 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
         .all()
     )
 
-    orders_by_month = (
-        db.query(
-            extract("month", models.Order.date).label("month"),
-            func.count(models.Order.id)
-        )
-        .group_by("month")
-        .order_by("month")
-        .all()
-    )
+    this_year = date.today().year
+    months = orders_by_month(db, date(this_year, 1, 1), date(this_year, 12, 31))
 
     # ===============================
     # 2️⃣ TONG QUAN
@@ -727,13 +578,13 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
     y -= 25
 
     p.setFont("Helvetica", 12)
-    p.drawString(60, y, f"- Tong nhan vien: {employees}")
+    p.drawString(60, y, f"- Tong nhan vien: {overview['employees_count']}")
     y -= 20
-    p.drawString(60, y, f"- Tong khach hang: {customers}")
+    p.drawString(60, y, f"- Tong khach hang: {overview['customers_count']}")
     y -= 20
-    p.drawString(60, y, f"- Tong san pham: {products}")
+    p.drawString(60, y, f"- Tong san pham: {overview['products_count']}")
     y -= 20
-    p.drawString(60, y, f"- Tong so luong ton kho: {total_stock}")
+    p.drawString(60, y, f"- Tong so luong ton kho: {overview['total_stock']}")
     y -= 30
 
     # ===============================
@@ -743,20 +594,15 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
     p.drawString(50, y, "2. Top 5 san pham ton kho nhieu nhat")
     y -= 25
 
-    top5 = sorted(inventory_items, key=lambda x: x.quantity or 0, reverse=True)[:5]
-
     p.setFont("Helvetica", 12)
-    for item in top5:
-        p.drawString(
-            60, y,
-            f"- {item.product.name if item.product else 'Unknown'}: {int(item.quantity or 0)}"
-        )
+    for item in stock_by_product[:5]:
+        p.drawString(60, y, f"- {item['name']}: {item['stock']}")
         y -= 20
 
     y -= 20
 
     # ===============================
-    # 4️⃣ DANH SACH TON KHO DAY DU
+    # 4️⃣ DANH SACH TON KHO DAY DU (moi san pham 1 dong)
     # ===============================
     p.setFont("Helvetica-Bold", 14)
     p.drawString(50, y, "3. Danh sach ton kho tat ca san pham")
@@ -764,9 +610,8 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
 
     p.setFont("Helvetica", 11)
 
-    for item in inventory_items:
-        text = f"- {item.product.name if item.product else 'Unknown'}: {int(item.quantity or 0)}"
-        p.drawString(60, y, text)
+    for item in stock_by_product:
+        p.drawString(60, y, f"- {item['name']}: {item['stock']}")
         y -= 15
         if y < 40:       # auto xuống trang
             p.showPage()
@@ -795,11 +640,11 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
     # 6️⃣ SO DON THEO THANG
     # ===============================
     p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y, "5. So don theo thang")
+    p.drawString(50, y, f"5. So don theo thang (nam {this_year})")
     y -= 25
 
-    for month, count in orders_by_month:
-        p.drawString(60, y, f"- Thang {int(month)}: {int(count)} don")
+    for year, month, count in months:
+        p.drawString(60, y, f"- Thang {month}/{year}: {count} don")
         y -= 20
 
     y -= 30
@@ -822,35 +667,35 @@ def export_summary_pdf(db: Session = Depends(database.get_db)):
     p.showPage()
     p.save()
 
+
+@router.get("/export/summary-pdf")
+def export_summary_pdf(db: Session = Depends(database.get_db)):
+
+    buffer = BytesIO()
+    render_summary_pdf(db, buffer)
+
     buffer.seek(0)
     return StreamingResponse(
         buffer,
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=bao_cao_tong_hop.pdf"},
     )
-# app/routers/reports.py
-@router.get("/forecast")
-def forecast_revenue():
-    # Demo: dự đoán dựa trên tăng trưởng 3 tháng gần nhất
-    import random
-    
-    months = [9, 10, 11]
-    real = [400_000, 620_000, 900_000]
 
-    # Dự đoán tháng 12
-    next_value = int(real[-1] * random.uniform(1.05, 1.25))
+
+@router.get("/forecast")
+def forecast_revenue(db: Session = Depends(database.get_db)):
+    # Dự đoán tháng kế tiếp từ doanh thu thực tế 3 tháng gần nhất
+    data = build_forecast(db, horizon=1, history=3)
+    nxt = data["forecast"][0] if data["forecast"] else None
 
     return {
-        "real": [
-            {"month": m, "value": real[i]}
-            for i, m in enumerate(months)
-        ],
-        "forecast": [
-            {"month": 12, "value": next_value}
-        ],
+        "real": [{"month": r["month"], "value": r["value"]} for r in data["real"]],
+        "forecast": (
+            [{"month": int(nxt["month"][1:]), "value": nxt["value"]}] if nxt else []
+        ),
         "summary": {
-            "predicted_revenue": next_value,
-            "growth_rate": round((next_value - real[-1]) / real[-1] * 100, 1),
-            "suggestion": "Nên nhập thêm nhóm hàng bán chạy để tăng trưởng tốt hơn."
-        }
+            "predicted_revenue": data["summary"]["predicted_revenue"],
+            "growth_rate": round(data["summary"]["growth_rate"], 1),
+            "suggestion": data["summary"]["suggestion"],
+        },
     }
@@ -1,79 +1,23 @@
-from fastapi import APIRouter
-from datetime import datetime
-import statistics
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
 
-router = APIRouter(prefix="/reports-forecast", tags=["AI Forecast"])
-
-REAL_REVENUE = [
-    {"month": 7, "value": 120_000_000},
-    {"month": 8, "value": 150_000_000},
-    {"month": 9, "value": 180_000_000},
-    {"month": 10, "value": 220_000_000},
-    {"month": 11, "value": 260_000_000},
-    {"month": 12, "value": 310_000_000},
-]
-
-# --------------------------------------------------
-# 📌 1. Weighted Moving Average (WMA)
-# --------------------------------------------------
-def weighted_moving_average(data):
-    weights = [1, 2, 3]  # tháng mới nhất quan trọng nhất
-    last3 = [i["value"] for i in data[-3:]]
-    wma = sum(v * w for v, w in zip(last3, weights)) / sum(weights)
-    return int(wma)
-
-# --------------------------------------------------
-# 📌 2. Tính xu hướng tăng trưởng trung bình
-# --------------------------------------------------
-def detect_trend(data):
-    diffs = []
-    for i in range(1, len(data)):
-        diffs.append(data[i]["value"] - data[i-1]["value"])
-
-    avg_growth = statistics.mean(diffs)
-    return avg_growth
+from app.database import get_db
+from app.utils import forecast as engine
 
-# --------------------------------------------------
-# 📌 3. Điều chỉnh theo mùa (seasonal adjustment)
-# --------------------------------------------------
-def seasonal_adjustment(month):
-    # giả lập mô hình mùa vụ đơn giản
-    if month in [11, 12, 1]:      # mùa cao điểm
-        return 1.08
-    if month in [2, 3, 4]:        # thấp
-        return 0.97
-    return 1.0                    # bình thường
-
-# --------------------------------------------------
-# 📌 4. Dự đoán 6 tháng tiếp theo
-# --------------------------------------------------
-def forecast_next_months():
-    forecasts = []
-    wma = weighted_moving_average(REAL_REVENUE)
-    trend = detect_trend(REAL_REVENUE)
-
-    current_month = REAL_REVENUE[-1]["month"]
-    current_value = REAL_REVENUE[-1]["value"]
-
-    for i in range(1, 7):
-        future_month = (current_month + i - 1) % 12 + 1
-
-        # Công thức dự đoán mới
-        predicted = int(
-            (current_value + trend * i) * seasonal_adjustment(future_month)
-        )
+router = APIRouter(prefix="/reports-forecast", tags=["AI Forecast"])
 
-        forecasts.append({
-            "month": f"T{future_month}",
-            "value": predicted
-        })
+HISTORY_MONTHS = 6  # số tháng thực tế trả về cho biểu đồ
 
-    return forecasts
 
 # --------------------------------------------------
-# 📌 5. Gợi ý thông minh
+# 📌 1. Gợi ý thông minh
 # --------------------------------------------------
 def suggestion(value_now, value_next):
+    if not value_now:
+        if value_next > 0:
+            return "📈 Bắt đầu có doanh thu — theo dõi thêm vài tháng để dự báo chính xác hơn."
+        return "ℹ Chưa đủ dữ liệu đơn hoàn thành để dự báo."
+
     diff = value_next - value_now
     pct = diff / value_now * 100
 
@@ -85,22 +29,83 @@ def suggestion(value_now, value_next):
         return "⚠ Doanh thu tăng nhẹ — tối ưu chi phí để đạt lợi nhuận tốt hơn."
     return "🔻 Doanh thu có dấu giảm — cần xem lại tồn kho & nhóm sản phẩm bán chậm."
 
+
+def growth_rate(value_now, value_next, digits=2):
+    if not value_now:
+        return 0.0
+    return round((value_next - value_now) / value_now * 100, digits)
+
+
 # --------------------------------------------------
-# 📌 API chính
+# 📌 2. Dựng response từ engine dự báo
 # --------------------------------------------------
-@router.get("/forecast")
-def forecast():
-    forecasts = forecast_next_months()
+def _series_out(result, kind, key, horizon):
+    history, predicted = engine.series_forecast(result, kind, key)
+    predicted = predicted[:horizon]
+    current = int(history[-1]) if len(history) else 0
+    next_value = int(predicted[0]) if len(predicted) else 0
+    return {
+        "current": current,
+        "predicted_revenue": next_value,
+        "growth_rate": growth_rate(current, next_value),
+        "forecast": [int(v) for v in predicted],
+    }
+
 
-    next_month = forecasts[0]["value"]
-    current_month_value = REAL_REVENUE[-1]["value"]
+def build_forecast(db: Session, horizon: int = 6, history: int = HISTORY_MONTHS):
+    result = engine.get_forecast(db, horizon)
+
+    hist, predicted = engine.series_forecast(result)
+    months = result["months"][-history:]
+    real_values = hist[-history:] if len(hist) else []
+
+    current_value = int(hist[-1]) if len(hist) else 0
+    next_value = int(predicted[0]) if len(predicted) else 0
+    cur_y, cur_m = result["current_month"]
 
     return {
-        "real": REAL_REVENUE,
-        "forecast": forecasts,
+        "real": [
+            {"month": m, "year": y, "value": int(v)}
+            for (y, m), v in zip(months, real_values)
+        ],
+        # Tháng đang diễn ra: chỉ là doanh thu tới hôm nay, không nằm trong "real"
+        "current_month": {
+            "month": cur_m,
+            "year": cur_y,
+            "value_to_date": int(result["partial"][0]),
+            "partial": True,
+        },
+        "forecast": [
+            {"month": f"T{m}", "year": y, "value": int(v)}
+            for (y, m), v in zip(result["future_months"][:horizon], predicted)
+        ],
         "summary": {
-            "predicted_revenue": next_month,
-            "growth_rate": round((next_month - current_month_value) / current_month_value * 100, 2),
-            "suggestion": suggestion(current_month_value, next_month)
-        }
+            "predicted_revenue": next_value,
+            "growth_rate": growth_rate(current_value, next_value),
+            "suggestion": suggestion(current_value, next_value),
+        },
+        "model": result["primary"],
+        "models": {
+            name: [int(v) for v in fc[0][:horizon]]
+            for name, fc in result["forecasts"].items()
+        },
+        "by_category": {
+            key: _series_out(result, kind, key, horizon)
+            for kind, key in result["labels"] if kind == "category"
+        },
+        "by_region": {
+            key: _series_out(result, kind, key, horizon)
+            for kind, key in result["labels"] if kind == "region"
+        },
     }
+
+
+# --------------------------------------------------
+# 📌 API chính
+# --------------------------------------------------
+@router.get("/forecast")
+def forecast(
+    horizon: int = Query(6, ge=1, le=24),
+    db: Session = Depends(get_db),
+):
+    return build_forecast(db, horizon)
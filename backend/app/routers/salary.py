@@ -1,111 +1,129 @@
 # app/routers/salary.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
+from datetime import date
+from typing import Optional
 
 from app.database import get_db
-from app.models import Employee, Attendance
-
-import openpyxl
-from io import BytesIO
-from fastapi.responses import StreamingResponse
+from app.utils.dates import resolve_range
+from app.utils import excel_export, payroll, payslip_export
 
 router = APIRouter(prefix="/salary", tags=["Salary"])
 
-# ==========================
-# CẤU HÌNH LƯƠNG CHUNG
-# ==========================
-BASE_SALARY = 7000000     # 7 triệu
-WORKING_DAYS = 26
-LATE_PENALTY = 50000
-EARLY_PENALTY = 50000
-
 
 # ======================================================
 # ⭐ 1) API LẤY LƯƠNG TẤT CẢ NHÂN VIÊN
+#   1 truy vấn GROUP BY cho cả công ty (không gọi từng nhân viên)
 # ======================================================
 @router.get("/all")
 def salary_all(year: int, month: int, db: Session = Depends(get_db)):
-    employees = db.query(Employee).all()
-    result = []
+    resolve_range(year, month, required=True)
+
+    return [
+        {
+            "employee_id": s["employee_id"],
+            "employee_name": s["employee_name"],
+            "month": s["month_string"],
+            "base_salary": s["base_salary"],
+            "daily_salary": s["daily_salary"],
+            "total_days": s["total_days"],
+            "late": s["late"],
+            "early": s["early"],
+            "penalty": s["penalty"],
+            "final_salary": s["final_salary"],
+        }
+        for s in payroll.snapshot_payslips(db, year, month)
+    ]
+
+
+# ======================================================
+# ⭐ XUẤT TOÀN BỘ PHIẾU LƯƠNG THÁNG (ZIP)
+# /salary/export-all?year=2025&month=1
+# ======================================================
+@router.get("/export-all")
+def export_all_salary(year: int, month: int, db: Session = Depends(get_db)):
+    resolve_range(year, month, required=True)
+    slips = payroll.snapshot_payslips(db, year, month)
+
+    return StreamingResponse(
+        payslip_export.stream_payslip_zip(slips),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=salary_{year}_{month:02d}.zip"
+        },
+    )
+
 
-    for emp in employees:
-        salary = calc_salary(emp.id, year, month, db)
+# ======================================================
+# ⭐ KỲ LƯƠNG (SNAPSHOT)
+#   GET  /salary/runs/{year}/{month}         → thông tin kỳ (chỉ đọc, 404 nếu chưa tính)
+#   POST /salary/runs/{year}/{month}/rerun   → tính (lần đầu) / tính lại kỳ đang mở
+#   (các GET phiếu lương theo tháng ở trên vẫn tự tính snapshot khi
+#    kỳ chưa có hoặc stale — xem payroll.get_run)
+#   POST /salary/runs/{year}/{month}/close   → chốt kỳ
+#   POST /salary/runs/{year}/{month}/reopen  → mở lại kỳ đã chốt
+# ======================================================
+@router.get("/runs/{year}/{month}")
+def get_payroll_run(year: int, month: int, db: Session = Depends(get_db)):
+    return payroll.run_out(payroll.find_run(db, year, month))
+
+
+@router.post("/runs/{year}/{month}/rerun")
+def rerun_payroll(year: int, month: int, db: Session = Depends(get_db)):
+    resolve_range(year, month, required=True)
+    return payroll.run_out(payroll.rerun(db, year, month))
+
+
+@router.post("/runs/{year}/{month}/close")
+def close_payroll_run(year: int, month: int, db: Session = Depends(get_db)):
+    return payroll.run_out(payroll.close_run(db, year, month))
 
-        result.append({
-            "employee_id": emp.id,
-            "employee_name": emp.name,
-            "month": salary["month_string"],
-            "base_salary": salary["base_salary"],
-            "daily_salary": salary["daily_salary"],
-            "total_days": salary["total_days"],
-            "late": salary["late"],
-            "early": salary["early"],
-            "penalty": salary["penalty"],
-            "final_salary": salary["final_salary"],
-        })
 
-    return result
+@router.post("/runs/{year}/{month}/reopen")
+def reopen_payroll_run(year: int, month: int, db: Session = Depends(get_db)):
+    return payroll.run_out(payroll.reopen_run(db, year, month))
 
 
 # ======================================================
 # ⭐ 2) TÍNH LƯƠNG 1 NHÂN VIÊN
+# /salary/1?year=2025&month=1  hoặc  /salary/1?from=2025-01-01&to=2025-01-31
 # ======================================================
 @router.get("/{employee_id}")
-def calc_salary(employee_id: int, year: int, month: int, db: Session = Depends(get_db)):
-    emp = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not emp:
+def calc_salary(
+    employee_id: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    return employee_salary(db, employee_id, year, month, date_from, date_to)
+
+
+def employee_salary(
+    db: Session,
+    employee_id: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    start, end = resolve_range(year, month, date_from, date_to, required=True)
+
+    # Theo tháng → đọc snapshot kỳ lương; khoảng ngày tuỳ ý → tính trực tiếp
+    if year and month and not (date_from or date_to):
+        rows = payroll.snapshot_payslips(db, year, month, employee_id=employee_id)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
+        return rows[0]
+
+    rows = payroll.compute_payroll(db, start, end, year, month, employee_id=employee_id)
+    if not rows:
         raise HTTPException(status_code=404, detail="Nhân viên không tồn tại")
 
-    # Mặc định demo: lương cơ bản chung cho toàn bộ nhân viên
-    base_salary = BASE_SALARY
-    daily_salary = base_salary / WORKING_DAYS
-
-    # Lấy chấm công của tháng
-    records = (
-        db.query(Attendance)
-        .filter(
-            Attendance.employee_id == employee_id,
-            extract("year", Attendance.date) == year,
-            extract("month", Attendance.date) == month,
-        )
-        .all()
-    )
-
-    total_days = 0
-    late_count = 0
-    early_count = 0
-
-    for r in records:
-        if r.check_in and r.check_out:
-            total_days += 1
-
-        if r.status == "Late":
-            late_count += 1
-        elif r.status == "Early":
-            early_count += 1
-
-    salary_days = total_days * daily_salary
-    penalty = late_count * LATE_PENALTY + early_count * EARLY_PENALTY
-    final_salary = max(salary_days - penalty, 0)
-
-    return {
-        "employee_id": employee_id,
-        "employee_name": emp.name,
-        "department": emp.department,
-        "position": emp.position,
-        "year": year,
-        "month": month,
-        "month_string": f"{year}-{month:02d}",
-        "base_salary": int(base_salary),
-        "daily_salary": int(daily_salary),
-        "total_days": total_days,
-        "late": late_count,
-        "early": early_count,
-        "penalty": int(penalty),
-        "final_salary": int(final_salary),
-    }
+    return rows[0]
 
 
 # ======================================================
@@ -113,37 +131,11 @@ def calc_salary(employee_id: int, year: int, month: int, db: Session = Depends(g
 # ======================================================
 @router.get("/export/{employee_id}")
 def export_salary(employee_id: int, year: int, month: int, db: Session = Depends(get_db)):
-    salary = calc_salary(employee_id, year, month, db)
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Salary"
-
-    ws.append(["THÔNG TIN NHÂN VIÊN", ""])
-    ws.append(["Họ tên", salary["employee_name"]])
-    ws.append(["Phòng ban", salary["department"] or ""])
-    ws.append(["Chức vụ", salary["position"] or ""])
-    ws.append(["Tháng", salary["month_string"]])
-    ws.append([])
-
-    ws.append(["THÔNG TIN LƯƠNG", ""])
-    ws.append(["Lương cơ bản", salary["base_salary"]])
-    ws.append(["Lương mỗi ngày", salary["daily_salary"]])
-    ws.append(["Ngày công", salary["total_days"]])
-    ws.append(["Đi muộn", salary["late"]])
-    ws.append(["Về sớm", salary["early"]])
-    ws.append(["Tiền phạt", salary["penalty"]])
-    ws.append(["Lương thực lãnh", salary["final_salary"]])
+    salary = employee_salary(db, employee_id, year, month)
 
-    # Xuất file
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
+    wb = payslip_export.build_payslip_workbook(salary)
 
+    # Xuất file
     filename = f"salary_{employee_id}_{year}_{month}.xlsx"
 
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return excel_export.excel_response(wb, filename)
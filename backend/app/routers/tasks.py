@@ -8,6 +8,7 @@ import shutil
 
 from app.database import get_db
 from app import models, schemas
+from app.utils import home_cache
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
@@ -169,6 +170,7 @@ def create_task(data: schemas.TaskCreate, db: Session = Depends(get_db)):
 
     db.add(task)
     db.commit()
+    home_cache.invalidate(task.assigned_to_id)
     db.refresh(task)
 
     return get_task(task.id, db)
@@ -184,6 +186,7 @@ def update_task(task_id: int, data: schemas.TaskUpdate, db: Session = Depends(ge
         raise HTTPException(404, "Task không tồn tại")
 
     update_data = data.dict(exclude_unset=True)
+    previous_assignee = task.assigned_to_id
 
     # Ép logic:
     if update_data.get("status") == "done":
@@ -197,6 +200,7 @@ def update_task(task_id: int, data: schemas.TaskUpdate, db: Session = Depends(ge
 
     db.commit()
     db.refresh(task)
+    home_cache.invalidate(previous_assignee, task.assigned_to_id)
     return get_task(task.id, db)
 
 
@@ -224,6 +228,7 @@ def update_progress(
 
     db.commit()
     db.refresh(task)
+    home_cache.invalidate(task.assigned_to_id)
     return get_task(task.id, db)
 
 
@@ -236,8 +241,10 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     if not task:
         raise HTTPException(404, "Task không tồn tại")
 
+    assignee = task.assigned_to_id
     db.delete(task)
     db.commit()
+    home_cache.invalidate(assignee)
     return {"message": "Đã xóa task"}
 
 
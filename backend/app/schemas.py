@@ -105,6 +105,7 @@ class ProductUpdate(ProductBase):
 
 class ProductOut(ProductBase):
     id: int
+    reorder_level: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -132,6 +133,7 @@ class InventoryUpdate(InventoryBase):
 class InventoryOut(InventoryBase):
     id: int
     product_name: Optional[str] = None
+    stock_location: Optional[str] = None   # kho thật của phiếu xuất / hoàn theo đơn
 
     class Config:
         from_attributes = True
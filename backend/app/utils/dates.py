@@ -0,0 +1,74 @@
+# ==========================================================
+# 📅 TIỆN ÍCH KHOẢNG NGÀY
+#   Lọc theo khoảng (col >= start AND col <= end) thay cho
+#   extract("month", col) để PostgreSQL dùng được index trên cột ngày.
+# ==========================================================
+import calendar
+from datetime import date, datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+
+def month_range(year: int, month: int):
+    """Trả về (ngày đầu tháng, ngày cuối tháng)."""
+    if not 1 <= month <= 12:
+        raise HTTPException(400, "Tháng không hợp lệ (1-12)")
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def resolve_range(
+    year: int | None = None,
+    month: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    required: bool = False,
+):
+    """
+    Ưu tiên from/to; nếu không có thì dùng year + month.
+    Trả về (start, end) — cả hai đều tính cả ngày biên, có thể None.
+    """
+    if date_from or date_to:
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(400, "'from' phải trước hoặc bằng 'to'")
+        return date_from, date_to
+
+    if year and month:
+        return month_range(year, month)
+
+    if year:
+        return date(year, 1, 1), date(year, 12, 31)
+
+    if required:
+        raise HTTPException(400, "Cần truyền year + month hoặc from/to")
+
+    return None, None
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """
+    Đổi mốc thời gian người dùng gửi lên về UTC không tz, cùng hệ với các
+    cột created_at (datetime.utcnow). Không có tz → coi là giờ địa phương
+    của server (vd. "2026-10-01" = 00:00 giờ địa phương).
+    """
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def apply_range(query, column, start: date | None, end: date | None):
+    """Thêm điều kiện khoảng ngày (sargable) vào query."""
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column <= end)
+    return query
+
+
+def month_bucket(db, column):
+    """
+    Ngày đầu tháng của column (nhóm theo tháng mà không tách year / month).
+    PostgreSQL: date_trunc; SQLite (test): strftime.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("month", column)
+    return func.strftime("%Y-%m-01", column)
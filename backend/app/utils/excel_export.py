@@ -0,0 +1,74 @@
+# ==========================================================
+# 📤 ENGINE XUẤT EXCEL (WRITE-ONLY, STREAMING)
+#   - Workbook write-only: openpyxl ghi từng dòng ra file tạm,
+#     không giữ cả sheet trong RAM.
+#   - Dữ liệu lấy bằng yield_per (server-side cursor trên PostgreSQL).
+#   - File .xlsx đọc ra theo từng khúc và stream thẳng vào HTTP response.
+# ==========================================================
+import tempfile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from fastapi.responses import StreamingResponse
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK_SIZE = 64 * 1024
+YIELD_PER = 500
+
+
+def new_workbook():
+    """Tạo workbook ở chế độ write-only."""
+    return openpyxl.Workbook(write_only=True)
+
+
+def add_sheet(wb, title: str, widths: dict | None = None):
+    """Tạo sheet mới; độ rộng cột phải đặt trước khi ghi dòng đầu tiên."""
+    ws = wb.create_sheet(title=title)
+    for col, width in (widths or {}).items():
+        ws.column_dimensions[col].width = width
+    return ws
+
+
+def write_title(ws, text: str, merge: str | None = None, size: int = 18):
+    """Ghi dòng tiêu đề in đậm (tuỳ chọn gộp ô, vd "A1:E1")."""
+    cell = WriteOnlyCell(ws, value=text)
+    cell.font = Font(size=size, bold=True)
+    ws.append([cell])
+    if merge:
+        ws.merged_cells.add(merge)
+
+
+def stream_rows(query, batch_size: int = YIELD_PER):
+    """Duyệt kết quả query theo lô, không nạp toàn bộ vào bộ nhớ."""
+    return query.yield_per(batch_size)
+
+
+def write_rows(ws, rows, to_row=None):
+    """Ghi lần lượt từng dòng; to_row chuyển 1 bản ghi → list giá trị."""
+    for r in rows:
+        ws.append(to_row(r) if to_row else list(r))
+
+
+def _iter_file(fp):
+    try:
+        while True:
+            chunk = fp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fp.close()
+
+
+def excel_response(wb, filename: str) -> StreamingResponse:
+    """Lưu workbook ra file tạm và stream về client theo từng khúc."""
+    fp = tempfile.TemporaryFile()
+    wb.save(fp)
+    fp.seek(0)
+
+    return StreamingResponse(
+        _iter_file(fp),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
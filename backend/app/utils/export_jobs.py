@@ -0,0 +1,159 @@
+# ==========================================================
+# 🧵 HÀNG ĐỢI XUẤT FILE CHẠY NỀN (EXPORT JOBS)
+#   - POST tạo job → worker pool cục bộ render file
+#   - GET hỏi trạng thái, tải file khi xong
+#   - Yêu cầu giống hệt nhau khi job cũ chưa xong → dùng lại job cũ
+# ==========================================================
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from app import database
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join("tmp", "exports"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+JOB_TTL = timedelta(hours=1)
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_lock = threading.Lock()
+_jobs: dict[str, dict] = {}
+_inflight: dict[tuple, str] = {}
+
+# kind → {"render": fn(db, path, **params), "filename": str, "media_type": str,
+#          "params": {tên: kiểu vô hướng (int / str / float)}}
+RENDERERS: dict[str, dict] = {}
+
+SCALAR_TYPES = (int, str, float)
+
+
+def register(kind: str, filename: str, media_type: str, params: dict | None = None):
+    """
+    Đăng ký hàm render cho 1 loại export. filename có thể chứa {param}.
+    params: tham số bắt buộc và kiểu của nó — tham số lạ / thiếu / sai kiểu
+    bị từ chối ngay ở submit (400), không để job chạy rồi mới lỗi.
+    """
+    params = params or {}
+    for name, typ in params.items():
+        if typ not in SCALAR_TYPES:
+            raise ValueError(f"Tham số {name}: chỉ hỗ trợ kiểu {SCALAR_TYPES}")
+
+    def decorator(fn):
+        RENDERERS[kind] = {
+            "render": fn,
+            "filename": filename,
+            "media_type": media_type,
+            "params": params,
+        }
+        return fn
+    return decorator
+
+
+def validate_params(kind: str, params: dict | None) -> dict:
+    """Kiểm tra + chuẩn hoá tham số theo khai báo của kind. Sai → 400."""
+    schema = RENDERERS[kind]["params"]
+    params = params or {}
+
+    unknown = sorted(set(params) - set(schema))
+    if unknown:
+        raise HTTPException(400, f"Tham số không hỗ trợ cho {kind}: {', '.join(unknown)}")
+
+    missing = sorted(set(schema) - set(params))
+    if missing:
+        raise HTTPException(400, f"Thiếu tham số cho {kind}: {', '.join(missing)}")
+
+    normalized = {}
+    for name, typ in schema.items():
+        value = params[name]
+        if isinstance(value, (list, dict, bool)) or value is None:
+            raise HTTPException(400, f"Tham số {name} phải là {typ.__name__}")
+        try:
+            normalized[name] = typ(value.strip() if isinstance(value, str) else value)
+        except (TypeError, ValueError):
+            raise HTTPException(400, f"Tham số {name} phải là {typ.__name__}")
+    return normalized
+
+
+def _dedup_key(kind: str, params: dict):
+    return (kind, tuple(sorted(params.items())))
+
+
+def _purge_expired():
+    """Xoá job đã xong quá JOB_TTL cùng file của nó (gọi khi đang giữ _lock)."""
+    now = datetime.utcnow()
+    for job_id, job in list(_jobs.items()):
+        if job["status"] in ("done", "failed") and now - job["finished_at"] > JOB_TTL:
+            if job.get("path") and os.path.exists(job["path"]):
+                os.remove(job["path"])
+            del _jobs[job_id]
+
+
+def submit(kind: str, params: dict | None = None) -> dict:
+    if kind not in RENDERERS:
+        raise HTTPException(400, f"Loại export không hỗ trợ: {kind}")
+
+    params = validate_params(kind, params)
+    key = _dedup_key(kind, params)
+
+    with _lock:
+        _purge_expired()
+
+        job_id = _inflight.get(key)
+        if job_id:
+            return _jobs[job_id]
+
+        spec = RENDERERS[kind]
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": "pending",
+            "filename": spec["filename"].format(**params),
+            "media_type": spec["media_type"],
+            "path": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+        }
+        _jobs[job_id] = job
+        _inflight[key] = job_id
+
+    _executor.submit(_run, job_id)
+    return job
+
+
+def _run(job_id: str):
+    job = _jobs[job_id]
+    spec = RENDERERS[job["kind"]]
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"{job_id}_{job['filename']}")
+
+    job["status"] = "running"
+    db = database.SessionLocal()
+    try:
+        spec["render"](db, path, **job["params"])
+        job["path"] = path
+        job["status"] = "done"
+    except HTTPException as e:
+        job["status"] = "failed"
+        job["error"] = str(e.detail)
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        db.close()
+        job["finished_at"] = datetime.utcnow()
+        with _lock:
+            _inflight.pop(_dedup_key(job["kind"], job["params"]), None)
+
+
+def get(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Không tìm thấy job export")
+    return job
@@ -0,0 +1,234 @@
+# ==========================================================
+# 📈 ENGINE DỰ BÁO DOANH THU (NUMPY, VECTOR HOÁ)
+#   - Chuỗi doanh thu tháng lấy từ revenue_rollups (đơn "Hoàn thành"),
+#     trục tháng chạy tới tháng trước tháng hiện tại (tháng trống = 0);
+#     tháng đang diễn ra không fit, dự báo bắt đầu từ chính tháng đó
+#   - Mỗi dòng của ma trận là 1 chuỗi: tổng, từng danh mục, từng khu vực
+#   - WMA, xu hướng tuyến tính, Holt-Winters (mùa vụ 12 tháng)
+#     được fit cùng lúc cho mọi chuỗi
+#   - Kết quả cache đến khi có đơn hoàn thành mới (chữ ký rollup đổi)
+# ==========================================================
+import itertools
+import threading
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+Rollup = models.RevenueRollup
+
+SEASON = 12
+WMA_WEIGHTS = np.array([1.0, 2.0, 3.0])  # tháng mới nhất quan trọng nhất
+HW_GRID = (0.2, 0.5, 0.8)                # lưới alpha / beta / gamma
+MIN_HORIZON = 12                          # luôn fit sẵn 12 tháng để cache dùng chung
+
+_cache_lock = threading.Lock()
+_cache = {"signature": None, "horizon": None, "result": None}
+
+
+# ==========================================================
+# 📥 DỮ LIỆU
+# ==========================================================
+def _signature(db: Session):
+    """Chữ ký bảng rollup — đổi khi có đơn vào / ra trạng thái hoàn thành."""
+    return tuple(
+        db.query(
+            func.count(Rollup.id),
+            func.coalesce(func.sum(Rollup.order_count), 0),
+            func.coalesce(func.sum(Rollup.total), 0),
+            func.max(Rollup.day),
+        ).one()
+    )
+
+
+def _month_index(ym):
+    return ym[0] * 12 + ym[1] - 1
+
+
+def _month_from_index(i):
+    return i // 12, i % 12 + 1
+
+
+def load_series(db: Session, today: date | None = None):
+    """
+    Trả về (months, labels, Y, partial):
+      months: [(year, month)] liên tục từ tháng đầu có đơn đến THÁNG TRƯỚC
+              tháng hiện tại (tháng trống = 0, kể cả sau lần bán cuối)
+      labels: [("total", None), ("category", "gạch"), ("region", "HN"), ...]
+      Y: ma trận (số chuỗi × số tháng) — chỉ các tháng đã trọn vẹn
+      partial: doanh thu tháng hiện tại tính đến hôm nay (mỗi chuỗi 1 số),
+               không đưa vào fit vì tháng chưa kết thúc
+    """
+    today = today or date.today()
+    current = (today.year, today.month)
+
+    cat = func.lower(func.coalesce(models.Product.category, "khác"))
+    rows = (
+        db.query(Rollup.year, Rollup.month, cat, Rollup.region, func.sum(Rollup.total))
+        .outerjoin(models.Product, models.Product.id == Rollup.product_id)
+        .filter(Rollup.day <= today)
+        .group_by(Rollup.year, Rollup.month, cat, Rollup.region)
+        .all()
+    )
+    if not rows:
+        return [], [("total", None)], np.zeros((1, 0)), np.zeros(1)
+
+    first = _month_index(min((y, m) for y, m, *_ in rows))
+    end = _month_index(current)          # tháng hiện tại, không tính vào chuỗi
+    n_months = max(end - first, 0)
+    months = [_month_from_index(first + i) for i in range(n_months)]
+
+    categories = sorted({c for _, _, c, _, _ in rows})
+    regions = sorted({r or "Không xác định" for _, _, _, r, _ in rows})
+    labels = (
+        [("total", None)]
+        + [("category", c) for c in categories]
+        + [("region", r) for r in regions]
+    )
+    index = {label: i for i, label in enumerate(labels)}
+
+    Y = np.zeros((len(labels), n_months))
+    partial = np.zeros(len(labels))
+    for y, m, c, r, total in rows:
+        col = _month_index((y, m)) - first
+        target = partial if col == n_months else Y[:, col]
+        v = float(total or 0)
+        target[0] += v
+        target[index[("category", c)]] += v
+        target[index[("region", r or "Không xác định")]] += v
+
+    return months, labels, Y, partial
+
+
+# ==========================================================
+# 🧮 CÁC MÔ HÌNH (mọi hàm nhận Y: chuỗi × tháng)
+# ==========================================================
+def weighted_moving_average(Y, horizon):
+    k = min(len(WMA_WEIGHTS), Y.shape[1])
+    if k == 0:
+        return np.zeros((Y.shape[0], horizon))
+    w = WMA_WEIGHTS[-k:]
+    level = Y[:, -k:] @ w / w.sum()
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def linear_trend(Y, horizon):
+    n = Y.shape[1]
+    if n < 2:
+        return weighted_moving_average(Y, horizon)
+    t = np.arange(n)
+    slope, intercept = np.polyfit(t, Y.T, 1)
+    future = np.arange(n, n + horizon)
+    return intercept[:, None] + slope[:, None] * future[None, :]
+
+
+def _holt_winters_sse(Y, alpha, beta, gamma):
+    """Holt-Winters cộng tính; trả về (level, trend, season, sse) cho mọi chuỗi."""
+    n_series, n = Y.shape
+    level = Y[:, :SEASON].mean(axis=1)
+    trend = (Y[:, SEASON:2 * SEASON].mean(axis=1) - level) / SEASON
+    season = Y[:, :SEASON] - level[:, None]
+    sse = np.zeros(n_series)
+
+    for t in range(n):
+        s = season[:, t % SEASON]
+        pred = level + trend + s
+        err = Y[:, t] - pred
+        sse += err * err
+
+        new_level = alpha * (Y[:, t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, t % SEASON] = gamma * (Y[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    return level, trend, season, sse
+
+
+def holt_winters(Y, horizon):
+    """Fit lưới tham số, mỗi chuỗi chọn bộ (alpha, beta, gamma) có SSE nhỏ nhất."""
+    n_series, n = Y.shape
+    if n < 2 * SEASON:
+        return linear_trend(Y, horizon)
+
+    best_sse = np.full(n_series, np.inf)
+    best_fc = np.zeros((n_series, horizon))
+    steps = np.arange(1, horizon + 1)
+
+    for alpha, beta, gamma in itertools.product(HW_GRID, HW_GRID, HW_GRID):
+        level, trend, season, sse = _holt_winters_sse(Y, alpha, beta, gamma)
+        idx = (n + steps - 1) % SEASON
+        fc = level[:, None] + trend[:, None] * steps[None, :] + season[:, idx]
+
+        better = sse < best_sse
+        best_sse = np.where(better, sse, best_sse)
+        best_fc[better] = fc[better]
+
+    return best_fc
+
+
+MODELS = {
+    "wma": weighted_moving_average,
+    "linear": linear_trend,
+    "holt_winters": holt_winters,
+}
+
+
+# ==========================================================
+# 🚀 API CHÍNH CỦA ENGINE
+# ==========================================================
+def _future_months(today: date, horizon):
+    """Các tháng cần dự báo, bắt đầu từ tháng hiện tại (chưa trọn vẹn)."""
+    start = _month_index((today.year, today.month))
+    return [_month_from_index(start + i) for i in range(horizon)]
+
+
+def _fit(db: Session, horizon: int, today: date):
+    months, labels, Y, partial = load_series(db, today)
+    forecasts = {
+        name: np.maximum(fn(Y, horizon), 0) for name, fn in MODELS.items()
+    }
+    primary = "holt_winters" if Y.shape[1] >= 2 * SEASON else "linear"
+
+    return {
+        "months": months,
+        "future_months": _future_months(today, horizon),
+        "current_month": (today.year, today.month),
+        "partial": partial,
+        "labels": labels,
+        "history": Y,
+        "forecasts": forecasts,
+        "primary": primary,
+    }
+
+
+def get_forecast(db: Session, horizon: int = 6):
+    """Trả về kết quả fit; dùng lại cache nếu chưa có đơn hoàn thành mới."""
+    today = date.today()
+    # Sang tháng mới thì trục thời gian đổi dù không có đơn mới
+    signature = (_signature(db), today.year, today.month)
+    horizon = max(horizon, MIN_HORIZON)
+
+    with _cache_lock:
+        if (
+            _cache["signature"] == signature
+            and _cache["horizon"] is not None
+            and _cache["horizon"] >= horizon
+        ):
+            return _cache["result"]
+
+    result = _fit(db, horizon, today)
+
+    with _cache_lock:
+        _cache.update(signature=signature, horizon=horizon, result=result)
+
+    return result
+
+
+def series_forecast(result, kind="total", key=None, model=None):
+    """Lấy (lịch sử, dự báo) của 1 chuỗi từ kết quả get_forecast."""
+    i = result["labels"].index((kind, key))
+    model = model or result["primary"]
+    return result["history"][i], result["forecasts"][model][i]
@@ -0,0 +1,84 @@
+# ==========================================================
+# 🏠 CACHE TRANG CHỦ NHÂN VIÊN (EMPLOYEE HOME)
+#   - Khoá = employee_id, LRU tối đa HOME_CACHE_SIZE mục, sống HOME_CACHE_TTL giây
+#     (sang ngày mới tự coi như hết hạn: chấm công hôm nay / KPI tháng đổi)
+#   - Ghi dữ liệu của nhân viên (chấm công, phúc lợi, hợp đồng, task)
+#     → invalidate(employee_id) SAU khi commit
+#   - Mỗi nhân viên có "thế hệ": invalidate tăng thế hệ, payload tính
+#     từ thế hệ cũ (request đọc chạy song song với request ghi) bị bỏ
+#   - stats(): hit / miss / eviction cho /employee-home/cache-stats
+# ==========================================================
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+HOME_CACHE_SIZE = int(os.getenv("HOME_CACHE_SIZE", "2000"))
+HOME_CACHE_TTL = float(os.getenv("HOME_CACHE_TTL", "300"))  # giây
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # employee_id → (expires, day, payload)
+_generations = {}          # employee_id → số lần invalidate
+_epoch = 0                 # tăng khi clear() toàn bộ
+_counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def lookup(employee_id: int):
+    """Trả về (payload | None, token). Token dùng cho store() khi miss."""
+    today = date.today()
+    with _lock:
+        entry = _entries.get(employee_id)
+        if entry is not None:
+            expires, day, payload = entry
+            if day == today and time.monotonic() < expires:
+                _entries.move_to_end(employee_id)
+                _counters["hits"] += 1
+                return payload, None
+            del _entries[employee_id]
+
+        _counters["misses"] += 1
+        return None, (_epoch, _generations.get(employee_id, 0), today)
+
+
+def store(employee_id: int, token, payload):
+    """Lưu payload nếu từ lúc lookup() chưa có invalidate nào cho nhân viên này."""
+    with _lock:
+        if token != (_epoch, _generations.get(employee_id, 0), token[2]):
+            return
+        _entries[employee_id] = (time.monotonic() + HOME_CACHE_TTL, token[2], payload)
+        _entries.move_to_end(employee_id)
+        while len(_entries) > HOME_CACHE_SIZE:
+            _entries.popitem(last=False)
+            _counters["evictions"] += 1
+
+
+def invalidate(*employee_ids):
+    with _lock:
+        for employee_id in set(employee_ids):
+            if employee_id is None:
+                continue
+            _generations[employee_id] = _generations.get(employee_id, 0) + 1
+            _entries.pop(employee_id, None)
+            _counters["invalidations"] += 1
+
+
+def clear():
+    """Dữ liệu dùng chung nhiều nhân viên đổi (vd. sửa chương trình phúc lợi)."""
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _entries.clear()
+        _counters["invalidations"] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        lookups = _counters["hits"] + _counters["misses"]
+        return {
+            **_counters,
+            "size": len(_entries),
+            "max_size": HOME_CACHE_SIZE,
+            "ttl_seconds": HOME_CACHE_TTL,
+            "hit_rate": round(_counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
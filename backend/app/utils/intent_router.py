@@ -0,0 +1,98 @@
+# ==========================================================
+# 🧭 BỘ ĐỊNH TUYẾN Ý ĐỊNH (INTENT ROUTER) CHO CHATBOT
+#   - Chuẩn hoá câu hỏi: chữ thường, bỏ dấu tiếng Việt (đ → d)
+#   - Toàn bộ từ khoá được biên dịch sẵn thành 1 regex duy nhất,
+#     quét câu hỏi 1 lần là biết mọi ý định xuất hiện
+#   - Ý định nào khớp thì chỉ chạy đúng handler đó (lazy)
+# ==========================================================
+import re
+import unicodedata
+
+
+def strip_accents(text: str) -> str:
+    """'Doanh thu THÁNG này' → 'doanh thu thang nay'"""
+    text = text.lower().replace("đ", "d")
+    text = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def normalize(text: str) -> str:
+    return " ".join(strip_accents(text or "").split())
+
+
+class IntentRouter:
+    """
+    Đăng ký theo thứ tự ưu tiên: ý định cụ thể đăng ký trước.
+    Khi câu hỏi khớp nhiều ý định, ý định đăng ký sớm nhất thắng.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._priority = {}
+        self._keyword_intent = {}
+        self._pattern = None
+
+    def intent(self, name: str, *keywords: str):
+        def decorator(fn):
+            self._handlers[name] = fn
+            self._priority.setdefault(name, len(self._priority))
+            for kw in keywords:
+                self._keyword_intent[normalize(kw)] = name
+            self._pattern = None
+            return fn
+        return decorator
+
+    def _compile(self):
+        # Từ khoá dài trước để "top san pham" thắng "san pham" tại cùng vị trí
+        words = sorted(self._keyword_intent, key=len, reverse=True)
+        alternation = "|".join(re.escape(w) for w in words)
+        self._pattern = re.compile(rf"(?<![a-z0-9])(?:{alternation})(?![a-z0-9])")
+
+    def classify(self, text: str):
+        """Trả về tên ý định ưu tiên cao nhất, hoặc None."""
+        if self._pattern is None:
+            self._compile()
+
+        best = None
+        for m in self._pattern.finditer(normalize(text)):
+            name = self._keyword_intent[m.group(0)]
+            if best is None or self._priority[name] < self._priority[best]:
+                best = name
+        return best
+
+    def dispatch(self, text: str, *args, fallback=None, **kwargs):
+        name = self.classify(text)
+        handler = self._handlers.get(name, fallback)
+        return handler(*args, **kwargs) if handler else None
+
+
+# ==========================================================
+# ⏱ MICRO-BENCHMARK: python -m app.utils.intent_router
+# ==========================================================
+if __name__ == "__main__":
+    import time
+
+    from app.routers.ai_chat import intents
+
+    prompts = [
+        "Xin chào",
+        "Doanh thu hôm nay?",
+        "Doanh thu theo từng tháng?",
+        "doanh thu nam nay bao nhieu",
+        "Bao nhiêu đơn hoàn thành?",
+        "Top sản phẩm bán chạy?",
+        "Top khách hàng chi nhiều?",
+        "Công ty có bao nhiêu nhân viên?",
+        "Cảm ơn nhé",
+        "thời tiết hôm qua thế nào",
+    ]
+
+    n = 200_000
+    start = time.perf_counter()
+    for i in range(n):
+        intents.classify(prompts[i % len(prompts)])
+    elapsed = time.perf_counter() - start
+
+    for p in prompts:
+        print(f"{p!r:40} → {intents.classify(p)}")
+    print(f"\n{n} lần phân loại trong {elapsed:.3f}s → {n / elapsed:,.0f} câu/giây")
@@ -0,0 +1,86 @@
+# ==========================================================
+# 📉 CẢNH BÁO SẮP HẾT HÀNG (LOW STOCK)
+#   - Mỗi sản phẩm có ngưỡng riêng: products.reorder_level
+#   - "Sắp hết" = stock < reorder_level (khớp partial index
+#     ix_products_low_stock (id DESC) → truy vấn chỉ quét sản phẩm dưới
+#     ngưỡng; danh sách phân trang keyset theo id DESC đọc thẳng index)
+#   - check() gọi sau mỗi lần đổi tồn kho, trong cùng transaction:
+#       vượt xuống dưới ngưỡng → 1 thông báo, đánh dấu low_stock_alerted
+#       lên lại trên ngưỡng    → bỏ đánh dấu (lần sau hụt lại sẽ báo tiếp)
+#     UPDATE ... RETURNING nên 2 request song song không báo trùng
+# ==========================================================
+from sqlalchemy import and_, func, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.notify import push_notify
+
+P = models.Product
+
+
+def is_low():
+    return P.stock < P.reorder_level
+
+
+def low_stock_products(db: Session, limit: int | None = None):
+    query = db.query(P).filter(is_low()).order_by(P.stock.asc(), P.id)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def low_stock_page(db: Session, limit: int | None = None, before_id: int | None = None):
+    """Sản phẩm dưới ngưỡng theo id DESC; before_id = id cuối trang trước."""
+    query = db.query(P).filter(is_low())
+    if before_id is not None:
+        query = query.filter(P.id < before_id)
+    query = query.order_by(P.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def count(db: Session) -> int:
+    return db.query(func.count(P.id)).filter(is_low()).scalar() or 0
+
+
+def check(db: Session, product_ids=None):
+    """
+    Phát hiện sản phẩm vừa vượt ngưỡng (product_ids=None → mọi sản phẩm).
+    Không commit. Trả về list (id, name, stock) vừa được cảnh báo.
+    """
+    if product_ids is not None:
+        product_ids = list(set(product_ids))
+        if not product_ids:
+            return []
+
+    def scoped(*conditions):
+        if product_ids is not None:
+            conditions += (P.id.in_(product_ids),)
+        return and_(*conditions)
+
+    db.flush()
+
+    crossed = db.execute(
+        update(P)
+        .where(scoped(is_low(), P.low_stock_alerted.is_(False)))
+        .values(low_stock_alerted=True)
+        .returning(P.id, P.name, P.stock, P.reorder_level)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    db.execute(
+        update(P)
+        .where(scoped(P.stock >= P.reorder_level, P.low_stock_alerted.is_(True)))
+        .values(low_stock_alerted=False)
+        .execution_options(synchronize_session=False)
+    )
+
+    for pid, name, stock, level in crossed:
+        push_notify(
+            db,
+            f"⚠️ Sản phẩm '{name}' sắp hết hàng: còn {stock} (ngưỡng {level})",
+            commit=False,
+        )
+
+    return [(pid, name, stock) for pid, name, stock, _ in crossed]
@@ -0,0 +1,149 @@
+# ==========================================================
+# 📊 SỐ LIỆU DASHBOARD QUẢN LÝ
+#   - Mỗi bảng 1 câu: COUNT(*) FILTER (WHERE ...) cho từng chỉ số
+#     (trước đây 13 câu COUNT riêng lẻ)
+#   - Snapshot cache trong process, sống STATS_TTL giây; các quản lý
+#     mở dashboard cùng lúc chờ chung 1 lần tính (single-flight)
+# ==========================================================
+import os
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import low_stock
+
+STATS_TTL = float(os.getenv("MANAGER_STATS_TTL", "15"))  # giây
+
+PENDING_STATUSES = ("Đang xử lý", "pending")
+COMPLETED_STATUSES = ("Hoàn thành", "completed")
+CANCELED_STATUSES = ("Đã hủy", "canceled")
+
+_lock = threading.Lock()
+_cache = {"expires": 0.0, "day": None, "stats": None}
+
+
+def _count(*conditions):
+    count = func.count()
+    return count.filter(*conditions) if conditions else count
+
+
+def task_counts(db: Session, today: date) -> dict:
+    T = models.Task
+    total, todo, in_progress, done, overdue = db.query(
+        _count(),
+        _count(T.status == "todo"),
+        _count(T.status == "in_progress"),
+        _count(T.status == "done"),
+        _count(T.deadline.isnot(None), T.deadline < today, T.status != "done"),
+    ).select_from(T).one()
+
+    return {
+        "total": total or 0,
+        "todo": todo or 0,
+        "in_progress": in_progress or 0,
+        "done": done or 0,
+        "overdue": overdue or 0,
+    }
+
+
+def order_counts(db: Session) -> dict:
+    O = models.Order
+    total, pending, completed, canceled = db.query(
+        _count(),
+        _count(O.status.in_(PENDING_STATUSES)),
+        _count(O.status.in_(COMPLETED_STATUSES)),
+        _count(O.status.in_(CANCELED_STATUSES)),
+    ).select_from(O).one()
+
+    return {
+        "total": total or 0,
+        "pending": pending or 0,
+        "completed": completed or 0,
+        "canceled": canceled or 0,
+    }
+
+
+def compute(db: Session, today: date | None = None) -> dict:
+    today = today or date.today()
+    E = models.Employee
+
+    employees, active_employees = db.query(
+        _count(), _count(E.active.is_(True))
+    ).select_from(E).one()
+
+    return {
+        "employees": employees or 0,
+        "active_employees": active_employees or 0,
+        "customers": db.query(func.count(models.Customer.id)).scalar() or 0,
+        "inventory_low": low_stock.count(db),
+        "tasks": task_counts(db, today),
+        "orders": order_counts(db),
+    }
+
+
+def get_stats(db: Session) -> dict:
+    """Snapshot dùng chung; hết hạn sau STATS_TTL giây hoặc khi sang ngày mới."""
+    today = date.today()
+
+    with _lock:
+        if _cache["stats"] is not None and _cache["day"] == today and time.monotonic() < _cache["expires"]:
+            return _cache["stats"]
+
+        # Giữ lock khi tính → request đến cùng lúc chờ rồi dùng lại kết quả
+        stats = compute(db, today)
+        _cache.update(stats=stats, day=today, expires=time.monotonic() + STATS_TTL)
+        return stats
+
+
+def clear():
+    with _lock:
+        _cache.update(stats=None, day=None, expires=0.0)
+
+
+# ==========================================================
+# ⏱ BENCHMARK: python -m app.utils.manager_stats
+#   So sánh số câu SQL + thời gian: 13 COUNT cũ / bản gộp / cache
+# ==========================================================
+if __name__ == "__main__":
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, engine
+
+    def legacy(db: Session, today: date):
+        E, T, O = models.Employee, models.Task, models.Order
+        count = lambda col, *f: db.query(func.count(col)).filter(*f).scalar() or 0
+        return (
+            count(E.id), count(E.id, E.active.is_(True)), count(models.Customer.id),
+            low_stock.count(db),
+            count(T.id), count(T.id, T.status == "todo"), count(T.id, T.status == "in_progress"),
+            count(T.id, T.status == "done"),
+            count(T.id, T.deadline.isnot(None), T.deadline < today, T.status != "done"),
+            count(O.id), count(O.id, O.status.in_(PENDING_STATUSES)),
+            count(O.id, O.status.in_(COMPLETED_STATUSES)),
+            count(O.id, O.status.in_(CANCELED_STATUSES)),
+        )
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+    def bench(name, fn, n=200):
+        statements.clear()
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:10} {len(statements) / n:5.1f} câu/lần  {elapsed / n * 1000:8.3f} ms/lần")
+
+    session = SessionLocal()
+    try:
+        today = date.today()
+        bench("cũ", lambda: legacy(session, today))
+        bench("gộp", lambda: compute(session, today))
+        clear()
+        bench("cache", lambda: get_stats(session))
+    finally:
+        session.close()
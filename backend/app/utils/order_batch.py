@@ -0,0 +1,170 @@
+# ==========================================================
+# 🔁 ĐỔI TRẠNG THÁI ĐƠN HÀNG HÀNG LOẠT
+#   - Khoá các đơn + sản phẩm liên quan (theo thứ tự id) trong 1 transaction
+#   - Hoàn kho được cộng trước (về đúng kho đã xuất), sau đó xuất kho trừ
+#     dần theo thứ tự yêu cầu (kho chọn FIFO); đơn nào làm kho âm thì bị
+#     từ chối, các đơn khác vẫn chạy
+#   - Ghi hàng loạt: trạng thái đơn, tồn kho (1 UPDATE / sản phẩm),
+#     phiếu kho, rollup doanh thu; 1 thông báo tổng; commit 1 lần
+# ==========================================================
+from collections import defaultdict
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import low_stock, revenue_rollup, stock_balances
+from app.utils.notify import push_notify
+
+COMPLETED_STATUS = revenue_rollup.COMPLETED_STATUS
+
+
+def update_statuses(db: Session, items) -> dict:
+    """items: list (order_id, status); order_id trùng → lấy yêu cầu cuối."""
+    wanted = {}
+    for order_id, status in items:
+        wanted.pop(order_id, None)
+        wanted[order_id] = status
+
+    errors = []
+
+    orders = {
+        o.id: o for o in
+        db.query(models.Order)
+        .filter(models.Order.id.in_(wanted))
+        .order_by(models.Order.id)
+        .with_for_update()
+    } if wanted else {}
+
+    # 1️⃣ Phân loại: xuất kho / hoàn kho / chỉ đổi trạng thái
+    exports, returns, plain = [], [], []
+    for order_id, status in wanted.items():
+        o = orders.get(order_id)
+        if not o:
+            errors.append({"order_id": order_id, "error": "Không tìm thấy đơn hàng"})
+            continue
+        if status == o.status:
+            continue
+        if status == COMPLETED_STATUS:
+            exports.append((o, status))
+        elif o.status == COMPLETED_STATUS:
+            returns.append((o, status))
+        else:
+            plain.append((o, status))
+
+    # 2️⃣ Khoá + đọc tồn kho các sản phẩm liên quan
+    product_ids = {o.product_id for o, _ in exports + returns}
+    stock = dict(
+        db.query(models.Product.id, models.Product.stock)
+        .filter(models.Product.id.in_(product_ids))
+        .order_by(models.Product.id)
+        .with_for_update()
+    ) if product_ids else {}
+
+    # Tồn theo kho: hàng hoàn về đúng kho đã xuất, xuất lấy FIFO
+    pools = stock_balances.load_pools(db, product_ids)
+    return_sources = stock_balances.return_parts(
+        db, [(o.id, o.quantity) for o, _ in returns if o.product_id in stock]
+    )
+
+    delta = defaultdict(int)
+    accepted_returns = []
+    for o, status in returns:
+        if o.product_id not in stock:
+            errors.append({"order_id": o.id, "error": "Không tìm thấy sản phẩm"})
+            continue
+        delta[o.product_id] += o.quantity
+        stock_balances.give(pools, o.product_id, return_sources[o.id])
+        accepted_returns.append((o, status, return_sources[o.id]))
+
+    accepted_exports = []
+    for o, status in exports:
+        if o.product_id not in stock:
+            errors.append({"order_id": o.id, "error": "Không tìm thấy sản phẩm"})
+            continue
+        available = (stock[o.product_id] or 0) + delta[o.product_id]
+        if available < o.quantity:
+            errors.append({
+                "order_id": o.id,
+                "error": f"Không đủ hàng để hoàn thành đơn (tồn kho: {available})",
+            })
+            continue
+        try:
+            parts = stock_balances.take(pools, o.product_id, o.quantity)
+        except HTTPException as e:
+            errors.append({"order_id": o.id, "error": e.detail})
+            continue
+        delta[o.product_id] -= o.quantity
+        accepted_exports.append((o, status, parts))
+
+    changed = [(o, status) for o, status, _ in accepted_exports + accepted_returns] + plain
+    result = [
+        {"order_id": o.id, "old_status": o.status, "status": status}
+        for o, status in changed
+    ]
+
+    # 3️⃣ Ghi hàng loạt
+    if changed:
+        conn = db.connection()
+
+        orders_t = models.Order.__table__
+        conn.execute(
+            update(orders_t)
+            .where(orders_t.c.id == bindparam("oid"))
+            .values(status=bindparam("new_status")),
+            [{"oid": o.id, "new_status": status} for o, status in changed],
+        )
+
+        moves = [(pid, d) for pid, d in delta.items() if d]
+        if moves:
+            products_t = models.Product.__table__
+            conn.execute(
+                update(products_t)
+                .where(products_t.c.id == bindparam("pid"))
+                .values(stock=products_t.c.stock + bindparam("change")),
+                [{"pid": pid, "change": d} for pid, d in moves],
+            )
+
+        today = date.today()
+        ledger = [
+            m
+            for o, _, parts in accepted_exports
+            for m in stock_balances.order_movements(
+                o.product_id, o.id, parts, -1, f"Xuất kho đơn #{o.id}", today,
+            )
+        ] + [
+            m
+            for o, _, parts in accepted_returns
+            for m in stock_balances.order_movements(
+                o.product_id, o.id, parts, 1, f"Hoàn kho đơn #{o.id}", today,
+            )
+        ]
+        if ledger:
+            conn.execute(insert(models.Inventory.__table__), ledger)
+            stock_balances.apply_many(db, ledger)
+            low_stock.check(db, [pid for pid, _ in moves])
+
+        # Xuất (+1) và hoàn (-1) gộp chung → 1 lượt upsert cho cả batch
+        revenue_rollup.apply_signed(
+            db,
+            [(revenue_rollup.order_dict(o), 1) for o, _, _ in accepted_exports]
+            + [(revenue_rollup.order_dict(o), -1) for o, _, _ in accepted_returns],
+        )
+
+        push_notify(
+            db,
+            f"Cập nhật trạng thái {len(changed)} đơn hàng "
+            f"({len(accepted_exports)} hoàn thành, {len(accepted_returns)} hoàn kho)",
+            commit=False,
+        )
+
+    db.commit()
+
+    return {
+        "updated": len(changed),
+        "failed": len(errors),
+        "items": result,
+        "errors": errors,
+    }
@@ -0,0 +1,189 @@
+# ==========================================================
+# 📥 NHẬP ĐƠN HÀNG HÀNG LOẠT (CSV / NDJSON)
+#   - Đọc file theo dòng, validate bằng schemas.OrderCreate
+#   - Khách hàng / sản phẩm nạp sẵn 1 lần (sản phẩm khoá FOR UPDATE)
+#   - Đơn hợp lệ: INSERT nhiều dòng 1 lượt, trừ kho 1 UPDATE / sản phẩm,
+#     phiếu xuất kho (kho chọn FIFO theo stock_balances) ghi bằng
+#     executemany, rollup gộp theo khoá
+#   - Dòng lỗi không chặn cả file: trả về danh sách lỗi theo số dòng
+#   - Toàn bộ file commit 1 lần
+# ==========================================================
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import date
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.utils import low_stock, revenue_rollup, stock_balances
+from app.utils.notify import push_notify
+
+FORMATS = ("csv", "ndjson")
+COMPLETED_STATUS = revenue_rollup.COMPLETED_STATUS
+
+
+def detect_format(filename: str | None, fmt: str | None) -> str | None:
+    if fmt:
+        return fmt.lower() if fmt.lower() in FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def parse_rows(fp, fmt: str):
+    """Sinh (số dòng, dict | thông báo lỗi). fp là file nhị phân."""
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for raw in reader:
+            # dòng 1 là header
+            yield reader.line_num, {k: (v if v != "" else None) for k, v in raw.items() if k}
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"JSON không hợp lệ: {e}"
+            continue
+        if not isinstance(raw, dict):
+            yield line_no, "Mỗi dòng phải là 1 object JSON"
+            continue
+        yield line_no, raw
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def import_orders(db: Session, rows, source: str = "file") -> dict:
+    errors = []
+    candidates = []
+
+    # 1️⃣ Validate cú pháp từng dòng
+    for line_no, raw in rows:
+        if isinstance(raw, str):
+            errors.append({"row": line_no, "error": raw})
+            continue
+        try:
+            order = schemas.OrderCreate(**raw)
+        except ValidationError as e:
+            errors.append({"row": line_no, "error": _validation_message(e)})
+            continue
+        if order.quantity <= 0:
+            errors.append({"row": line_no, "error": "quantity phải > 0"})
+            continue
+        candidates.append((line_no, order))
+
+    # 2️⃣ Nạp sẵn khách hàng + sản phẩm liên quan (1 query mỗi bảng)
+    customer_ids = {o.customer_id for _, o in candidates}
+    product_ids = {o.product_id for _, o in candidates}
+
+    known_customers = {
+        cid for (cid,) in
+        db.query(models.Customer.id).filter(models.Customer.id.in_(customer_ids))
+    } if customer_ids else set()
+
+    stock = dict(
+        db.query(models.Product.id, models.Product.stock)
+        .filter(models.Product.id.in_(product_ids))
+        .order_by(models.Product.id)
+        .with_for_update()
+    ) if product_ids else {}
+
+    # Tồn theo kho (khoá) → chọn kho xuất FIFO cho từng đơn hoàn thành
+    pools = stock_balances.load_pools(db, {
+        o.product_id for _, o in candidates
+        if o.status == COMPLETED_STATUS and o.product_id in stock
+    })
+
+    # 3️⃣ Kiểm tra tham chiếu + tồn kho (trừ dần theo thứ tự dòng)
+    accepted = []
+    sources = []   # (kho, số lượng) xuất cho từng đơn hoàn thành, cùng thứ tự
+    for line_no, order in candidates:
+        if order.customer_id not in known_customers:
+            errors.append({"row": line_no, "error": f"Khách hàng #{order.customer_id} không tồn tại"})
+            continue
+        if order.product_id not in stock:
+            errors.append({"row": line_no, "error": f"Sản phẩm #{order.product_id} không tồn tại"})
+            continue
+        if order.status == COMPLETED_STATUS:
+            available = stock[order.product_id] or 0
+            if available < order.quantity:
+                errors.append({
+                    "row": line_no,
+                    "error": f"Không đủ hàng sản phẩm #{order.product_id} (tồn kho: {available})",
+                })
+                continue
+            try:
+                parts = stock_balances.take(pools, order.product_id, order.quantity)
+            except HTTPException as e:
+                errors.append({"row": line_no, "error": e.detail})
+                continue
+            stock[order.product_id] = available - order.quantity
+            sources.append(parts)
+        accepted.append(order.dict())
+
+    # 4️⃣ Ghi hàng loạt
+    if accepted:
+        order_ids = db.scalars(
+            insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+            accepted,
+        ).all()
+
+        completed = [
+            (oid, o) for oid, o in zip(order_ids, accepted) if o["status"] == COMPLETED_STATUS
+        ]
+
+        if completed:
+            per_product = defaultdict(int)
+            for _, o in completed:
+                per_product[o["product_id"]] += o["quantity"]
+
+            conn = db.connection()
+            products = models.Product.__table__
+            conn.execute(
+                update(products)
+                .where(products.c.id == bindparam("pid"))
+                .values(stock=products.c.stock - bindparam("qty")),
+                [{"pid": pid, "qty": qty} for pid, qty in per_product.items()],
+            )
+
+            today = date.today()
+            ledger = [
+                m
+                for (oid, o), parts in zip(completed, sources)
+                for m in stock_balances.order_movements(
+                    o["product_id"], oid, parts, -1, f"Xuất kho đơn #{oid}", today,
+                )
+            ]
+            conn.execute(insert(models.Inventory.__table__), ledger)
+            stock_balances.apply_many(db, ledger)
+            low_stock.check(db, per_product)
+
+            revenue_rollup.apply_orders(db, [o for _, o in completed])
+
+        push_notify(db, f"Đã nhập {len(accepted)} đơn hàng từ {source}", commit=False)
+
+    db.commit()
+
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "total": len(accepted) + len(errors),
+        "imported": len(accepted),
+        "failed": len(errors),
+        "errors": errors,
+    }
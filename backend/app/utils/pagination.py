@@ -0,0 +1,49 @@
+# ==========================================================
+# 📄 PHÂN TRANG KEYSET (CURSOR)
+#   - Cursor = khoá sắp xếp của dòng cuối trang trước,
+#     mã hoá base64 để client chỉ việc gửi lại nguyên chuỗi
+#   - Trang kế tiếp lọc "WHERE key < cursor" → dùng index,
+#     không OFFSET nên trang sâu cũng nhanh như trang đầu
+# ==========================================================
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Không mã hoá được {type(value)}")
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    """Giải mã cursor; size = số giá trị khoá mong đợi."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Cursor không hợp lệ")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(400, "Cursor không hợp lệ")
+    return values
+
+
+def page(rows: list, limit: int, key):
+    """
+    rows lấy với LIMIT limit + 1. Trả về (rows của trang, next_cursor|None);
+    key(row) → tuple giá trị khoá sắp xếp của dòng.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,344 @@
+# ==========================================================
+# 💰 ENGINE TÍNH LƯƠNG THEO LÔ
+#   - 1 câu GROUP BY trên attendance trong khoảng ngày,
+#     LEFT JOIN sang employees → đủ ngày công / muộn / sớm
+#     cho toàn bộ nhân viên (hoặc 1 nhân viên) trong 1 truy vấn
+#   - Công thức lương giữ nguyên như /salary/{id}
+#   - Kỳ lương theo tháng được tính 1 lần rồi lưu snapshot
+#     (payroll_runs / payslips); chỉ tính lại khi chạy lại thủ công
+#     hoặc khi chấm công / nhân viên của kỳ đang mở bị sửa (stale)
+# ==========================================================
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Attendance, Employee, PayrollRun, Payslip
+from app.utils.dates import month_range
+
+# ==========================
+# CẤU HÌNH LƯƠNG CHUNG
+# ==========================
+BASE_SALARY = 7000000     # 7 triệu
+WORKING_DAYS = 26
+LATE_PENALTY = 50000
+EARLY_PENALTY = 50000
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def attendance_totals(
+    db: Session,
+    start: Optional[date],
+    end: Optional[date],
+    employee_id: Optional[int] = None,
+):
+    """
+    Trả về list (Employee cols…, total_days, late, early).
+    Nhân viên không có chấm công trong kỳ vẫn có dòng với số 0.
+    """
+    on = [Attendance.employee_id == Employee.id]
+    if start:
+        on.append(Attendance.date >= start)
+    if end:
+        on.append(Attendance.date <= end)
+
+    query = (
+        db.query(
+            Employee.id,
+            Employee.name,
+            Employee.department,
+            Employee.position,
+            _count_if(and_(Attendance.check_in.isnot(None), Attendance.check_out.isnot(None))),
+            _count_if(Attendance.status == "Late"),
+            _count_if(Attendance.status == "Early"),
+        )
+        .outerjoin(Attendance, and_(*on))
+        .group_by(Employee.id, Employee.name, Employee.department, Employee.position)
+        .order_by(Employee.id)
+    )
+    if employee_id is not None:
+        query = query.filter(Employee.id == employee_id)
+
+    return query.all()
+
+
+def payslip(row, year=None, month=None, start=None, end=None) -> dict:
+    """Tính lương từ 1 dòng attendance_totals."""
+    emp_id, name, department, position, total_days, late, early = row
+
+    # Mặc định demo: lương cơ bản chung cho toàn bộ nhân viên
+    base_salary = BASE_SALARY
+    daily_salary = base_salary / WORKING_DAYS
+
+    salary_days = total_days * daily_salary
+    penalty = late * LATE_PENALTY + early * EARLY_PENALTY
+    final_salary = max(salary_days - penalty, 0)
+
+    return {
+        "employee_id": emp_id,
+        "employee_name": name,
+        "department": department,
+        "position": position,
+        "year": year,
+        "month": month,
+        "month_string": (
+            f"{year}-{month:02d}" if year and month else f"{start} → {end}"
+        ),
+        "base_salary": int(base_salary),
+        "daily_salary": int(daily_salary),
+        "total_days": int(total_days),
+        "late": int(late),
+        "early": int(early),
+        "penalty": int(penalty),
+        "final_salary": int(final_salary),
+    }
+
+
+def compute_payroll(
+    db: Session,
+    start: Optional[date],
+    end: Optional[date],
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> list[dict]:
+    """Bảng lương cả công ty (hoặc 1 nhân viên) trong 1 truy vấn."""
+    return [
+        payslip(row, year, month, start, end)
+        for row in attendance_totals(db, start, end, employee_id)
+    ]
+
+
+# ==========================================================
+# 🧊 SNAPSHOT KỲ LƯƠNG
+# ==========================================================
+PAYSLIP_FIELDS = (
+    "employee_id", "employee_name", "department", "position",
+    "base_salary", "daily_salary", "total_days", "late", "early",
+    "penalty", "final_salary",
+)
+
+
+def _find_run(db: Session, year: int, month: int):
+    return (
+        db.query(PayrollRun)
+        .filter(PayrollRun.year == year, PayrollRun.month == month)
+        .first()
+    )
+
+
+def run_payroll(db: Session, year: int, month: int) -> PayrollRun:
+    """Tính (lại) bảng lương tháng và ghi đè snapshot. Commit 1 lần."""
+    start, end = month_range(year, month)
+    slips = compute_payroll(db, start, end, year, month)
+
+    run = _find_run(db, year, month)
+    if run is None:
+        run = PayrollRun(year=year, month=month, status="open")
+        db.add(run)
+        db.flush()
+    else:
+        db.query(Payslip).filter(Payslip.run_id == run.id).delete(synchronize_session=False)
+
+    if slips:
+        db.execute(
+            insert(Payslip),
+            [{"run_id": run.id, **{k: s[k] for k in PAYSLIP_FIELDS}} for s in slips],
+        )
+
+    run.stale = False
+    run.employee_count = len(slips)
+    run.total_salary = sum(s["final_salary"] for s in slips)
+    run.computed_at = datetime.utcnow()
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Request khác vừa tạo kỳ này → dùng kết quả của nó
+        db.rollback()
+        return _find_run(db, year, month)
+
+    db.refresh(run)
+    return run
+
+
+def find_run(db: Session, year: int, month: int) -> PayrollRun:
+    """Chỉ đọc kỳ lương đã lưu (không tính, không ghi); 404 nếu chưa có."""
+    run = _find_run(db, year, month)
+    if run is None:
+        raise HTTPException(404, "Chưa có kỳ lương này")
+    return run
+
+
+def get_run(db: Session, year: int, month: int) -> PayrollRun:
+    """
+    Lấy kỳ lương; chỉ tính khi chưa có hoặc kỳ đang mở bị stale.
+    Lưu ý: có thể GHI (tạo / tính lại snapshot và commit).
+    """
+    run = _find_run(db, year, month)
+    if run is None or (run.status == "open" and run.stale):
+        run = run_payroll(db, year, month)
+    return run
+
+
+def rerun(db: Session, year: int, month: int) -> PayrollRun:
+    """Tính lần đầu hoặc tính lại kỳ đang mở (kỳ đã chốt → 409)."""
+    run = _find_run(db, year, month)
+    if run is not None:
+        require_open(run)
+    return run_payroll(db, year, month)
+
+
+def close_run(db: Session, year: int, month: int) -> PayrollRun:
+    """Chốt kỳ lương: từ đây sửa chấm công không làm kỳ bị tính lại."""
+    run = get_run(db, year, month)
+    run.status = "closed"
+    run.closed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def reopen_run(db: Session, year: int, month: int) -> PayrollRun:
+    """Mở lại kỳ đã chốt để có thể tính lại."""
+    run = find_run(db, year, month)
+    run.status = "open"
+    run.closed_at = None
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def invalidate(db: Session, day: Optional[date] = None):
+    """
+    Đánh dấu stale kỳ đang mở chứa ngày `day` (caller tự commit).
+    day=None → mọi kỳ đang mở (thêm / sửa / xoá nhân viên: tên, phòng ban,
+    chức vụ nằm trong phiếu lương của mọi kỳ chưa chốt).
+    """
+    query = db.query(PayrollRun).filter(PayrollRun.status == "open")
+    if day is not None:
+        query = query.filter(PayrollRun.year == day.year, PayrollRun.month == day.month)
+    query.update({PayrollRun.stale: True}, synchronize_session=False)
+
+
+def _slip_out(run: PayrollRun, slip: Payslip) -> dict:
+    out = {k: getattr(slip, k) for k in PAYSLIP_FIELDS}
+    out.update(
+        year=run.year,
+        month=run.month,
+        month_string=f"{run.year}-{run.month:02d}",
+    )
+    return out
+
+
+def snapshot_payslips(
+    db: Session,
+    year: int,
+    month: int,
+    employee_id: Optional[int] = None,
+) -> list[dict]:
+    """
+    Đọc phiếu lương từ snapshot của kỳ. Kỳ chưa có / đang mở mà stale được
+    tính (và commit) trước khi đọc — xem get_run.
+    """
+    run = get_run(db, year, month)
+
+    query = db.query(Payslip).filter(Payslip.run_id == run.id)
+    if employee_id is not None:
+        query = query.filter(Payslip.employee_id == employee_id)
+    slips = query.order_by(Payslip.employee_id).all()
+
+    return [_slip_out(run, s) for s in slips]
+
+
+def run_out(run: PayrollRun) -> dict:
+    return {
+        "id": run.id,
+        "year": run.year,
+        "month": run.month,
+        "status": run.status,
+        "stale": run.stale,
+        "employee_count": run.employee_count,
+        "total_salary": run.total_salary,
+        "computed_at": run.computed_at,
+        "closed_at": run.closed_at,
+    }
+
+
+def require_open(run: PayrollRun):
+    if run.status == "closed":
+        raise HTTPException(409, "Kỳ lương đã chốt")
+
+
+if __name__ == "__main__":
+    # Benchmark tái lập được: SQLite trong bộ nhớ, dữ liệu sinh sẵn
+    #   python -m app.utils.payroll [số nhân viên] [số chấm công / người]
+    import sys
+    import time
+    from datetime import time as clock, timedelta
+
+    from sqlalchemy import create_engine, extract
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+
+    n_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    per_employee = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    year, month = 2026, 9
+    start, end = month_range(year, month)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    session.execute(insert(Employee), [
+        {"id": i + 1, "name": f"NV{i}", "email": f"nv{i}@x"} for i in range(n_employees)
+    ])
+    statuses = ("On time", "Late", "Early", "On time")
+    session.execute(insert(Attendance), [
+        {
+            "employee_id": i + 1,
+            "date": start + timedelta(days=d),
+            "check_in": clock(8),
+            "check_out": clock(17) if (i + d) % 5 else None,
+            "status": statuses[(i + d) % 4],
+        }
+        for i in range(n_employees)
+        for d in range(per_employee)
+    ])
+    session.commit()
+
+    def legacy():
+        """Công thức cũ của /salary/all: 2 truy vấn / nhân viên."""
+        out = []
+        for (emp_id,) in session.query(Employee.id).all():
+            emp = session.query(Employee).filter(Employee.id == emp_id).first()
+            records = session.query(Attendance).filter(
+                Attendance.employee_id == emp_id,
+                extract("year", Attendance.date) == year,
+                extract("month", Attendance.date) == month,
+            ).all()
+            days = sum(1 for r in records if r.check_in and r.check_out)
+            late = sum(1 for r in records if r.status == "Late")
+            early = sum(1 for r in records if r.status == "Early")
+            out.append(payslip(
+                (emp.id, emp.name, emp.department, emp.position, days, late, early), year, month,
+            ))
+        return out
+
+    def bench(name, fn):
+        began = time.perf_counter()
+        result = fn()
+        print(f"{name:6} {time.perf_counter() - began:8.3f} s")
+        return result
+
+    print(f"{n_employees} nhân viên, {n_employees * per_employee} dòng chấm công")
+    old = bench("cũ", legacy)
+    new = bench("gộp", lambda: compute_payroll(session, start, end, year, month))
+    assert old == new, "kết quả khác công thức cũ"
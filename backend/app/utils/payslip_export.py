@@ -0,0 +1,115 @@
+# ==========================================================
+# 🗜 XUẤT PHIẾU LƯƠNG HÀNG LOẠT (ZIP STREAMING)
+#   - Mỗi phiếu lương render thành .xlsx trong process pool
+#     (openpyxl tốn CPU, không chiếm luồng phục vụ request)
+#   - Phiếu nào xong trước được nén và đẩy ra client trước,
+#     archive không bao giờ nằm trọn trong RAM
+# ==========================================================
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+
+from app.utils import excel_export
+
+PAYSLIP_WORKERS = int(os.getenv("PAYSLIP_WORKERS", str(os.cpu_count() or 2)))
+MAX_PENDING = PAYSLIP_WORKERS * 4  # số phiếu đang render cùng lúc tối đa
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PAYSLIP_WORKERS)
+    return _pool
+
+
+def build_payslip_workbook(salary: dict):
+    """Workbook phiếu lương của 1 nhân viên (dict từ app.utils.payroll)."""
+    wb = excel_export.new_workbook()
+    ws = excel_export.add_sheet(wb, "Salary")
+
+    ws.append(["THÔNG TIN NHÂN VIÊN", ""])
+    ws.append(["Họ tên", salary["employee_name"]])
+    ws.append(["Phòng ban", salary["department"] or ""])
+    ws.append(["Chức vụ", salary["position"] or ""])
+    ws.append(["Tháng", salary["month_string"]])
+    ws.append([])
+
+    ws.append(["THÔNG TIN LƯƠNG", ""])
+    ws.append(["Lương cơ bản", salary["base_salary"]])
+    ws.append(["Lương mỗi ngày", salary["daily_salary"]])
+    ws.append(["Ngày công", salary["total_days"]])
+    ws.append(["Đi muộn", salary["late"]])
+    ws.append(["Về sớm", salary["early"]])
+    ws.append(["Tiền phạt", salary["penalty"]])
+    ws.append(["Lương thực lãnh", salary["final_salary"]])
+
+    return wb
+
+
+def payslip_filename(salary: dict) -> str:
+    return f"salary_{salary['employee_id']}_{salary['year']}_{salary['month']}.xlsx"
+
+
+def render_payslip(salary: dict):
+    """Chạy trong process con: trả về (tên file, bytes .xlsx)."""
+    buffer = BytesIO()
+    build_payslip_workbook(salary).save(buffer)
+    return payslip_filename(salary), buffer.getvalue()
+
+
+class _ChunkSink:
+    """File-like chỉ ghi: zipfile ghi vào, generator lấy ra rồi xoá."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _rendered(slips):
+    """Render song song, trả kết quả theo thứ tự hoàn thành."""
+    pool = _get_pool()
+    slips = iter(slips)
+    pending = set()
+
+    while True:
+        for salary in slips:
+            pending.add(pool.submit(render_payslip, salary))
+            if len(pending) >= MAX_PENDING:
+                break
+
+        if not pending:
+            return
+
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def stream_payslip_zip(slips):
+    """Generator bytes của file .zip chứa toàn bộ phiếu lương."""
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for filename, data in _rendered(slips):
+            zf.writestr(filename, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    tail = sink.drain()
+    if tail:
+        yield tail
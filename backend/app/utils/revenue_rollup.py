@@ -0,0 +1,276 @@
+# ==========================================================
+# 💹 TỔNG HỢP DOANH THU (REVENUE ROLLUP)
+#   Bảng revenue_rollups lưu doanh thu theo ngày cho từng
+#   (danh mục, khu vực, sản phẩm, khách hàng) của đơn "Hoàn thành".
+#   Các API doanh thu đọc từ đây thay vì quét lại bảng orders.
+# ==========================================================
+from sqlalchemy import func, extract, delete, insert, literal_column, select, cast, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.dates import apply_range
+
+COMPLETED_STATUS = "Hoàn thành"
+
+Rollup = models.RevenueRollup
+
+
+# ==========================================================
+# 🔁 CẬP NHẬT TĂNG DẦN
+#   Khoá rollup = (day, category, region, product_id, customer_id);
+#   phần NULL được COALESCE về '' / 0 trong unique index
+#   uq_revenue_rollups_key → ON CONFLICT bắt được cả khoá có NULL.
+#   Mọi delta ghi bằng 1 câu INSERT ... ON CONFLICT DO UPDATE
+#   (executemany), không SELECT ... FOR UPDATE từng khoá.
+# ==========================================================
+# Biểu thức khoá lấy thẳng từ index khai báo trong models (1 nguồn duy nhất)
+KEY_INDEX = next(i for i in Rollup.__table__.indexes if i.name == "uq_revenue_rollups_key")
+
+
+def _normalized_key(key: tuple) -> tuple:
+    day, category, region, product_id, customer_id = key
+    return (day, category or "", region or "", product_id or 0, customer_id or 0)
+
+
+def _upsert(db: Session):
+    table = Rollup.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(KEY_INDEX.expressions),
+        set_={
+            "order_count": table.c.order_count + stmt.excluded.order_count,
+            "quantity": table.c.quantity + stmt.excluded.quantity,
+            "total": table.c.total + stmt.excluded.total,
+        },
+    )
+
+
+def apply_signed(db: Session, signed_orders):
+    """
+    signed_orders: iterable (order_dict, sign) — dict có date, category, region,
+    product_id, customer_id, quantity, amount; sign = 1 (cộng) / -1 (trừ).
+    Gộp theo khoá rồi upsert 1 lượt; dòng về 0 đơn thì xoá. Không commit.
+    """
+    deltas = {}
+    for o, sign in signed_orders:
+        key = (o["date"], o.get("category"), o.get("region"), o.get("product_id"), o.get("customer_id"))
+        norm = _normalized_key(key)
+        raw, count, qty, total = deltas.get(norm, (key, 0, 0, 0.0))
+        deltas[norm] = (
+            raw,
+            count + sign,
+            qty + sign * int(o.get("quantity") or 0),
+            total + sign * float(o.get("amount") or 0),
+        )
+
+    rows = [
+        {
+            "day": day,
+            "year": day.year,
+            "month": day.month,
+            "category": category,
+            "region": region,
+            "product_id": product_id,
+            "customer_id": customer_id,
+            "order_count": count,
+            "quantity": qty,
+            "total": total,
+        }
+        for (day, category, region, product_id, customer_id), count, qty, total in deltas.values()
+        if count or qty or total
+    ]
+    if not rows:
+        return
+
+    db.execute(_upsert(db), rows)
+
+    # Có khoá bị trừ → dọn dòng đã về 0 đơn (lọc theo day để dùng index)
+    shrunk_days = {row["day"] for row in rows if row["order_count"] < 0}
+    if shrunk_days:
+        db.execute(
+            delete(Rollup)
+            .where(Rollup.day.in_(shrunk_days), Rollup.order_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_orders(db: Session, orders, sign: int = 1):
+    """Cộng (sign=1) / trừ (sign=-1) nhiều đơn (dict) vào rollup. Không commit."""
+    apply_signed(db, ((o, sign) for o in orders))
+
+
+def order_dict(order: models.Order) -> dict:
+    """Các trường của đơn mà apply_signed cần."""
+    return {
+        "date": order.date,
+        "category": order.category,
+        "region": order.region,
+        "product_id": order.product_id,
+        "customer_id": order.customer_id,
+        "quantity": order.quantity,
+        "amount": order.amount,
+    }
+
+
+def apply_order(db: Session, order: models.Order, sign: int = 1):
+    """
+    Cộng (sign=1) hoặc trừ (sign=-1) một đơn hàng vào bảng rollup.
+    Không commit — chạy chung transaction với thay đổi trạng thái đơn.
+    """
+    apply_signed(db, [(order_dict(order), sign)])
+
+
+def on_status_change(db: Session, order: models.Order, old_status, new_status):
+    """Gọi khi đơn đổi trạng thái: vào / ra "Hoàn thành" thì cập nhật rollup."""
+    was_done = old_status == COMPLETED_STATUS
+    is_done = new_status == COMPLETED_STATUS
+
+    if is_done and not was_done:
+        apply_order(db, order, 1)
+    elif was_done and not is_done:
+        apply_order(db, order, -1)
+
+
+# ==========================================================
+# 🧱 XÂY LẠI TOÀN BỘ BẢNG ROLLUP
+# ==========================================================
+def rebuild(db: Session) -> int:
+    """Xoá và tính lại rollup từ bảng orders. Trả về số dòng rollup."""
+    O = models.Order
+
+    db.query(Rollup).delete(synchronize_session=False)
+
+    # Gộp theo khoá đã COALESCE (khớp unique index): NULL và '' chung 1 dòng
+    category = func.coalesce(O.category, literal_column("''"))
+    region = func.coalesce(O.region, literal_column("''"))
+    source = (
+        select(
+            O.date,
+            cast(extract("year", O.date), Integer),
+            cast(extract("month", O.date), Integer),
+            func.max(O.category),
+            func.max(O.region),
+            O.product_id,
+            O.customer_id,
+            func.count(O.id),
+            func.coalesce(func.sum(O.quantity), 0),
+            func.coalesce(func.sum(O.amount), 0),
+        )
+        .where(O.status == COMPLETED_STATUS)
+        .group_by(O.date, category, region, O.product_id, O.customer_id)
+    )
+
+    db.execute(
+        insert(Rollup).from_select(
+            [
+                "day", "year", "month", "category", "region",
+                "product_id", "customer_id", "order_count", "quantity", "total",
+            ],
+            source,
+        )
+    )
+    db.commit()
+
+    return db.query(func.count(Rollup.id)).scalar() or 0
+
+
+# ==========================================================
+# 📊 TRUY VẤN ĐỌC
+#   Mọi hàm nhận date_from / date_to (tính cả ngày biên),
+#   lọc theo cột day bằng điều kiện khoảng để dùng index.
+# ==========================================================
+def _ranged(query, date_from=None, date_to=None):
+    return apply_range(query, Rollup.day, date_from, date_to)
+
+
+def total_revenue(db: Session, date_from=None, date_to=None) -> float:
+    q = _ranged(db.query(func.coalesce(func.sum(Rollup.total), 0)), date_from, date_to)
+    return float(q.scalar() or 0)
+
+
+def by_month(db: Session, date_from=None, date_to=None):
+    """[(year, month, total)] — tách riêng từng năm, sắp theo thời gian."""
+    q = db.query(Rollup.year, Rollup.month, func.sum(Rollup.total))
+    return (
+        _ranged(q, date_from, date_to)
+        .group_by(Rollup.year, Rollup.month)
+        .order_by(Rollup.year, Rollup.month)
+        .all()
+    )
+
+
+def by_product_category(db: Session, lower: bool = True, date_from=None, date_to=None):
+    """[(category, total)] — danh mục lấy theo sản phẩm (products.category)."""
+    cat = func.lower(models.Product.category) if lower else models.Product.category
+    q = (
+        db.query(cat, func.sum(Rollup.total))
+        .join(models.Product, models.Product.id == Rollup.product_id)
+    )
+    return _ranged(q, date_from, date_to).group_by(cat).all()
+
+
+def by_order_category(db: Session, date_from=None, date_to=None):
+    """[(category, total)] — danh mục ghi trên đơn hàng (orders.category), đã lower."""
+    cat = func.lower(Rollup.category)
+    q = db.query(cat, func.sum(Rollup.total))
+    return _ranged(q, date_from, date_to).group_by(cat).all()
+
+
+def by_region(db: Session, date_from=None, date_to=None):
+    """[(region, total)]"""
+    q = db.query(Rollup.region, func.sum(Rollup.total))
+    return _ranged(q, date_from, date_to).group_by(Rollup.region).all()
+
+
+def top_products(db: Session, limit: int = 10, date_from=None, date_to=None):
+    """[(product_name, sold, revenue)] — sắp theo số lượng bán."""
+    q = (
+        db.query(
+            models.Product.name,
+            func.sum(Rollup.quantity),
+            func.sum(Rollup.total),
+        )
+        .join(models.Product, models.Product.id == Rollup.product_id)
+    )
+    return (
+        _ranged(q, date_from, date_to)
+        .group_by(models.Product.id, models.Product.name)
+        .order_by(func.sum(Rollup.quantity).desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def top_customers(db: Session, limit: int = 10, date_from=None, date_to=None):
+    """[(customer_name, order_count, total_spent)] — sắp theo chi tiêu."""
+    q = (
+        db.query(
+            models.Customer.name,
+            func.sum(Rollup.order_count),
+            func.sum(Rollup.total),
+        )
+        .join(models.Customer, models.Customer.id == Rollup.customer_id)
+    )
+    return (
+        _ranged(q, date_from, date_to)
+        .group_by(models.Customer.id, models.Customer.name)
+        .order_by(func.sum(Rollup.total).desc())
+        .limit(limit)
+        .all()
+    )
+
+
+# ==========================================================
+# ▶ CHẠY TAY: python -m app.utils.revenue_rollup
+# ==========================================================
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"✔ Đã xây lại revenue_rollups: {rebuild(session)} dòng")
+    finally:
+        session.close()
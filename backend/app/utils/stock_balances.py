@@ -0,0 +1,265 @@
+# ==========================================================
+# 🏬 TỒN KHO THEO VỊ TRÍ (STOCK BALANCES)
+#   - Bảng stock_balances(product_id, location) = tổng sổ kho
+#     của sản phẩm tại vị trí đó; tra cứu theo khoá → O(1)
+#   - Cập nhật cùng transaction với mọi lần ghi bảng inventory
+#     (upsert cộng dồn, không commit)
+#   - Phiếu xuất / hoàn theo đơn hàng: location là nhãn
+#     ("Xuất theo đơn hàng", "Hoàn kho"), kho thật nằm ở stock_location
+#     (chọn bởi take() / return_parts() bên dưới); phiếu cũ không có
+#     stock_location → tính vào UNASSIGNED
+# ==========================================================
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+
+Balance = models.StockBalance
+
+EXPORT_LOCATION = "Xuất theo đơn hàng"
+RETURN_LOCATION = "Hoàn kho"
+UNASSIGNED = "Chưa phân kho"
+PSEUDO_LOCATIONS = (EXPORT_LOCATION, RETURN_LOCATION)
+
+
+def balance_location(location, stock_location=None) -> str:
+    """Vị trí ghi vào stock_balances cho 1 phiếu kho."""
+    if stock_location:
+        return stock_location
+    if not location or location in PSEUDO_LOCATIONS:
+        return UNASSIGNED
+    return location
+
+
+def balance_location_sql(column, stock_column):
+    """Bản SQL của balance_location (dùng khi dựng lại từ sổ kho)."""
+    return case(
+        (stock_column.isnot(None), stock_column),
+        (column.is_(None), literal(UNASSIGNED)),
+        (column == "", literal(UNASSIGNED)),
+        (column.in_(PSEUDO_LOCATIONS), literal(UNASSIGNED)),
+        else_=column,
+    )
+
+
+def _upsert(db: Session):
+    table = Balance.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id, table.c.location],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    )
+
+
+def apply_many(db: Session, movements):
+    """
+    movements: iterable dict có product_id, location, quantity (như dòng inventory).
+    Gộp theo (sản phẩm, vị trí) rồi upsert 1 lượt. Không commit.
+    """
+    deltas = defaultdict(int)
+    for m in movements:
+        loc = balance_location(m.get("location"), m.get("stock_location"))
+        deltas[(m["product_id"], loc)] += int(m["quantity"] or 0)
+
+    rows = [
+        {"product_id": pid, "location": loc, "quantity": qty}
+        for (pid, loc), qty in deltas.items() if qty
+    ]
+    if rows:
+        db.execute(_upsert(db), rows)
+
+
+def apply(db: Session, product_id: int, location, quantity: int, stock_location=None):
+    """Cộng quantity (âm = trừ) vào tồn của sản phẩm tại vị trí. Không commit."""
+    apply_many(db, [{
+        "product_id": product_id,
+        "location": location,
+        "stock_location": stock_location,
+        "quantity": quantity,
+    }])
+
+
+# ==========================================================
+# 📤 CHỌN KHO CHO PHIẾU XUẤT / HOÀN THEO ĐƠN
+#   - Xuất: kho chỉ định, hoặc lấy dần FIFO qua các kho còn hàng
+#     (thứ tự dòng balance = thứ tự kho nhận hàng lần đầu),
+#     UNASSIGNED lấy sau cùng → không kho nào bị âm
+#   - Hoàn: trả về đúng các kho mà lần xuất của đơn đã lấy;
+#     đơn xuất từ trước khi có stock_location → UNASSIGNED
+# ==========================================================
+def load_pools(db: Session, product_ids) -> dict:
+    """{product_id: {location: số lượng > 0}} theo thứ tự FIFO; khoá các dòng."""
+    pools = defaultdict(dict)
+    product_ids = set(product_ids)
+    if not product_ids:
+        return pools
+
+    rows = (
+        db.query(Balance.product_id, Balance.location, Balance.quantity)
+        .filter(Balance.product_id.in_(product_ids), Balance.quantity > 0)
+        .order_by(Balance.product_id, Balance.location == UNASSIGNED, Balance.id)
+        .with_for_update()
+    )
+    for pid, loc, qty in rows:
+        pools[pid][loc] = qty
+    return pools
+
+
+def take(pools: dict, product_id: int, quantity: int, location=None) -> list:
+    """
+    Trừ quantity khỏi pool của sản phẩm; trả về [(kho, số lượng)].
+    Không đủ → HTTPException, pool giữ nguyên.
+    """
+    pool = pools.setdefault(product_id, {})
+
+    if location:
+        if location in PSEUDO_LOCATIONS:
+            raise HTTPException(400, f"'{location}' không phải kho thật")
+        available = pool.get(location, 0)
+        if available < quantity:
+            raise HTTPException(400, f"Không đủ hàng tại '{location}' (còn: {available})")
+        sources = [location]
+    else:
+        sources = list(pool)
+
+    parts, remaining = [], quantity
+    for loc in sources:
+        n = min(pool[loc], remaining)
+        if n > 0:
+            parts.append((loc, n))
+            remaining -= n
+        if not remaining:
+            break
+
+    if remaining:
+        # Tổng tồn đủ nhưng tồn theo kho thiếu → stock_balances lệch sổ kho
+        raise HTTPException(
+            409,
+            "Tồn kho theo vị trí không khớp tổng tồn kho "
+            "(chạy POST /inventory/balances/rebuild)",
+        )
+
+    for loc, n in parts:
+        pool[loc] -= n
+    return parts
+
+
+def give(pools: dict, product_id: int, parts):
+    """Cộng lại vào pool (hàng hoàn trong cùng lượt có thể xuất tiếp)."""
+    pool = pools.setdefault(product_id, {})
+    for loc, n in parts:
+        pool[loc] = pool.get(loc, 0) + n
+
+
+def return_parts(db: Session, orders) -> dict:
+    """
+    orders: list (order_id, quantity). Trả về {order_id: [(kho, số lượng)]}:
+    phần các kho còn "đang xuất" của đơn (tổng xuất + hoàn theo kho < 0).
+    """
+    I = models.Inventory
+    orders = list(orders)
+    outstanding = defaultdict(dict)
+
+    if orders:
+        rows = (
+            db.query(I.order_id, I.stock_location, func.sum(I.quantity))
+            .filter(
+                I.order_id.in_({oid for oid, _ in orders}),
+                I.location.in_(PSEUDO_LOCATIONS),
+                I.stock_location.isnot(None),
+            )
+            .group_by(I.order_id, I.stock_location)
+            .order_by(I.order_id, func.min(I.id))
+        )
+        for oid, loc, total in rows:
+            if total < 0:
+                outstanding[oid][loc] = -total
+
+    result = {}
+    for oid, quantity in orders:
+        parts, remaining = [], quantity
+        for loc, n in outstanding[oid].items():
+            n = min(n, remaining)
+            if n > 0:
+                parts.append((loc, n))
+                remaining -= n
+        if remaining:
+            parts.append((UNASSIGNED, remaining))
+        result[oid] = parts
+    return result
+
+
+def order_movements(product_id: int, order_id: int, parts, sign: int, note: str, day) -> list:
+    """Dòng sổ kho (dict) cho 1 lần xuất (sign=-1) / hoàn (sign=1) theo đơn."""
+    location = EXPORT_LOCATION if sign < 0 else RETURN_LOCATION
+    return [
+        {
+            "product_id": product_id,
+            "order_id": order_id,
+            "quantity": sign * n,
+            "location": location,
+            "stock_location": loc,
+            "date_added": day,
+            "note": note,
+        }
+        for loc, n in parts
+    ]
+
+
+def resync(db: Session, product_ids=None) -> int:
+    """
+    Dựng lại stock_balances từ bảng inventory (chỉ các product_ids nếu có).
+    Không commit → chạy chung transaction với lệnh gọi. Trả về số dòng.
+    """
+    I = models.Inventory
+    loc = balance_location_sql(I.location, I.stock_location)
+
+    stale = db.query(Balance)
+    source = select(I.product_id, loc, func.sum(I.quantity))
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        stale = stale.filter(Balance.product_id.in_(product_ids))
+        source = source.where(I.product_id.in_(product_ids))
+
+    stale.delete(synchronize_session=False)
+    result = db.execute(
+        insert(Balance).from_select(
+            [Balance.product_id, Balance.location, Balance.quantity],
+            source.group_by(I.product_id, loc),
+        )
+    )
+    return result.rowcount
+
+
+def rebuild(db: Session) -> int:
+    """Xoá và dựng lại toàn bộ stock_balances từ bảng inventory. Trả về số dòng."""
+    count = resync(db)
+    db.commit()
+    return count
+
+
+def balances(db: Session, product_id=None, location=None):
+    query = db.query(Balance)
+    if product_id is not None:
+        query = query.filter(Balance.product_id == product_id)
+    if location:
+        query = query.filter(Balance.location == location)
+    return query.order_by(Balance.product_id, Balance.location).all()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"✔ Đã dựng lại stock_balances: {rebuild(session)} dòng")
+    finally:
+        session.close()
@@ -0,0 +1,189 @@
+# ==========================================================
+# 📸 ẢNH CHỤP TỒN KHO & TRA CỨU TỒN KHO TẠI 1 NGÀY (AS-OF)
+#   - Mỗi ngày chụp tồn kho từng sản phẩm tính đến hết hôm qua
+#     (1 câu INSERT ... SELECT ... GROUP BY)
+#   - Tồn tại ngày D = snapshot gần nhất ≤ D + phiếu kho (S, D]
+#     → chỉ đọc phần chênh lệch, không cộng lại toàn bộ sổ kho
+#   - Phiếu kho ghi lùi ngày / sửa / xoá → xoá snapshot từ ngày đó
+#     của sản phẩm (tra cứu tự lùi về snapshot cũ hơn, vẫn đúng)
+#   - Scheduler: thread nền trong app, hoặc cron:
+#       python -m app.utils.stock_snapshots [YYYY-MM-DD]
+# ==========================================================
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import Date, and_, func, literal, or_, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import database, models
+
+logger = logging.getLogger(__name__)
+
+Snapshot = models.StockSnapshot
+
+SNAPSHOT_INTERVAL = int(os.getenv("STOCK_SNAPSHOT_INTERVAL", "3600"))  # giây
+
+_stop = threading.Event()
+_thread = None
+
+
+# ==========================================================
+# 📥 CHỤP SNAPSHOT
+# ==========================================================
+def take_snapshot(db: Session, day: Optional[date] = None, replace: bool = True) -> int:
+    """
+    Chụp tồn kho mọi sản phẩm tính đến hết `day` (mặc định hôm qua).
+    Chỉ chụp ngày đã qua để phiếu kho trong ngày không làm snapshot sai.
+    replace=True → ghi đè snapshot cũ cùng ngày. Dòng đã có (process khác
+    vừa chụp) được bỏ qua bằng ON CONFLICT DO NOTHING. Trả về số dòng ghi.
+    """
+    day = day or date.today() - timedelta(days=1)
+    if day >= date.today():
+        raise ValueError("Chỉ chụp snapshot cho ngày đã qua")
+
+    P, I = models.Product, models.Inventory
+
+    if replace:
+        db.query(Snapshot).filter(Snapshot.snapshot_date == day).delete(synchronize_session=False)
+
+    source = (
+        select(
+            P.id,
+            literal(day, Date),
+            func.coalesce(func.sum(I.quantity), 0),
+        )
+        .select_from(P)
+        .outerjoin(
+            I,
+            and_(
+                I.product_id == P.id,
+                or_(I.date_added.is_(None), I.date_added <= day),
+            ),
+        )
+        .where(true())   # SQLite: INSERT ... SELECT ... ON CONFLICT cần WHERE
+        .group_by(P.id)
+    )
+
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    result = db.execute(
+        dialect.insert(Snapshot.__table__)
+        .from_select([Snapshot.product_id, Snapshot.snapshot_date, Snapshot.quantity], source)
+        .on_conflict_do_nothing(index_elements=["product_id", "snapshot_date"])
+    )
+
+    db.commit()
+    return result.rowcount
+
+
+def invalidate(db: Session, product_id: int, day: Optional[date]):
+    """Phiếu kho ngày `day` đổi → snapshot từ ngày đó của sản phẩm hết đúng (caller commit)."""
+    query = db.query(Snapshot).filter(Snapshot.product_id == product_id)
+    if day is not None:
+        query = query.filter(Snapshot.snapshot_date >= day)
+    query.delete(synchronize_session=False)
+
+
+# ==========================================================
+# 🔎 TỒN KHO TẠI NGÀY D
+# ==========================================================
+def stock_as_of(db: Session, day: date, product_ids=None):
+    """Trả về list (product_id, name, quantity, snapshot_date | None)."""
+    P, I = models.Product, models.Inventory
+
+    latest = (
+        select(Snapshot.product_id, func.max(Snapshot.snapshot_date).label("snap_date"))
+        .where(Snapshot.snapshot_date <= day)
+        .group_by(Snapshot.product_id)
+        .subquery("latest")
+    )
+    snap = Snapshot.__table__.alias("snap")
+
+    # Phiếu kho sau snapshot (hoặc toàn bộ nếu sản phẩm chưa có snapshot)
+    delta = (
+        select(func.coalesce(func.sum(I.quantity), 0))
+        .where(
+            I.product_id == P.id,
+            or_(
+                and_(
+                    latest.c.snap_date.is_(None),
+                    or_(I.date_added.is_(None), I.date_added <= day),
+                ),
+                and_(I.date_added > latest.c.snap_date, I.date_added <= day),
+            ),
+        )
+        .correlate(P, latest)
+        .scalar_subquery()
+    )
+
+    query = (
+        db.query(
+            P.id,
+            P.name,
+            func.coalesce(snap.c.quantity, 0) + delta,
+            latest.c.snap_date,
+        )
+        .outerjoin(latest, latest.c.product_id == P.id)
+        .outerjoin(
+            snap,
+            and_(snap.c.product_id == P.id, snap.c.snapshot_date == latest.c.snap_date),
+        )
+        .order_by(P.id)
+    )
+    if product_ids:
+        query = query.filter(P.id.in_(product_ids))
+
+    return query.all()
+
+
+# ==========================================================
+# ⏰ SCHEDULER (THREAD NỀN)
+# ==========================================================
+def ensure_yesterday():
+    """Chụp snapshot hôm qua nếu chưa có."""
+    db = database.SessionLocal()
+    try:
+        yesterday = date.today() - timedelta(days=1)
+        exists = db.query(Snapshot.id).filter(Snapshot.snapshot_date == yesterday).first()
+        if not exists:
+            # Mỗi worker uvicorn có 1 scheduler → có thể cùng chụp; không
+            # xoá / không lỗi trùng khoá, worker chậm hơn chỉ ghi 0 dòng
+            take_snapshot(db, yesterday, replace=False)
+    finally:
+        db.close()
+
+
+def _loop():
+    while not _stop.is_set():
+        try:
+            ensure_yesterday()
+        except Exception:
+            # Ghi cả traceback; lần sau vẫn thử lại
+            logger.exception("Chụp snapshot tồn kho lỗi")
+        _stop.wait(SNAPSHOT_INTERVAL)
+
+
+def start_scheduler():
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_loop, name="stock-snapshots", daemon=True)
+        _thread.start()
+
+
+def stop_scheduler():
+    _stop.set()
+
+
+if __name__ == "__main__":
+    import sys
+
+    session = database.SessionLocal()
+    try:
+        target = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+        print(f"✔ Đã chụp snapshot tồn kho: {take_snapshot(session, target)} sản phẩm")
+    finally:
+        session.close()
@@ -0,0 +1,158 @@
+# ==========================================================
+# 🧪 CẤU HÌNH TEST
+#   - Mặc định chạy trên file SQLite tạm (không cần PostgreSQL);
+#     đặt DATABASE_URL để chạy trên PostgreSQL thật
+#   - Mỗi test có schema sạch (drop_all + create_all)
+#   - count_statements: đếm câu SQL gửi xuống DB trong 1 khối code
+#   - flat_statements: số câu SQL không tăng theo cỡ dữ liệu (nhỏ vs lớn)
+#   - catalog / add_stock / rollup_totals: dữ liệu mẫu dùng chung
+# ==========================================================
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+_TMP_DIR = tempfile.mkdtemp(prefix="qldn-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_TMP_DIR) / 'test.db'}")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from sqlalchemy import event
+
+from app import database, models  # noqa: F401  (nạp models vào metadata)
+
+engine = database.engine
+
+if engine.dialect.name == "sqlite":
+    # pysqlite tự mở transaction muộn → 2 luồng cùng đọc rồi cùng ghi bị
+    # "database is locked". BEGIN IMMEDIATE khoá ghi ngay đầu transaction,
+    # gần với hành vi khoá dòng của PostgreSQL hơn.
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None
+        dbapi_conn.execute("PRAGMA busy_timeout = 30000")
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class StatementLog(list):
+    result = None   # giá trị trả về của khối code được đo (flat_statements)
+
+    @property
+    def count(self) -> int:
+        return len(self)
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    database.Base.metadata.drop_all(engine)
+    database.Base.metadata.create_all(engine)
+    yield
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_statements():
+    """with count_statements() as log: ... → log là list câu SQL (bỏ BEGIN)."""
+
+    @contextmanager
+    def counter():
+        log = StatementLog()
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith("BEGIN"):
+                log.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield log
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
+@pytest.fixture
+def flat_statements(count_statements):
+    """
+    flat_statements(small, large, between=None, ignore=()) → (small_log, large_log)
+    Chạy small() rồi large() (between() ở giữa, không đếm) và khẳng định
+    số câu SQL bằng nhau. ignore: tiền tố câu SQL bỏ qua khi so sánh.
+    log.result là giá trị trả về của hàm tương ứng.
+    """
+
+    def measure(run, ignore):
+        with count_statements() as log:
+            result = run()
+        kept = StatementLog(s for s in log if not s.startswith(tuple(ignore)))
+        kept.result = result
+        return kept
+
+    def check(small, large, between=None, ignore=()):
+        small_log = measure(small, ignore)
+        if between is not None:
+            between()
+        large_log = measure(large, ignore)
+        assert large_log.count == small_log.count
+        return small_log, large_log
+
+    return check
+
+
+@pytest.fixture
+def add_stock():
+    """add_stock(db, product, quantity, location=None): phiếu nhập như API tạo sản phẩm."""
+    from app.utils import stock_balances
+
+    def add(db, product, quantity, location=None):
+        product.stock = (product.stock or 0) + quantity
+        db.add(models.Inventory(product_id=product.id, quantity=quantity, location=location))
+        stock_balances.apply(db, product.id, location, quantity)
+        db.commit()
+
+    return add
+
+
+@pytest.fixture
+def catalog(add_stock):
+    """
+    catalog(db, n_products, n_customers, prefix="", stock=10_000)
+    → (product_ids, customer_ids); mỗi sản phẩm đã nhập `stock` (chưa phân kho).
+    """
+
+    def create(db, n_products, n_customers, prefix="", stock=10_000):
+        products = [models.Product(name=f"{prefix}P{i}", price=10, stock=0) for i in range(n_products)]
+        customers = [models.Customer(name=f"{prefix}C{i}") for i in range(n_customers)]
+        db.add_all(products + customers)
+        db.commit()
+        for p in products:
+            add_stock(db, p, stock)
+        return [p.id for p in products], [c.id for c in customers]
+
+    return create
+
+
+@pytest.fixture
+def rollup_totals():
+    """rollup_totals(db): revenue_rollups dạng list tuple đã sắp xếp (so với rebuild)."""
+
+    def read(db):
+        db.expire_all()
+        return sorted(
+            (r.day, r.category or "", r.region or "", r.product_id, r.customer_id,
+             r.order_count, r.quantity, r.total)
+            for r in db.query(models.RevenueRollup)
+        )
+
+    return read
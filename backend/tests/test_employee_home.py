@@ -0,0 +1,132 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from app import models, schemas
+from app.routers import attendance, benefits, contracts, employee_home, employees, tasks
+from app.utils import home_cache
+
+TODAY = date.today()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    home_cache.clear()
+    yield
+    home_cache.clear()
+
+
+@pytest.fixture
+def home(db):
+    """1 nhân viên kho có chấm công, task, hợp đồng, phúc lợi; thêm 1 đồng nghiệp."""
+    emp = models.Employee(name="A", email="a@x", department="Kho", position="NV")
+    other = models.Employee(name="B", email="b@x", department="Kho")
+    program = models.BenefitProgram(title="Du lịch", status="open")
+    db.add_all([emp, other, program, models.Notification(title="Họp")])
+    db.flush()
+    db.add_all([
+        models.Attendance(employee_id=emp.id, date=TODAY - timedelta(days=1),
+                          check_in=time(8), check_out=time(17), status="On time"),
+        models.Attendance(employee_id=emp.id, date=TODAY, check_in=time(9), status="Late"),
+        models.Task(title="T1", assigned_to_id=emp.id, deadline=TODAY - timedelta(days=2)),
+        models.Task(title="T2", assigned_to_id=other.id),
+        models.Contract(employee_id=emp.id, contract_type="1 năm", start_date=TODAY,
+                        end_date=TODAY + timedelta(days=365), basic_salary=7_000_000,
+                        status="active"),
+        models.BenefitRegistration(benefit_id=program.id, employee_id=emp.id, status="registered"),
+        models.Product(name="Sắp hết", price=1, stock=1, reorder_level=5),
+    ])
+    db.commit()
+    return {"emp": emp.id, "other": other.id, "program": program.id}
+
+
+def _home(db, employee_id):
+    db.expire_all()
+    return employee_home.get_employee_home(employee_id, db)
+
+
+def _uncached(db, employee_id, monkeypatch):
+    """Payload tính thẳng từ DB (lookup luôn miss, không store)."""
+    with monkeypatch.context() as m:
+        m.setattr(home_cache, "lookup", lambda _id: (None, None))
+        m.setattr(home_cache, "store", lambda *_: None)
+        return _home(db, employee_id)
+
+
+def test_cached_payload_is_identical_to_uncached(db, home, monkeypatch):
+    emp = home["emp"]
+
+    first = _home(db, emp)
+    hits = home_cache.stats()["hits"]
+    second = _home(db, emp)
+
+    assert home_cache.stats()["hits"] == hits + 1
+    assert first == second == _uncached(db, emp, monkeypatch)
+    assert first["kpi"]["late_days"] == 1
+    assert [t["title"] for t in first["tasks"]] == ["T1"]
+
+
+def _attendance_id(db, employee_id, day):
+    return db.query(models.Attendance.id).filter_by(employee_id=employee_id, date=day).scalar()
+
+
+def _task_id(db, title):
+    return db.query(models.Task.id).filter_by(title=title).scalar()
+
+
+WRITES = {
+    "attendance check-in": lambda db, h: attendance.check_in(h["emp"], TODAY + timedelta(days=1), db),
+    "attendance check-out": lambda db, h: attendance.check_out(h["emp"], TODAY, db),
+    "attendance update": lambda db, h: attendance.update_attendance(
+        _attendance_id(db, h["emp"], TODAY), {"check_in": "07:30"}, db),
+    "attendance delete": lambda db, h: attendance.delete_attendance(
+        _attendance_id(db, h["emp"], TODAY - timedelta(days=1)), db),
+    "benefit update": lambda db, h: benefits.update_benefit(
+        h["program"], schemas.BenefitProgramUpdate(title="Nghỉ mát"), db),
+    "benefit delete": lambda db, h: benefits.delete_benefit(h["program"], db),
+    "benefit cancel": lambda db, h: benefits.cancel_registration(h["program"], h["emp"], db),
+    "contract create": lambda db, h: contracts.create_contract(schemas.ContractCreate(
+        employee_id=h["emp"], contract_type="Thử việc", start_date=TODAY,
+        end_date=TODAY + timedelta(days=60)), db),
+    "contract end": lambda db, h: contracts.end_contract(
+        db.query(models.Contract.id).scalar(), db),
+    "task create": lambda db, h: tasks.create_task(
+        schemas.TaskCreate(title="T3", assigned_to_id=h["emp"]), db),
+    "task reassign in": lambda db, h: tasks.update_task(
+        _task_id(db, "T2"), schemas.TaskUpdate(assigned_to_id=h["emp"]), db),
+    "task reassign out": lambda db, h: tasks.update_task(
+        _task_id(db, "T1"), schemas.TaskUpdate(assigned_to_id=h["other"]), db),
+    "task progress": lambda db, h: tasks.update_progress(_task_id(db, "T1"), 100, None, db),
+    "task delete": lambda db, h: tasks.delete_task(_task_id(db, "T1"), db),
+    "employee update": lambda db, h: employees.update(
+        h["emp"], schemas.EmployeeUpdate(name="A2", email="a@x", department="Bán hàng"), db),
+    "employee patch": lambda db, h: employees.partial_update(
+        h["emp"], schemas.EmployeePatch(department="Bán hàng"), db),
+}
+
+
+@pytest.mark.parametrize("write", WRITES, ids=list(WRITES))
+def test_writes_invalidate_cached_home(db, home, monkeypatch, write):
+    emp = home["emp"]
+    before = _home(db, emp)
+    _home(db, emp)   # chắc chắn đang nằm trong cache
+
+    WRITES[write](db, home)
+
+    after = _home(db, emp)
+    assert after != before
+    assert after == _uncached(db, emp, monkeypatch)
+
+
+def test_payload_computed_before_invalidate_is_not_stored(db, home):
+    emp = home["emp"]
+
+    part, token = home_cache.lookup(emp)
+    assert part is None
+    stale = employee_home._employee_part(db, emp, TODAY)
+
+    # Request ghi commit + invalidate trong lúc request đọc đang tính
+    home_cache.invalidate(emp)
+    home_cache.store(emp, token, stale)
+
+    assert home_cache.lookup(emp)[0] is None
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import export_jobs as export_router  # noqa: F401  (đăng ký các kind thật)
+from app.utils import export_jobs
+
+
+@pytest.fixture
+def blocking_kind(monkeypatch, tmp_path):
+    # File job ghi vào thư mục tạm của test, không rơi vào backend/tmp/exports
+    monkeypatch.setattr(export_jobs, "EXPORT_DIR", str(tmp_path))
+    release = threading.Event()
+
+    @export_jobs.register("test-blocking", "test_{n}.txt", "text/plain", params={"n": int})
+    def _render(db, path, n):
+        release.wait(5)
+        with open(path, "w") as f:
+            f.write(str(n))
+
+    yield "test-blocking"
+    release.set()
+    export_jobs.RENDERERS.pop("test-blocking", None)
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"customer_id": 1, "cusomer_id": 2}, "không hỗ trợ"),
+    ({}, "Thiếu tham số"),
+    ({"customer_id": [1, 2]}, "phải là int"),
+    ({"customer_id": {"id": 1}}, "phải là int"),
+    ({"customer_id": "abc"}, "phải là int"),
+])
+def test_invalid_params_rejected_before_queueing(params, message):
+    with pytest.raises(HTTPException) as e:
+        export_jobs.submit("customer-pdf", params)
+    assert e.value.status_code == 400
+    assert message in e.value.detail
+
+
+def test_kind_without_params_rejects_extras():
+    with pytest.raises(HTTPException) as e:
+        export_jobs.submit("summary-pdf", {"year": 2025})
+    assert e.value.status_code == 400
+
+
+def test_params_normalized_before_dedup(blocking_kind):
+    first = export_jobs.submit(blocking_kind, {"n": "7"})
+    second = export_jobs.submit(blocking_kind, {"n": 7})
+
+    assert first["params"] == {"n": 7}
+    assert first["filename"] == "test_7.txt"
+    assert second["id"] == first["id"]
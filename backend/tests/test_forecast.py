@@ -0,0 +1,54 @@
+from datetime import date
+
+from app import models
+from app.utils import forecast
+
+TODAY = date(2026, 10, 18)
+
+
+def _sale(db, day, total):
+    db.add(models.RevenueRollup(
+        day=day, year=day.year, month=day.month,
+        order_count=1, quantity=1, total=total,
+    ))
+
+
+def test_axis_runs_to_last_completed_month(db):
+    _sale(db, date(2026, 5, 10), 100)
+    _sale(db, date(2026, 6, 10), 200)
+    db.commit()
+
+    months, labels, Y, partial = forecast.load_series(db, TODAY)
+
+    # Sau lần bán cuối (6/2026) vẫn có 7, 8, 9 với doanh thu 0; không có 10 (đang diễn ra)
+    assert months == [(2026, 5), (2026, 6), (2026, 7), (2026, 8), (2026, 9)]
+    assert list(Y[labels.index(("total", None))]) == [100, 200, 0, 0, 0]
+    assert partial[0] == 0
+
+
+def test_current_month_is_partial_not_history(db):
+    _sale(db, date(2026, 9, 3), 300)
+    _sale(db, date(2026, 10, 2), 50)
+    _sale(db, date(2026, 11, 2), 999)   # ngày tương lai: bỏ qua
+    db.commit()
+
+    months, _, Y, partial = forecast.load_series(db, TODAY)
+
+    assert months == [(2026, 9)]
+    assert list(Y[0]) == [300]
+    assert partial[0] == 50
+
+
+def test_future_months_start_at_current_month(db):
+    _sale(db, date(2025, 1, 3), 100)
+    db.commit()
+
+    result = forecast._fit(db, 3, TODAY)
+
+    assert result["months"][-1] == (2026, 9)
+    assert result["future_months"] == [(2026, 10), (2026, 11), (2026, 12)]
+    assert result["current_month"] == (2026, 10)
+
+
+def test_future_months_roll_over_year():
+    assert forecast._future_months(date(2026, 12, 31), 2) == [(2026, 12), (2027, 1)]
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models
+from app.routers import inventory
+from app.utils import stock_balances
+
+
+@pytest.fixture
+def local_tz(monkeypatch):
+    """Server chạy giờ Việt Nam (UTC+7)."""
+    monkeypatch.setenv("TZ", "Asia/Ho_Chi_Minh")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _drifted_product(db, created_at):
+    product = models.Product(name="P", price=10, stock=0)
+    db.add(product)
+    db.flush()
+    # Sổ kho +5 nhưng stock vẫn 0 → lệch
+    db.add(models.Inventory(product_id=product.id, quantity=5, created_at=created_at))
+    db.commit()
+    return product.id
+
+
+def _drifted_ids(db, since):
+    result = inventory.sync_all_stock(dry_run=True, since=since, db=db)
+    return [p["product_id"] for p in result["products"]]
+
+
+def test_since_without_tz_is_local_time(db, local_tz):
+    # 20:00 UTC ngày 1 = 03:00 giờ VN ngày 2
+    pid = _drifted_product(db, datetime(2026, 10, 1, 20, 0))
+
+    assert _drifted_ids(db, datetime(2026, 10, 2, 1, 0)) == [pid]
+    assert _drifted_ids(db, datetime(2026, 10, 2, 4, 0)) == []
+
+
+def test_since_with_tz_is_converted(db, local_tz):
+    pid = _drifted_product(db, datetime(2026, 10, 1, 20, 0))
+    plus7 = timezone(timedelta(hours=7))
+
+    assert _drifted_ids(db, datetime(2026, 10, 1, 19, 0, tzinfo=timezone.utc)) == [pid]
+    assert _drifted_ids(db, datetime(2026, 10, 2, 3, 30, tzinfo=plus7)) == []
+
+
+def test_sync_updates_drifted_products_and_reports_deltas(db, add_stock):
+    ok, drifted, empty = (models.Product(name=n, price=10, stock=0) for n in "ABC")
+    db.add_all([ok, drifted, empty])
+    db.commit()
+    add_stock(db, ok, 4, "Kho A")
+    add_stock(db, drifted, 6, "Kho A")
+    # Ghi thẳng sổ kho (không qua API) → stock và stock_balances đều lệch
+    db.add(models.Inventory(product_id=drifted.id, quantity=3, location="Kho B"))
+    empty.stock = 2
+    db.commit()
+
+    result = inventory.sync_all_stock(dry_run=False, since=None, db=db)
+
+    assert result["updated"] == 2
+    assert [(p["product_id"], p["stock"], p["ledger_total"], p["delta"])
+            for p in result["products"]] == [
+        (drifted.id, 6, 9, 3),
+        (empty.id, 2, 0, -2),
+    ]
+    db.expire_all()
+    assert [db.get(models.Product, p.id).stock for p in (ok, drifted, empty)] == [4, 9, 0]
+    assert inventory.sync_all_stock(dry_run=False, since=None, db=db)["updated"] == 0
+
+
+def test_sync_resyncs_balances_so_orders_can_take_stock(db, add_stock):
+    product = models.Product(name="P", price=10, stock=0)
+    db.add(product)
+    db.commit()
+    add_stock(db, product, 2, "Kho A")
+    db.add(models.Inventory(product_id=product.id, quantity=5, location="Kho B"))
+    db.commit()
+
+    inventory.sync_all_stock(dry_run=False, since=None, db=db)
+
+    pools = stock_balances.load_pools(db, [product.id])
+    assert stock_balances.take(pools, product.id, 7) == [("Kho A", 2), ("Kho B", 5)]
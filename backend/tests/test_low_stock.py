@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException, Response
+
+from app import models
+from app.routers import inventory
+from app.utils import pagination
+
+
+def _products(db):
+    # Dưới ngưỡng: id chẵn; đủ hàng: id lẻ
+    db.add_all([
+        models.Product(name=f"P{i}", price=10, stock=1 if i % 2 == 0 else 50, reorder_level=10)
+        for i in range(1, 12)
+    ])
+    db.commit()
+    return [p.id for p in db.query(models.Product).filter(models.Product.stock < 10)]
+
+
+def _page(db, limit=None, cursor=None):
+    response = Response()
+    rows = inventory.get_low_stock(response, limit=limit, cursor=cursor, db=db)
+    return [r["id"] for r in rows], response.headers.get(pagination.NEXT_CURSOR_HEADER)
+
+
+def test_low_stock_keyset_pages_by_id_desc(db):
+    low_ids = sorted(_products(db), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        ids, cursor = _page(db, limit=2, cursor=cursor)
+        seen += ids
+        if cursor is None:
+            break
+
+    assert seen == low_ids
+    assert _page(db)[0] == low_ids
+
+
+def test_low_stock_rejects_bad_cursor(db):
+    with pytest.raises(HTTPException) as exc:
+        _page(db, limit=2, cursor=pagination.encode_cursor("x"))
+    assert exc.value.status_code == 400
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app import models
+from app.utils import low_stock, manager_stats
+
+TODAY = date(2026, 6, 15)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    manager_stats.clear()
+    yield
+    manager_stats.clear()
+
+
+def _seed(db):
+    db.add_all(
+        models.Employee(name=f"E{i}", email=f"e{i}@x", active=(True, False, None)[i % 3])
+        for i in range(7)
+    )
+    db.add(models.Customer(name="C"))
+    db.add_all([
+        models.Product(name="thấp", price=1, stock=2, reorder_level=5),
+        models.Product(name="đủ", price=1, stock=50, reorder_level=5),
+    ])
+
+    deadlines = (None, TODAY - timedelta(days=3), TODAY, TODAY + timedelta(days=2))
+    db.add_all(
+        models.Task(title=f"T{i}", status=status, deadline=deadline)
+        for i, (status, deadline) in enumerate(
+            (s, d) for s in ("todo", "in_progress", "done", "blocked") for d in deadlines
+        )
+    )
+
+    db.flush()
+    db.add_all(
+        models.Order(date=TODAY, amount=1, status=status)
+        for status in ("Đang xử lý", "pending", "Hoàn thành", "completed", "completed",
+                       "Đã hủy", "canceled", "Đang giao")
+    )
+    db.commit()
+
+
+def _legacy(db, today):
+    """Các câu COUNT riêng lẻ của /manager/stats trước khi gộp."""
+    E, T, O = models.Employee, models.Task, models.Order
+
+    def count(column, *conditions):
+        return db.query(func.count(column)).filter(*conditions).scalar() or 0
+
+    return {
+        "employees": count(E.id),
+        "active_employees": count(E.id, E.active.is_(True)),
+        "customers": count(models.Customer.id),
+        "inventory_low": low_stock.count(db),
+        "tasks": {
+            "total": count(T.id),
+            "todo": count(T.id, T.status == "todo"),
+            "in_progress": count(T.id, T.status == "in_progress"),
+            "done": count(T.id, T.status == "done"),
+            "overdue": count(T.id, T.deadline.isnot(None), T.deadline < today, T.status != "done"),
+        },
+        "orders": {
+            "total": count(O.id),
+            "pending": count(O.id, O.status.in_(["Đang xử lý", "pending"])),
+            "completed": count(O.id, O.status.in_(["Hoàn thành", "completed"])),
+            "canceled": count(O.id, O.status.in_(["Đã hủy", "canceled"])),
+        },
+    }
+
+
+def test_compute_matches_legacy_counts(db):
+    _seed(db)
+
+    stats = manager_stats.compute(db, TODAY)
+
+    assert stats == _legacy(db, TODAY)
+    # Quá hạn: có deadline, trước hôm nay, chưa xong (todo / in_progress / blocked)
+    assert stats["tasks"]["overdue"] == 3
+    assert stats["orders"] == {"total": 8, "pending": 2, "completed": 3, "canceled": 2}
+
+
+def test_compute_on_empty_database(db):
+    assert manager_stats.compute(db, TODAY) == _legacy(db, TODAY)
+
+
+def test_get_stats_reuses_snapshot_until_cleared(db, count_statements):
+    _seed(db)
+    first = manager_stats.get_stats(db)
+
+    with count_statements() as log:
+        assert manager_stats.get_stats(db) is first
+    assert log.count == 0
+
+    manager_stats.clear()
+    assert manager_stats.get_stats(db) is not first
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from app import models
+from app.utils import order_batch, revenue_rollup
+
+DONE = revenue_rollup.COMPLETED_STATUS
+PENDING = "Đang xử lý"
+CANCELED = "Đã hủy"
+
+
+def _setup(db, catalog, n, prefix):
+    """n đơn hoàn thành + n đơn chờ, mỗi đơn 1 khoá rollup riêng."""
+    (product_id,), customer_ids = catalog(db, 1, n, prefix)
+
+    def order(i, status, start):
+        return models.Order(
+            customer_id=customer_ids[i], product_id=product_id, quantity=1, amount=10,
+            date=start + timedelta(days=i % 30), status=status,
+            category=f"cat{i % 4}" if i % 3 else None, region=f"R{i % 3}" if i % 2 else None,
+        )
+
+    done = [order(i, DONE, date(2026, 1, 1)) for i in range(n)]
+    pending = [order(i, PENDING, date(2026, 3, 1)) for i in range(n)]
+    db.add_all(done + pending)
+    db.commit()
+    revenue_rollup.rebuild(db)
+    return [o.id for o in done], [o.id for o in pending]
+
+
+def _mixed_batch(done_ids, pending_ids):
+    return [(oid, CANCELED) for oid in done_ids] + [(oid, DONE) for oid in pending_ids]
+
+
+def test_mixed_batch_statement_count_is_constant(db, catalog, flat_statements):
+    small_done, small_pending = _setup(db, catalog, 5, "s")
+    large_done, large_pending = _setup(db, catalog, 100, "l")
+
+    small, large = flat_statements(
+        lambda: order_batch.update_statuses(db, _mixed_batch(small_done, small_pending)),
+        lambda: order_batch.update_statuses(db, _mixed_batch(large_done, large_pending)),
+    )
+    assert (small.result["updated"], large.result["updated"]) == (10, 200)
+
+    # Xuất + hoàn chung 1 upsert; dòng về 0 đơn dọn bằng 1 DELETE
+    rollup = [s.split()[0].upper() for s in large if "revenue_rollups" in s]
+    assert rollup == ["INSERT", "DELETE"]
+
+
+def test_mixed_batch_rollup_matches_rebuild(db, catalog, rollup_totals):
+    done, pending = _setup(db, catalog, 20, "x")
+
+    order_batch.update_statuses(db, _mixed_batch(done[:10], pending[:15]))
+    incremental = rollup_totals(db)
+
+    revenue_rollup.rebuild(db)
+    assert rollup_totals(db) == incremental
@@ -0,0 +1,88 @@
+import threading
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app import database, models, schemas
+from app.routers import orders
+
+DONE = "Hoàn thành"
+PENDING = "Đang xử lý"
+
+
+def _setup(db, add_stock, stock, n_orders):
+    product = models.Product(name="P", price=10, stock=0)
+    customer = models.Customer(name="C")
+    db.add_all([product, customer])
+    db.commit()
+    add_stock(db, product, stock)
+
+    order_ids = [
+        orders.create_order(schemas.OrderCreate(
+            customer_id=customer.id, product_id=product.id, quantity=1,
+            date=date(2026, 1, 5), status=PENDING, amount=10,
+        ), db)["id"]
+        for _ in range(n_orders)
+    ]
+    product_id = product.id
+    # Trả write lock (BEGIN IMMEDIATE trên SQLite) trước khi chạy các luồng
+    db.rollback()
+    return product_id, order_ids
+
+
+def _complete_all(order_ids):
+    """Mỗi luồng 1 session, cùng lúc chuyển 1 đơn sang hoàn thành."""
+    barrier = threading.Barrier(len(order_ids))
+    results = []
+    lock = threading.Lock()
+
+    def worker(order_id):
+        session = database.SessionLocal()
+        try:
+            barrier.wait()
+            orders.update_order_status(order_id, orders.StatusUpdate(status=DONE), session)
+            outcome = "ok"
+        except HTTPException as exc:
+            session.rollback()
+            outcome = exc.status_code
+        finally:
+            session.close()
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=worker, args=(oid,)) for oid in order_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.mark.parametrize("stock, n_orders", [(5, 12), (3, 3)])
+def test_concurrent_completions_never_oversell(db, add_stock, stock, n_orders):
+    product_id, order_ids = _setup(db, add_stock, stock, n_orders)
+
+    results = _complete_all(order_ids)
+
+    successes = results.count("ok")
+    assert successes == min(stock, n_orders)
+    assert all(r in ("ok", 400) for r in results)
+
+    db.expire_all()
+    final_stock = db.get(models.Product, product_id).stock
+    assert final_stock >= 0
+    assert final_stock == stock - successes
+    assert db.query(models.Order).filter_by(status=DONE).count() == successes
+
+
+def test_same_order_completed_twice_exports_once(db, add_stock):
+    product_id, (order_id,) = _setup(db, add_stock, stock=5, n_orders=1)
+
+    results = _complete_all([order_id, order_id])
+
+    assert results == ["ok", "ok"]
+    db.expire_all()
+    assert db.get(models.Product, product_id).stock == 4
+    exports = db.query(models.Inventory).filter(models.Inventory.quantity < 0).count()
+    assert exports == 1
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from app import models
+from app.utils import order_import, revenue_rollup
+
+DONE = revenue_rollup.COMPLETED_STATUS
+
+
+def _rows(product_ids, customer_ids, n):
+    """n đơn hoàn thành, gần như mỗi đơn 1 khoá rollup riêng."""
+    for i in range(n):
+        yield i + 2, {
+            "customer_id": customer_ids[i % len(customer_ids)],
+            "product_id": product_ids[i % len(product_ids)],
+            "quantity": 1,
+            "amount": 10,
+            "date": (date(2026, 1, 1) + timedelta(days=i % 40)).isoformat(),
+            "status": DONE,
+            "category": f"cat{i % 7}" if i % 3 else None,
+            "region": f"R{i % 5}" if i % 4 else None,
+        }
+
+
+def test_import_statement_count_does_not_grow_with_keys(db, catalog, flat_statements):
+    product_ids, customer_ids = catalog(db, 2, 300)
+
+    # SQLite không có sentinel ngầm cho INSERT ... RETURNING theo thứ tự
+    # tham số → INSERT orders chạy từng dòng (PostgreSQL gộp theo trang).
+    # Mọi câu còn lại, kể cả rollup, không phụ thuộc số dòng / số khoá.
+    small, large = flat_statements(
+        lambda: order_import.import_orders(db, _rows(product_ids, customer_ids[:30], 30)),
+        lambda: order_import.import_orders(db, _rows(product_ids, customer_ids, 300)),
+        ignore=["INSERT INTO orders"],
+    )
+    assert (small.result["imported"], large.result["imported"]) == (30, 300)
+    assert db.query(models.Order).count() == 330
+
+    # Rollup: 1 executemany upsert, không SELECT ... FOR UPDATE theo từng khoá
+    rollup_writes = [s for s in large if "revenue_rollups" in s]
+    assert len(rollup_writes) == 1
+    assert "ON CONFLICT" in rollup_writes[0].upper()
+
+
+def test_import_rollup_matches_rebuild(db, catalog, rollup_totals):
+    product_ids, customer_ids = catalog(db, 2, 10)
+    rows = list(_rows(product_ids, customer_ids, 120))
+
+    order_import.import_orders(db, rows[:60])
+    order_import.import_orders(db, rows[60:])
+    incremental = rollup_totals(db)
+
+    revenue_rollup.rebuild(db)
+    assert rollup_totals(db) == incremental
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app import models
+from app.routers import orders
+from app.utils import pagination
+
+STATUSES = ("Đang xử lý", "Hoàn thành", "Đã hủy")
+
+
+@pytest.fixture
+def order_rows(db, catalog):
+    product_ids, customer_ids = catalog(db, 2, 3)
+    rows = [
+        models.Order(
+            customer_id=customer_ids[i % 3], product_id=product_ids[i % 2],
+            date=date(2026, 1, 1) + timedelta(days=i), status=STATUSES[i % 3],
+            quantity=1, amount=10, region=("HN", "HCM", None)[(i // 2) % 3],
+        )
+        for i in range(25)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return product_ids, customer_ids, rows
+
+
+def _list(db, limit=None, cursor=None, status=None, customer_id=None, product_id=None,
+          region=None, date_from=None, date_to=None):
+    response = Response()
+    items = orders.get_orders(
+        response, limit=limit, cursor=cursor, status=status, customer_id=customer_id,
+        product_id=product_id, region=region, date_from=date_from, date_to=date_to, db=db,
+    )
+    return [o["id"] for o in items], response.headers.get(pagination.NEXT_CURSOR_HEADER)
+
+
+def test_keyset_pages_cover_all_orders_once(db, order_rows):
+    _, _, rows = order_rows
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        ids, cursor = _list(db, limit=6, cursor=cursor)
+        seen += ids
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 5
+    assert seen == sorted((r.id for r in rows), reverse=True)
+
+
+def test_keyset_pages_keep_filters(db, order_rows):
+    _, _, rows = order_rows
+    done = sorted((r.id for r in rows if r.status == "Hoàn thành"), reverse=True)
+
+    first, cursor = _list(db, limit=3, status="Hoàn thành")
+    rest, last = _list(db, limit=100, cursor=cursor, status="Hoàn thành")
+
+    assert first + rest == done
+    assert last is None
+
+
+def test_filters_combine(db, order_rows):
+    product_ids, customer_ids, rows = order_rows
+    start, end = date(2026, 1, 4), date(2026, 1, 20)
+
+    ids, _ = _list(
+        db, customer_id=customer_ids[0], product_id=product_ids[1],
+        date_from=start, date_to=end,
+    )
+    assert ids == sorted((
+        r.id for r in rows
+        if r.customer_id == customer_ids[0] and r.product_id == product_ids[1]
+        and start <= r.date <= end
+    ), reverse=True)
+    assert ids
+
+    ids, _ = _list(db, region="HN", status="Đang xử lý")
+    assert ids == sorted(
+        (r.id for r in rows if r.region == "HN" and r.status == "Đang xử lý"), reverse=True
+    )
+
+
+def test_without_limit_returns_every_matching_order(db, order_rows):
+    """Không limit: không phân trang, không header cursor (FE cũ đếm độ dài danh sách)."""
+    _, _, rows = order_rows
+
+    ids, cursor = _list(db)
+
+    assert ids == sorted((r.id for r in rows), reverse=True)
+    assert cursor is None
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"cursor": "không-phải-cursor"},
+    {"cursor": pagination.encode_cursor("abc")},
+    {"date_from": date(2026, 2, 1), "date_to": date(2026, 1, 1)},
+])
+def test_bad_cursor_or_range_is_400(db, order_rows, kwargs):
+    with pytest.raises(HTTPException) as exc:
+        _list(db, limit=5, **kwargs)
+    assert exc.value.status_code == 400
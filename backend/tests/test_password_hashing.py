@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import models
+from app.core import security
+from app.main import app
+
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    """Pool bcrypt 1 luồng, hàng đợi tối đa 2; release.set() để chạy tiếp."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    monkeypatch.setattr(security, "_hash_executor", executor)
+    monkeypatch.setattr(security, "PASSWORD_HASH_MAX_QUEUE", 2)
+    yield release
+    release.set()
+    executor.shutdown(wait=True)
+
+
+def test_submit_rejects_with_503_when_queue_is_full(one_worker):
+    release = one_worker
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+        return "chặn"
+
+    rejected = security.password_hash_stats()["rejected"]
+    running = security._submit_hashing(block)
+    started.wait(5)   # job đầu đã rời hàng đợi, đang chiếm luồng duy nhất
+    queued = [security._submit_hashing(lambda i=i: i) for i in range(2)]
+
+    with pytest.raises(HTTPException) as exc:
+        security._submit_hashing(lambda: "thừa")
+    assert exc.value.status_code == 503
+    assert security.password_hash_stats()["rejected"] == rejected + 1
+
+    release.set()
+    assert [running.result(5)] + [f.result(5) for f in queued] == ["chặn", 0, 1]
+
+    # Hàng đợi đã trống → nhận lại bình thường
+    assert security._submit_hashing(lambda: "ok").result(5) == "ok"
+
+
+@pytest.mark.parametrize("path", ["/auth/password-hash-stats", "/employee-home/cache-stats"])
+def test_stats_endpoints_require_admin(db, path):
+    db.add_all([
+        models.Admin(username="boss", role="admin", is_active=True),
+        models.Admin(username="nv", role="employee", is_active=True),
+    ])
+    db.commit()
+    security._principals.clear()
+    client = TestClient(app)
+
+    def get(username=None):
+        headers = {}
+        if username:
+            token = jwt.encode({"sub": username}, security.SECRET_KEY, algorithm=security.ALGORITHM)
+            headers["Authorization"] = f"Bearer {token}"
+        return client.get(path, headers=headers).status_code
+
+    assert (get(), get("nv"), get("boss")) == (401, 403, 200)
@@ -0,0 +1,133 @@
+from datetime import date, time, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import extract
+
+from app import models, schemas
+from app.routers import employees, salary
+from app.utils import payroll
+
+YEAR, MONTH = 2026, 9
+
+
+def _run(db):
+    db.expire_all()
+    return db.query(models.PayrollRun).filter_by(year=YEAR, month=MONTH).one()
+
+
+def test_get_run_is_read_only(db, count_statements):
+    with count_statements() as log:
+        with pytest.raises(HTTPException) as exc:
+            salary.get_payroll_run(YEAR, MONTH, db)
+
+    assert exc.value.status_code == 404
+    assert all(s.lstrip().upper().startswith("SELECT") for s in log)
+    assert db.query(models.PayrollRun).count() == 0
+
+
+def test_rerun_creates_then_get_reads(db):
+    created = salary.rerun_payroll(YEAR, MONTH, db)
+    assert created["stale"] is False
+
+    assert salary.get_payroll_run(YEAR, MONTH, db)["id"] == created["id"]
+
+
+def test_rerun_closed_run_conflicts(db):
+    payroll.close_run(db, YEAR, MONTH)
+
+    with pytest.raises(HTTPException) as exc:
+        salary.rerun_payroll(YEAR, MONTH, db)
+    assert exc.value.status_code == 409
+
+
+def test_employee_writes_mark_open_runs_stale(db):
+    emp = employees.create(schemas.EmployeeCreate(name="A", email="a@x", department="Kho"), db)
+    payroll.run_payroll(db, YEAR, MONTH)
+
+    employees.update(emp.id, schemas.EmployeeUpdate(department="Bán hàng"), db)
+    assert _run(db).stale is True
+
+    # Đọc lại → phiếu lương có phòng ban mới
+    slips = payroll.snapshot_payslips(db, YEAR, MONTH)
+    assert [s["department"] for s in slips] == ["Bán hàng"]
+    assert _run(db).stale is False
+
+    employees.create(schemas.EmployeeCreate(name="B", email="b@x"), db)
+    assert _run(db).stale is True
+    assert len(payroll.snapshot_payslips(db, YEAR, MONTH)) == 2
+
+    employees.delete(emp.id, db)
+    assert _run(db).stale is True
+    assert len(payroll.snapshot_payslips(db, YEAR, MONTH)) == 1
+
+
+def test_employee_writes_leave_closed_runs_alone(db):
+    emp = employees.create(schemas.EmployeeCreate(name="A", email="a@x"), db)
+    payroll.close_run(db, YEAR, MONTH)
+
+    employees.partial_update(emp.id, schemas.EmployeePatch(department="Kho"), db)
+
+    assert _run(db).stale is False
+
+
+def _legacy_salary(db, employee_id, year, month):
+    """Công thức cũ của /salary/{id}: đọc từng dòng chấm công rồi đếm bằng Python."""
+    emp = db.get(models.Employee, employee_id)
+    records = db.query(models.Attendance).filter(
+        models.Attendance.employee_id == employee_id,
+        extract("year", models.Attendance.date) == year,
+        extract("month", models.Attendance.date) == month,
+    ).all()
+
+    daily_salary = 7000000 / 26
+    total_days = sum(1 for r in records if r.check_in and r.check_out)
+    late = sum(1 for r in records if r.status == "Late")
+    early = sum(1 for r in records if r.status == "Early")
+    penalty = late * 50000 + early * 50000
+
+    return {
+        "employee_id": employee_id,
+        "employee_name": emp.name,
+        "department": emp.department,
+        "position": emp.position,
+        "year": year,
+        "month": month,
+        "month_string": f"{year}-{month:02d}",
+        "base_salary": 7000000,
+        "daily_salary": int(daily_salary),
+        "total_days": total_days,
+        "late": late,
+        "early": early,
+        "penalty": int(penalty),
+        "final_salary": int(max(total_days * daily_salary - penalty, 0)),
+    }
+
+
+def test_compute_payroll_matches_legacy_formula(db):
+    emps = [
+        models.Employee(name=f"NV{i}", email=f"nv{i}@x", department=f"D{i % 3}", position="NV")
+        for i in range(12)
+    ]
+    db.add_all(emps)
+    db.flush()
+    statuses = ("On time", "Late", "Early", "On time", "Late")
+    for i, emp in enumerate(emps[:-1]):   # người cuối không chấm công
+        for d in range(i * 3):
+            db.add(models.Attendance(
+                employee_id=emp.id,
+                # ngày 28 → 3 tháng sau: chỉ ngày trong tháng 9 được tính
+                date=date(YEAR, MONTH - 1, 28) + timedelta(days=d),
+                check_in=time(8) if d % 4 else None,
+                check_out=time(17) if d % 5 else None,
+                status=statuses[(i + d) % len(statuses)],
+            ))
+    db.commit()
+
+    start, end = date(YEAR, MONTH, 1), date(YEAR, MONTH, 30)
+    slips = payroll.compute_payroll(db, start, end, YEAR, MONTH)
+
+    assert slips == [_legacy_salary(db, e.id, YEAR, MONTH) for e in emps]
+    # Phạt nhiều hơn lương ngày công → chặn về 0
+    assert any(s["final_salary"] == 0 and s["penalty"] for s in slips)
+    assert slips[-1]["total_days"] == 0
@@ -0,0 +1,43 @@
+import zipfile
+from datetime import date, time
+from io import BytesIO
+
+import openpyxl
+
+from app import models
+from app.utils import payroll, payslip_export
+
+YEAR, MONTH = 2026, 9
+
+
+def test_zip_holds_one_valid_workbook_per_payslip(db):
+    emps = [models.Employee(name=f"NV{i}", email=f"nv{i}@x", department="Kho") for i in range(4)]
+    db.add_all(emps)
+    db.flush()
+    db.add_all(
+        models.Attendance(employee_id=e.id, date=date(YEAR, MONTH, d + 1),
+                          check_in=time(8), check_out=time(17), status="On time")
+        for i, e in enumerate(emps)
+        for d in range(i + 1)
+    )
+    db.commit()
+    slips = payroll.compute_payroll(db, date(YEAR, MONTH, 1), date(YEAR, MONTH, 30), YEAR, MONTH)
+
+    archive = zipfile.ZipFile(BytesIO(b"".join(payslip_export.stream_payslip_zip(slips))))
+
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == sorted(
+        f"salary_{e.id}_{YEAR}_{MONTH}.xlsx" for e in emps
+    )
+    for slip in slips:
+        wb = openpyxl.load_workbook(BytesIO(archive.read(payslip_export.payslip_filename(slip))))
+        rows = {r[0]: r[1] for r in wb["Salary"].iter_rows(values_only=True) if r and r[0]}
+        assert rows["Họ tên"] == slip["employee_name"]
+        assert rows["Tháng"] == f"{YEAR}-{MONTH:02d}"
+        assert rows["Ngày công"] == slip["total_days"]
+        assert rows["Lương thực lãnh"] == slip["final_salary"]
+
+
+def test_empty_payroll_streams_an_empty_zip():
+    archive = zipfile.ZipFile(BytesIO(b"".join(payslip_export.stream_payslip_zip([]))))
+    assert archive.namelist() == []
@@ -0,0 +1,82 @@
+import jwt
+import pytest
+
+from app import database, models
+from app.core import security
+from app.routers import admins
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    security._principals.clear()
+    yield
+    security._principals.clear()
+
+
+@pytest.fixture
+def user(db):
+    admin = models.Admin(username="boss", role="admin", is_active=True)
+    target = models.Admin(username="nv", role="employee", is_active=True)
+    db.add_all([admin, target])
+    db.commit()
+    return admin, target
+
+
+def _token(username):
+    return jwt.encode({"sub": username}, security.SECRET_KEY, algorithm=security.ALGORITHM)
+
+
+def _principal(db, username):
+    return security.get_current_user(_token(username), db)
+
+
+def test_principal_is_served_from_cache(db, user, count_statements):
+    _, target = user
+    first = _principal(db, target.username)
+
+    with count_statements() as log:
+        assert _principal(db, target.username) is first
+    assert log.count == 0
+
+
+def test_update_role_invalidates_principal(db, user):
+    admin, target = user
+    assert _principal(db, "nv").role == "employee"
+
+    admins.update_role(target.id, {"role": "manager"}, db, current_user=admin)
+
+    assert _principal(db, "nv").role == "manager"
+
+
+def test_update_active_invalidates_principal(db, user):
+    admin, target = user
+    assert _principal(db, "nv").is_active is True
+
+    admins.update_active(target.id, {"is_active": False}, db, current_user=admin)
+
+    assert _principal(db, "nv").is_active is False
+
+
+def test_lookup_racing_an_update_is_not_stored(db, user, monkeypatch):
+    admin, target = user
+    target_id = target.id
+    from_admin = security.Principal.from_admin
+
+    def update_after_read(row):
+        # Request xác thực đã đọc dòng cũ; request admin đổi role và commit
+        # trước khi bản chụp kịp lưu vào cache
+        stale = from_admin(row)
+        db.rollback()   # SQLite: nhả write lock cho session của request admin
+        session = database.SessionLocal()
+        try:
+            admins.update_role(target_id, {"role": "manager"}, session, current_user=admin)
+        finally:
+            session.close()
+        return stale
+
+    with monkeypatch.context() as m:
+        m.setattr(security.Principal, "from_admin", update_after_read)
+        assert _principal(db, "nv").role == "employee"
+
+    db.rollback()
+    assert _principal(db, "nv").role == "manager"
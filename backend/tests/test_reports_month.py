@@ -0,0 +1,75 @@
+from datetime import date
+from io import BytesIO
+
+from app import models
+from app.routers import reports
+
+
+def _orders(db, days):
+    customer = models.Customer(name="C")
+    product = models.Product(name="P", price=1, stock=0)
+    db.add_all([customer, product])
+    db.flush()
+    db.add_all([
+        models.Order(customer_id=customer.id, product_id=product.id, date=d, amount=1, status=s)
+        for d, s in days
+    ])
+    db.commit()
+    return product
+
+
+def test_report_month_keeps_years_apart(db):
+    _orders(db, [
+        (date(2025, 1, 3), "Hoàn thành"),
+        (date(2025, 1, 31), "Đã hủy"),
+        (date(2025, 3, 1), "Hoàn thành"),
+        (date(2026, 1, 2), "Hoàn thành"),
+    ])
+
+    assert reports.order_report_month(year=2025, date_from=None, date_to=None, db=db) == [
+        {"year": 2025, "month": 1, "count": 2},
+        {"year": 2025, "month": 3, "count": 1},
+    ]
+    assert reports.order_report_month(
+        year=None, date_from=date(2025, 3, 1), date_to=date(2026, 12, 31), db=db
+    ) == [
+        {"year": 2025, "month": 3, "count": 1},
+        {"year": 2026, "month": 1, "count": 1},
+    ]
+
+
+def test_summary_pdf_uses_summary_aggregates(db, flat_statements, monkeypatch):
+    product = _orders(db, [(date.today(), "Hoàn thành")])
+    db.add_all([models.Inventory(product_id=product.id, quantity=i) for i in range(1, 4)])
+    db.commit()
+
+    def grow():
+        more = [models.Product(name=f"Q{i}", price=1, stock=0) for i in range(30)]
+        db.add_all(more)
+        db.flush()
+        db.add_all([models.Inventory(product_id=q.id, quantity=n) for q in more for n in (5, -2, 1)])
+        db.commit()
+        db.expire_all()
+
+    # Không nạp từng phiếu kho: 1 câu tổng quan + 1 GROUP BY tồn kho + 2 thống kê đơn
+    small, _ = flat_statements(
+        lambda: reports.render_summary_pdf(db, BytesIO()),
+        lambda: reports.render_summary_pdf(db, BytesIO()),
+        between=grow,
+    )
+    assert small.count == 4
+
+    lines = []
+    monkeypatch.setattr(
+        reports.canvas.Canvas, "drawString", lambda self, x, y, text, *a, **k: lines.append(text)
+    )
+    reports.render_summary_pdf(db, BytesIO())
+
+    summary = reports.get_summary(db)
+    expected = [f"- {i['name']}: {i['stock']}" for i in summary["charts"]["inventory"]]
+    assert f"- Tong so luong ton kho: {summary['overview']['total_stock']}" in lines
+    # Top 5 rồi danh sách đầy đủ, mỗi sản phẩm 1 dòng như /reports/summary
+    start = lines.index("2. Top 5 san pham ton kho nhieu nhat") + 1
+    assert lines[start:start + 5] == expected[:5]
+    start = lines.index("3. Danh sach ton kho tat ca san pham") + 1
+    assert lines[start:start + len(expected)] == expected
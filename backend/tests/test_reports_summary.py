@@ -0,0 +1,46 @@
+from app import models
+from app.routers import reports
+
+
+def _seed(db, products: int, movements: int, prefix: str = "P"):
+    db.add_all([models.Employee(name=f"E{i}", email=f"{prefix}{i}@x.vn") for i in range(3)])
+    db.add_all([models.Customer(name=f"C{i}") for i in range(2)])
+    items = [models.Product(name=f"{prefix}{i}", price=1, stock=0) for i in range(products)]
+    db.add_all(items)
+    db.flush()
+    db.add_all([
+        models.Inventory(product_id=p.id, quantity=(i + 1) * (idx + 1))
+        for idx, p in enumerate(items)
+        for i in range(movements)
+    ])
+    # phiếu âm không làm giảm biểu đồ tồn kho
+    db.add(models.Inventory(product_id=items[0].id, quantity=-1000))
+    db.commit()
+
+
+def test_summary_totals(db):
+    _seed(db, products=6, movements=2)
+
+    result = reports.get_summary(db)
+
+    assert result["overview"]["employees_count"] == 3
+    assert result["overview"]["customers_count"] == 2
+    assert result["overview"]["products_count"] == 6
+    assert result["charts"]["inventory"][0] == {"name": "P5", "stock": 18}
+    assert [p["name"] for p in result["top_products"]] == ["P5", "P4", "P3", "P2", "P1"]
+
+
+def test_summary_statement_count_is_constant(db, flat_statements):
+    """N+1 cũ: 1 câu / phiếu kho. Giờ cố định 2 câu dù sổ kho lớn cỡ nào."""
+    _seed(db, products=5, movements=2)
+
+    def grow():
+        _seed(db, products=40, movements=25, prefix="Q")
+        db.expire_all()
+
+    small, _ = flat_statements(
+        lambda: reports.get_summary(db),
+        lambda: reports.get_summary(db),
+        between=grow,
+    )
+    assert small.count <= 2
@@ -0,0 +1,88 @@
+import threading
+from datetime import date
+
+from app import database, models, schemas
+from app.routers import orders
+from app.utils import revenue_rollup
+
+DONE = revenue_rollup.COMPLETED_STATUS
+
+
+def _order(product_id, customer_id, status=DONE, category=None, region=None, day=date(2026, 1, 5)):
+    return schemas.OrderCreate(
+        customer_id=customer_id, product_id=product_id, quantity=1,
+        date=day, status=status, amount=10, category=category, region=region,
+    )
+
+
+def _rollups(db):
+    db.expire_all()
+    return db.query(models.RevenueRollup).all()
+
+
+def test_null_key_parts_share_one_row(db, catalog):
+    (pid,), (cid,) = catalog(db, 1, 1, stock=100)
+
+    # 2 đơn cùng khoá, category / region NULL → vẫn 1 dòng rollup
+    first = orders.create_order(_order(pid, cid), db)
+    orders.create_order(_order(pid, cid), db)
+
+    rows = _rollups(db)
+    assert len(rows) == 1
+    assert (rows[0].order_count, rows[0].quantity, rows[0].total) == (2, 2, 20)
+
+    orders.update_order_status(first["id"], orders.StatusUpdate(status="Đã hủy"), db)
+    assert _rollups(db)[0].order_count == 1
+
+
+def test_row_removed_when_last_order_leaves(db, catalog):
+    (pid,), (cid,) = catalog(db, 1, 1, stock=100)
+    o = orders.create_order(_order(pid, cid, category="A"), db)
+
+    orders.update_order_status(o["id"], orders.StatusUpdate(status="Đã hủy"), db)
+
+    assert _rollups(db) == []
+
+
+def test_incremental_matches_rebuild(db, catalog):
+    (pid,), (cid,) = catalog(db, 1, 1, stock=100)
+    for category in (None, "A", "A", None):
+        orders.create_order(_order(pid, cid, category=category, region="HN"), db)
+
+    incremental = sorted((r.category or "", r.order_count, r.total) for r in _rollups(db))
+    revenue_rollup.rebuild(db)
+    rebuilt = sorted((r.category or "", r.order_count, r.total) for r in _rollups(db))
+
+    assert incremental == rebuilt == [("", 2, 20.0), ("A", 2, 20.0)]
+
+
+def test_concurrent_first_orders_for_same_key(db, catalog):
+    """2 transaction cùng tạo dòng rollup đầu tiên của 1 khoá → không IntegrityError."""
+    (pid,), (cid,) = catalog(db, 1, 1, stock=100)
+    pending = [
+        orders.create_order(_order(pid, cid, status="Đang xử lý"), db)["id"]
+        for _ in range(8)
+    ]
+    db.rollback()  # nhả transaction của session chính trước khi các luồng ghi
+    errors = []
+    barrier = threading.Barrier(len(pending))
+
+    def complete(order_id):
+        session = database.SessionLocal()
+        try:
+            barrier.wait()
+            orders.update_order_status(order_id, orders.StatusUpdate(status=DONE), session)
+        except Exception as e:  # noqa: BLE001 — gom lỗi để assert ở luồng chính
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=complete, args=(oid,)) for oid in pending]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    rows = _rollups(db)
+    assert len(rows) == 1 and rows[0].order_count == len(pending)
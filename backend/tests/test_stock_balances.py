@@ -0,0 +1,134 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, schemas
+from app.routers import orders
+from app.utils import order_batch, order_import, stock_balances
+
+DONE = "Hoàn thành"
+PENDING = "Đang xử lý"
+CANCELED = "Đã hủy"
+UNASSIGNED = stock_balances.UNASSIGNED
+
+
+@pytest.fixture
+def shop(db, add_stock):
+    """Sản phẩm nhập Kho A (3) trước, Kho B (5) sau."""
+    product = models.Product(name="P", price=10, stock=0)
+    customer = models.Customer(name="C")
+    db.add_all([product, customer])
+    db.commit()
+    add_stock(db, product, 3, "Kho A")
+    add_stock(db, product, 5, "Kho B")
+    return product.id, customer.id
+
+
+def _order(db, shop, quantity):
+    product_id, customer_id = shop
+    return orders.create_order(schemas.OrderCreate(
+        customer_id=customer_id, product_id=product_id, quantity=quantity,
+        date=date(2026, 1, 5), status=PENDING, amount=10 * quantity,
+    ), db)["id"]
+
+
+def _set_status(db, order_id, status, location=None):
+    return orders.update_order_status(
+        order_id, orders.StatusUpdate(status=status, location=location), db
+    )
+
+
+def _balances(db):
+    db.expire_all()
+    return {b.location: b.quantity for b in stock_balances.balances(db) if b.quantity}
+
+
+def test_export_takes_fifo_from_real_locations(db, shop):
+    order_id = _order(db, shop, 6)
+
+    _set_status(db, order_id, DONE)
+
+    assert _balances(db) == {"Kho B": 2}
+    rows = db.query(models.Inventory).filter_by(order_id=order_id).order_by(models.Inventory.id)
+    assert [(r.location, r.stock_location, r.quantity) for r in rows] == [
+        (stock_balances.EXPORT_LOCATION, "Kho A", -3),
+        (stock_balances.EXPORT_LOCATION, "Kho B", -3),
+    ]
+
+
+def test_return_goes_back_to_export_locations(db, shop):
+    order_id = _order(db, shop, 6)
+    _set_status(db, order_id, DONE)
+
+    _set_status(db, order_id, CANCELED)
+    assert _balances(db) == {"Kho A": 3, "Kho B": 5}
+
+    # Hoàn thành lại → xuất lại FIFO, hoàn lại vẫn đúng kho
+    _set_status(db, order_id, DONE, location=None)
+    _set_status(db, order_id, CANCELED)
+    assert _balances(db) == {"Kho A": 3, "Kho B": 5}
+
+
+def test_export_from_requested_location(db, shop):
+    order_id = _order(db, shop, 4)
+
+    _set_status(db, order_id, DONE, location="Kho B")
+    assert _balances(db) == {"Kho A": 3, "Kho B": 1}
+
+
+def test_requested_location_without_enough_stock(db, shop):
+    order_id = _order(db, shop, 4)
+
+    with pytest.raises(HTTPException) as exc:
+        _set_status(db, order_id, DONE, location="Kho A")
+    assert exc.value.status_code == 400
+    db.rollback()
+
+    assert _balances(db) == {"Kho A": 3, "Kho B": 5}
+    assert db.get(models.Product, shop[0]).stock == 8
+
+
+def test_unassigned_is_used_last_and_never_negative(db, shop, add_stock):
+    product = db.get(models.Product, shop[0])
+    add_stock(db, product, 1)   # nhập không ghi kho → "Chưa phân kho"
+    order_id = _order(db, shop, 9)
+
+    _set_status(db, order_id, DONE)
+
+    assert _balances(db) == {}
+    assert all(b.quantity >= 0 for b in stock_balances.balances(db))
+
+
+def test_balances_out_of_sync_with_stock_conflicts(db, shop):
+    # Tổng tồn nói còn 8 nhưng theo kho chỉ còn 3
+    db.query(models.StockBalance).filter_by(location="Kho B").delete()
+    db.commit()
+    order_id = _order(db, shop, 6)
+
+    with pytest.raises(HTTPException) as exc:
+        _set_status(db, order_id, DONE)
+    assert exc.value.status_code == 409
+
+
+def test_bulk_paths_match_rebuild(db, shop):
+    product_id, customer_id = shop
+    batch_orders = [_order(db, shop, 2) for _ in range(3)]
+
+    order_batch.update_statuses(db, [(oid, DONE) for oid in batch_orders])
+    order_batch.update_statuses(db, [(batch_orders[0], CANCELED), (batch_orders[1], CANCELED)])
+
+    result = order_import.import_orders(db, [
+        (2, {"customer_id": customer_id, "product_id": product_id, "quantity": 5,
+             "amount": 50, "date": "2026-01-06", "status": DONE}),
+        (3, {"customer_id": customer_id, "product_id": product_id, "quantity": 1,
+             "amount": 10, "date": "2026-01-06", "status": DONE}),
+    ])
+    assert result["imported"] == 2
+
+    incremental = _balances(db)
+    assert sum(incremental.values()) == db.get(models.Product, product_id).stock == 0
+    assert all(q >= 0 for q in incremental.values())
+
+    stock_balances.rebuild(db)
+    assert _balances(db) == incremental
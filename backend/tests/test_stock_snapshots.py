@@ -0,0 +1,147 @@
+import logging
+import threading
+from datetime import date, timedelta
+
+from app import models, schemas
+from app.routers import inventory
+from app.utils import stock_snapshots
+
+
+def test_scheduler_logs_failures_with_traceback(monkeypatch, caplog):
+    def boom():
+        stock_snapshots._stop.set()   # chỉ chạy 1 vòng
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(stock_snapshots, "ensure_yesterday", boom)
+    stock_snapshots._stop.clear()
+
+    with caplog.at_level(logging.ERROR, logger=stock_snapshots.__name__):
+        stock_snapshots._loop()
+
+    record, = caplog.records
+    assert record.name == "app.utils.stock_snapshots"
+    assert record.exc_info[0] is RuntimeError
+
+
+# ==========================================================
+# Tồn tại ngày D (snapshot + phần chênh) = cộng toàn bộ sổ kho
+# ==========================================================
+DAY0 = date(2026, 3, 1)
+
+
+def _ledger(db, n_days=20):
+    products = [models.Product(name=f"P{i}", price=10, stock=0) for i in range(3)]
+    db.add_all(products)
+    db.flush()
+    db.add_all(
+        models.Inventory(
+            product_id=products[i % 3].id,
+            quantity=(7 if i % 4 else -3),
+            location="Kho A",
+            date_added=DAY0 + timedelta(days=i % n_days),
+        )
+        for i in range(60)
+    )
+    db.commit()
+    return [p.id for p in products]
+
+
+def _full_sum(db, day):
+    db.expire_all()
+    totals = {pid: 0 for (pid,) in db.query(models.Product.id)}
+    for row in db.query(models.Inventory):
+        if row.date_added is None or row.date_added <= day:
+            totals[row.product_id] += row.quantity
+    return totals
+
+
+def _as_of(db, day):
+    return {pid: int(qty) for pid, _, qty, _ in stock_snapshots.stock_as_of(db, day)}
+
+
+def test_stock_as_of_equals_full_ledger_sum(db):
+    _ledger(db)
+    for offset in (3, 9, 15):
+        stock_snapshots.take_snapshot(db, DAY0 + timedelta(days=offset))
+
+    for offset in range(-1, 25):
+        day = DAY0 + timedelta(days=offset)
+        assert _as_of(db, day) == _full_sum(db, day), day
+
+
+def _snapshot_days(db, product_id):
+    db.expire_all()
+    return sorted(
+        d for (d,) in db.query(models.StockSnapshot.snapshot_date).filter_by(product_id=product_id)
+    )
+
+
+def test_backdated_ledger_writes_invalidate_snapshots(db):
+    pid = _ledger(db)[0]
+    for offset in (5, 10, 15):
+        stock_snapshots.take_snapshot(db, DAY0 + timedelta(days=offset))
+
+    # Tạo phiếu lùi ngày 8 → snapshot 10, 15 bị xoá
+    created = inventory.create_inventory(schemas.InventoryCreate(
+        product_id=pid, quantity=4, location="Kho A", date_added=DAY0 + timedelta(days=8),
+    ), db)
+    assert _snapshot_days(db, pid) == [DAY0 + timedelta(days=5)]
+    assert _as_of(db, DAY0 + timedelta(days=12)) == _full_sum(db, DAY0 + timedelta(days=12))
+
+    stock_snapshots.take_snapshot(db, DAY0 + timedelta(days=10))
+
+    # Sửa phiếu sang ngày 3 → snapshot từ ngày 3 trở đi bị xoá
+    inventory.update_inventory(created["id"], schemas.InventoryCreate(
+        product_id=pid, quantity=6, location="Kho A", date_added=DAY0 + timedelta(days=3),
+    ), db)
+    assert _snapshot_days(db, pid) == []
+    assert _as_of(db, DAY0 + timedelta(days=12)) == _full_sum(db, DAY0 + timedelta(days=12))
+
+    stock_snapshots.take_snapshot(db, DAY0 + timedelta(days=5))
+
+    # Xoá phiếu (ngày 3) → snapshot ngày 5 bị xoá
+    inventory.delete_inventory(created["id"], db)
+    assert _snapshot_days(db, pid) == []
+    for offset in (2, 4, 12):
+        day = DAY0 + timedelta(days=offset)
+        assert _as_of(db, day) == _full_sum(db, day)
+
+
+def test_take_snapshot_without_replace_skips_existing_rows(db):
+    _ledger(db)
+    day = DAY0 + timedelta(days=5)
+
+    # 2 worker cùng chụp: worker sau không lỗi trùng khoá, không ghi thêm
+    first = stock_snapshots.take_snapshot(db, day, replace=False)
+    second = stock_snapshots.take_snapshot(db, day, replace=False)
+
+    assert (first, second) == (3, 0)
+    assert db.query(models.StockSnapshot).filter_by(snapshot_date=day).count() == 3
+
+
+def test_ensure_yesterday_from_several_workers(db, caplog):
+    _ledger(db)
+    db.rollback()
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        stock_snapshots.ensure_yesterday()
+
+    errors = []
+
+    def run():
+        try:
+            worker()
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    yesterday = date.today() - timedelta(days=1)
+    assert db.query(models.StockSnapshot).filter_by(snapshot_date=yesterday).count() == 3